@@ -0,0 +1,91 @@
+"""Import-time benchmark of the mobile base SDK.
+
+Each scenario is imported in a fresh interpreter, several times, and the best time is compared with
+its budget. Scenarios also list the heavy modules they should not load. The script exits with an
+error if a budget is exceeded or a heavy module is loaded, so that it can run on CI:
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --scale 3  # budgets three times larger, e.g. on the robot's CPU
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple
+
+
+class Scenario(NamedTuple):
+    """Statement to import, its time budget in ms and the modules it should not load."""
+
+    statement: str
+    budget_ms: float
+    forbidden: List[str]
+
+
+SCENARIOS = {
+    "package": Scenario("import mobile_base_sdk", 50.0, ["grpc", "numpy", "PIL", "reachy2_sdk_api"]),
+    "sdk": Scenario("from mobile_base_sdk import MobileBaseSDK", 200.0, ["numpy", "PIL"]),
+    "goto": Scenario("from mobile_base_sdk import GotoResult", 50.0, ["grpc", "numpy", "PIL"]),
+}
+
+# Run in the fresh interpreter: time the import and report the loaded modules.
+_PROBE = """
+import json, sys, time
+tic = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - tic
+print(json.dumps({{"ms": elapsed * 1e3, "modules": sorted(name.split(".")[0] for name in sys.modules)}}))
+"""
+
+
+def measure(scenario: Scenario, runs: int) -> Dict[str, object]:
+    """Import the scenario in runs fresh interpreters and return the best time and the loaded modules."""
+    times = []
+    modules: List[str] = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=scenario.statement)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.splitlines()[-1])
+        times.append(result["ms"])
+        modules = result["modules"]
+    return {
+        "best_ms": min(times),
+        "median_ms": sorted(times)[len(times) // 2],
+        "forbidden_loaded": sorted(set(scenario.forbidden) & set(modules)),
+    }
+
+
+def main() -> None:
+    """Run the import benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description="Measure the import time of the mobile base SDK against budgets.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per scenario, the best time is kept.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Factor applied to every budget.")
+    parser.add_argument("--output", help="Path of the JSON file to save the results to.")
+    args = parser.parse_args()
+
+    results = {}
+    failures = []
+    for name, scenario in SCENARIOS.items():
+        result = measure(scenario, args.runs)
+        result["budget_ms"] = scenario.budget_ms * args.scale
+        results[name] = result
+        print(f"{name:10s} {result['best_ms']:8.1f} ms (budget {result['budget_ms']:.0f} ms)  {scenario.statement}")
+        if result["best_ms"] > result["budget_ms"]:
+            failures.append(f"{name}: {result['best_ms']:.1f} ms is over the budget of {result['budget_ms']:.0f} ms")
+        if result["forbidden_loaded"]:
+            failures.append(f"{name}: loads {', '.join(result['forbidden_loaded'])}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Benchmark of the mobile base SDK against the local simulator.
+
+For each public API, reports the p50/p95/p99 latency, the number of calls per second, the CPU time
+per call, and the peak and retained memory allocated by a call. Also measures the time between the moment the base
+reaches a goto goal and the moment goto notices it.
+
+Results are saved as JSON so that they can be compared between releases:
+
+    python benchmarks/bench_sdk.py --output results.json
+    python benchmarks/bench_sdk.py --compare results.json
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from mobile_base_sdk import MobileBaseSDK
+from mobile_base_sdk.lidar_map import LidarMapCache
+from mobile_base_sdk.simulator import MobileBaseSimulator
+
+
+def measure(call: Callable[[], object], iterations: int, warmup: int = 10) -> Dict[str, float]:
+    """Measure the latency, throughput, CPU time and allocations of call.
+
+    Allocations are the mean over the calls of the peak memory allocated during a call, and of the memory
+    it allocated and did not free. They include the allocations of the other Python threads of the process
+    made while the call runs, such as the in-process simulator's.
+    """
+    for _ in range(warmup):
+        call()
+
+    latencies = np.empty(iterations)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for i in range(iterations):
+        tic = time.perf_counter()
+        call()
+        latencies[i] = time.perf_counter() - tic
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    # Allocations are traced on a separate run, tracemalloc slows down every call. Clearing the traces before
+    # each call resets the traced and peak memory, so that they only count the memory allocated by that call.
+    alloc_iterations = max(1, iterations // 10)
+    peak_total = retained_total = 0
+    tracemalloc.start()
+    for _ in range(alloc_iterations):
+        tracemalloc.clear_traces()
+        call()
+        retained, peak = tracemalloc.get_traced_memory()
+        peak_total += peak
+        retained_total += retained
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1e3
+    return {
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "calls_per_s": iterations / wall,
+        "cpu_ms_per_call": cpu / iterations * 1e3,
+        "peak_alloc_bytes_per_call": peak_total / alloc_iterations,
+        "retained_bytes_per_call": retained_total / alloc_iterations,
+    }
+
+
+def measure_goto_detection(mobile_base: MobileBaseSDK, simulator: MobileBaseSimulator, trials: int) -> Dict[str, float]:
+    """Measure the delay between the base reaching a goto goal and goto returning."""
+    tolerance = {"delta_x": 0.1, "delta_y": 0.1, "delta_theta": 15, "distance": 0.1}
+    delays: List[float] = []
+    for trial in range(trials):
+        x = 0.3 if trial % 2 == 0 else 0.0
+        handle = mobile_base.goto(x=x, y=0.0, theta=0.0, tolerance=tolerance, wait=False)
+        reached = None
+        while not handle.done():
+            delta_x, delta_y, delta_theta, distance = simulator.model.distance_to_goal()
+            if reached is None and max(abs(delta_x), abs(delta_y), distance) <= 0.1 and abs(delta_theta) <= math.radians(15):
+                reached = time.perf_counter()
+            time.sleep(0.001)
+        done = time.perf_counter()
+        if handle.result().arrived and reached is not None:
+            delays.append(done - reached)
+
+    if not delays:
+        return {}
+    p50, p95, p99 = np.percentile(delays, [50, 95, 99]) * 1e3
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "trials": len(delays)}
+
+
+def run(iterations: int, latency: float, jitter: float, goto_trials: int) -> Dict[str, object]:
+    """Run all the benchmarks and return the results."""
+    results: Dict[str, object] = {
+        "metadata": {
+            "timestamp": time.time(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "latency": latency,
+            "jitter": jitter,
+        },
+        "benchmarks": {},
+    }
+    benchmarks: Dict[str, object] = results["benchmarks"]
+
+    with MobileBaseSimulator(obstacles=[(1.5, 0.0, 0.2)], latency=latency, jitter=jitter) as simulator:
+        mobile_base = MobileBaseSDK(host="localhost", mobile_base_port=simulator.port)
+        # Closed whatever happens, so that its background threads do not outlive the run.
+        try:
+            calls = {
+                "odometry": lambda: mobile_base.odometry,
+                "battery_voltage": lambda: mobile_base.battery_voltage,
+                "obstacle_detection_status": lambda: mobile_base.lidar.obstacle_detection_status,
+                "set_speed": lambda: mobile_base.set_speed(0.0, 0.0, 0.0),
+                "get_map": mobile_base.lidar.get_map,
+                "get_map_array": mobile_base.lidar.get_map_array,
+            }
+            for name, call in calls.items():
+                benchmarks[name] = measure(call, iterations)
+
+            # Decoding only, without the RPC nor the cache.
+            compressed_map = simulator._compressed_map()
+            benchmarks["map_decode_image"] = measure(lambda: LidarMapCache().image(compressed_map).load(), iterations)
+            benchmarks["map_decode_array"] = measure(lambda: LidarMapCache().array(compressed_map), iterations)
+
+            try:
+                benchmarks["goto_arrival_detection"] = measure_goto_detection(mobile_base, simulator, goto_trials)
+            except Exception as e:
+                benchmarks["goto_arrival_detection"] = {"error": repr(e)}
+        finally:
+            mobile_base.close()
+
+    return results
+
+
+def compare(results: Dict[str, object], baseline: Dict[str, object]) -> None:
+    """Print the relative change of each metric compared with a baseline."""
+    for name, metrics in results["benchmarks"].items():
+        reference = baseline["benchmarks"].get(name, {})
+        for metric, value in metrics.items():
+            if not isinstance(value, float) or not reference.get(metric):
+                continue
+            change = (value - reference[metric]) / reference[metric] * 100
+            print(f"{name:28s} {metric:28s} {reference[metric]:12.4f} -> {value:12.4f} ({change:+.1f}%)")
+
+
+def main() -> None:
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the mobile base SDK against the local simulator.")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated RPC latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Simulated RPC jitter in seconds.")
+    parser.add_argument("--goto-trials", type=int, default=10)
+    parser.add_argument("--output", help="Path of the JSON file to save the results to.")
+    parser.add_argument("--compare", help="Path of a JSON file of previous results to compare with.")
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.latency, args.jitter, args.goto_trials)
+    print(json.dumps(results["benchmarks"], indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,49 @@
 """Mobile base SDK package.
 
 Provides remote access (via socket) to the mobile base of a Reachy robot.
+
+The public classes are imported on first access, so that importing the package does not load gRPC,
+the protobuf modules, NumPy or PIL before they are needed.
 """
-from .mobile_base_sdk import MobileBaseSDK  # noqa: F401
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+# Module defining each public name.
+_LAZY_ATTRIBUTES = {
+    "MobileBaseSDK": ".mobile_base_sdk",
+    "AsyncLidar": ".aio",
+    "AsyncMobileBaseSDK": ".aio",
+    "GotoHandle": ".goto",
+    "GotoResult": ".goto",
+    "OdometryRecorder": ".recorder",
+    "PoseEstimator": ".pose_estimator",
+    "MobileBaseState": ".state",
+    "Fleet": ".fleet",
+    "FleetResult": ".fleet",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+if TYPE_CHECKING:
+    from .aio import AsyncLidar, AsyncMobileBaseSDK  # noqa: F401
+    from .fleet import Fleet, FleetResult  # noqa: F401
+    from .goto import GotoHandle, GotoResult  # noqa: F401
+    from .mobile_base_sdk import MobileBaseSDK  # noqa: F401
+    from .pose_estimator import PoseEstimator  # noqa: F401
+    from .recorder import OdometryRecorder  # noqa: F401
+    from .state import MobileBaseState  # noqa: F401
+
+
+def __getattr__(name: str):
+    """Import the public classes on first access."""
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """List the public classes along with the loaded attributes."""
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
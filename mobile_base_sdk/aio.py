@@ -0,0 +1,338 @@
+"""Asyncio version of the mobile base SDK.
+
+AsyncMobileBaseSDK and AsyncLidar expose the same features as MobileBaseSDK and Lidar but on a grpc.aio
+channel: every call is a coroutine that never blocks the event loop, so one loop can drive many operations
+(or many robots) at once.
+
+    async with AsyncMobileBaseSDK(host="my-reachy-ip") as mobile_base:
+        print(await mobile_base.odometry())
+        await mobile_base.goto(x=0.5, y=0.0, theta=0.0)
+"""
+import asyncio
+import time
+from logging import getLogger
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import grpc
+from google.protobuf.empty_pb2 import Empty
+from google.protobuf.wrappers_pb2 import BoolValue, FloatValue
+from reachy2_sdk_api import mobile_base_lidar_pb2_grpc as lidar_pb2_grpc
+from reachy2_sdk_api import mobile_base_mobility_pb2_grpc as mob_pb2_grpc
+from reachy2_sdk_api import mobile_base_utility_pb2 as util_pb2
+from reachy2_sdk_api import mobile_base_utility_pb2_grpc as util_pb2_grpc
+from reachy2_sdk_api.mobile_base_lidar_pb2 import LidarObstacleDetectionEnum, LidarSafety
+
+from .goto import ConvergenceMonitor, GotoResult
+from .metrics import AsyncMetricsInterceptor, RpcMetrics
+from .mobile_base_sdk import (
+    GOTO_STALL_CHECK,
+    GOTO_STALL_TIMEOUT,
+    _check_goto_limits,
+    _check_speed_limits,
+    _direction_command,
+    _distance_from_response,
+    _goto_command,
+    _odometry_from_response,
+    _settable_modes,
+)
+
+
+class AsyncLidar:
+    """Asyncio LIDAR class for mobile base SDK."""
+
+    def __init__(self, grpc_channel: grpc.aio.Channel) -> None:
+        """Initialize the LIDAR class. Safety values are fetched by update_safety_info."""
+        self._stub = lidar_pb2_grpc.MobileBaseLidarServiceStub(grpc_channel)
+        # Created on the first map, so that NumPy and PIL are only loaded when a map is requested.
+        self._map_cache = None
+
+        self._safety_distance: Optional[float] = None
+        self._critical_distance: Optional[float] = None
+        self._safety_enabled: Optional[bool] = None
+
+    def __repr__(self) -> str:
+        """Clean representation of a Reachy."""
+        return f"""<AsyncLidar safety_enabled={self.safety_enabled}>"""
+
+    async def get_map(self):
+        """Get the current map of the environment.
+
+        The map is decoded in the default executor so that the event loop is not blocked.
+        """
+        compressed_map = (await self._stub.GetLidarMap(Empty())).data
+        self.map = await asyncio.get_running_loop().run_in_executor(None, self._get_map_cache().image, compressed_map)
+        return self.map
+
+    async def get_map_array(self):
+        """Get the current map of the environment as a read-only NumPy array.
+
+        The array is reused as long as the map does not change: copy it to keep it.
+        """
+        compressed_map = (await self._stub.GetLidarMap(Empty())).data
+        return await asyncio.get_running_loop().run_in_executor(None, self._get_map_cache().array, compressed_map)
+
+    def _get_map_cache(self):
+        if self._map_cache is None:
+            from .lidar_map import LidarMapCache
+
+            self._map_cache = LidarMapCache()
+        return self._map_cache
+
+    async def update_safety_info(self) -> None:
+        """Fetch the safety values from the mobile base."""
+        response = await self._stub.GetZuuuSafety(Empty())
+        self._safety_distance = round(response.safety_distance.value, 2)
+        self._critical_distance = round(response.critical_distance.value, 2)
+        self._safety_enabled = response.safety_on.value
+
+    @property
+    def safety_slowdown_distance(self) -> Optional[float]:
+        """Safety distance in meters of the mobile base from obstacles, as of the last update."""
+        return self._safety_distance
+
+    @property
+    def safety_critical_distance(self) -> Optional[float]:
+        """Critical distance in meters of the mobile base from obstacles, as of the last update."""
+        return self._critical_distance
+
+    @property
+    def safety_enabled(self) -> Optional[bool]:
+        """Whether the safety feature is enabled, as of the last update."""
+        return self._safety_enabled
+
+    async def configure_safety(
+        self,
+        slowdown_distance: Optional[float] = None,
+        critical_distance: Optional[float] = None,
+        enabled: Optional[bool] = None,
+    ) -> None:
+        """Set the safety values in a single request. Values left to None are kept unchanged."""
+        if None in (self._safety_distance, self._critical_distance, self._safety_enabled):
+            await self.update_safety_info()
+        await self._stub.SetZuuuSafety(
+            LidarSafety(
+                safety_distance=FloatValue(value=self._safety_distance if slowdown_distance is None else slowdown_distance),
+                critical_distance=FloatValue(
+                    value=self._critical_distance if critical_distance is None else critical_distance
+                ),
+                safety_on=BoolValue(value=self._safety_enabled if enabled is None else enabled),
+            )
+        )
+        await self.update_safety_info()
+
+    async def obstacle_detection_status(self) -> str:
+        """Get status of the lidar obstacle detection.
+
+        Can be either NO_OBJECT_DETECTED, OBJECT_DETECTED_SLOWDOWN, OBJECT_DETECTED_STOP or DETECTION_ERROR.
+        """
+        response = await self._stub.GetZuuuSafety(Empty())
+        return LidarObstacleDetectionEnum.Name(response.obstacle_detection_status.status)
+
+    async def reset_safety_default_values(self) -> None:
+        """Reset default distances values for safety detection."""
+        await self.configure_safety(slowdown_distance=0.7, critical_distance=0.55)
+
+
+class AsyncMobileBaseSDK:
+    """Asyncio version of MobileBaseSDK.
+
+    The instance should be created from within the event loop that will use it. The initial state of
+    the base is fetched by connect, which is called automatically when used as an async context manager.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        mobile_base_port: int = 50051,
+        metrics: bool = False,
+        options: Optional[Sequence[Tuple[str, Any]]] = None,
+        compression: Optional[grpc.Compression] = None,
+    ) -> None:
+        """Set up the grpc.aio channel with the mobile base.
+
+        If metrics is True, every RPC is recorded in the metrics attribute (an RpcMetrics).
+        options are gRPC channel arguments (keepalive, max message sizes...). compression is the
+        compression algorithm of the channel's requests.
+        """
+        self._logger = getLogger()
+        self._host = host
+        self._mobile_base_port = mobile_base_port
+
+        self.metrics: Optional[RpcMetrics] = RpcMetrics() if metrics else None
+        interceptors = [AsyncMetricsInterceptor(self.metrics)] if self.metrics is not None else None
+        self._grpc_channel = grpc.aio.insecure_channel(
+            f"{self._host}:{self._mobile_base_port}",
+            options=options,
+            compression=compression,
+            interceptors=interceptors,
+        )
+
+        self._utility_stub = util_pb2_grpc.MobileBaseUtilityServiceStub(self._grpc_channel)
+        self._mobility_stub = mob_pb2_grpc.MobileBaseMobilityServiceStub(self._grpc_channel)
+
+        self._drive_mode: Optional[str] = None
+        self._control_mode: Optional[str] = None
+
+        self._max_xy_vel = 1.0
+        self._max_rot_vel = 180.0
+        self._max_xy_goto = 1.0
+
+        self.lidar = AsyncLidar(self._grpc_channel)
+
+    def __repr__(self) -> str:
+        """Clean representation of a mobile base."""
+        return f'<AsyncMobileBase host="{self._host}" drive_mode={self._drive_mode}>'
+
+    async def __aenter__(self) -> "AsyncMobileBaseSDK":
+        """Connect to the mobile base."""
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        """Close the connection with the mobile base."""
+        await self.close()
+
+    async def connect(self) -> None:
+        """Fetch the drive mode, control mode and safety values of the base concurrently."""
+        self._drive_mode, self._control_mode, _ = await asyncio.gather(
+            self._get_drive_mode(),
+            self._get_control_mode(),
+            self.lidar.update_safety_info(),
+        )
+
+    async def close(self) -> None:
+        """Close the grpc channel."""
+        await self._grpc_channel.close()
+
+    async def _get_drive_mode(self) -> str:
+        mode_id = (await self._utility_stub.GetZuuuMode(Empty())).mode
+        return util_pb2.ZuuuModePossiblities.keys()[mode_id].lower()
+
+    async def _get_control_mode(self) -> str:
+        mode_id = (await self._utility_stub.GetControlMode(Empty())).mode
+        return util_pb2.ControlModePossiblities.keys()[mode_id].lower()
+
+    async def battery_voltage(self) -> float:
+        """Return the battery voltage. Battery should be recharged if it reaches 24.5V or below."""
+        return round((await self._utility_stub.GetBatteryLevel(Empty())).level.value, 1)
+
+    async def odometry(self) -> Dict[str, float]:
+        """Return the odometry of the base. x, y are in meters and theta in degree."""
+        return _odometry_from_response(await self._utility_stub.GetOdometry(Empty()))
+
+    async def get_map(self):
+        """Get the current map of the environment from the lidar."""
+        return await self.lidar.get_map()
+
+    async def _set_drive_mode(self, mode: str) -> None:
+        """Set the base's drive mode."""
+        possible_drive_modes = _settable_modes(util_pb2.ZuuuModePossiblities)
+        if mode in possible_drive_modes:
+            req = util_pb2.ZuuuModeCommand(mode=getattr(util_pb2.ZuuuModePossiblities, mode.upper()))
+            await self._utility_stub.SetZuuuMode(req)
+            self._drive_mode = mode
+        else:
+            self._logger.warning(f"Drive mode requested should be in {possible_drive_modes}!")
+
+    async def _set_control_mode(self, mode: str) -> None:
+        """Set the base's control mode."""
+        possible_control_modes = _settable_modes(util_pb2.ControlModePossiblities)
+        if mode in possible_control_modes:
+            req = util_pb2.ControlModeCommand(mode=getattr(util_pb2.ControlModePossiblities, mode.upper()))
+            await self._utility_stub.SetControlMode(req)
+            self._control_mode = mode
+        else:
+            self._logger.warning(f"Control mode requested should be in {possible_control_modes}!")
+
+    async def reset_odometry(self) -> None:
+        """Reset the odometry."""
+        await self._utility_stub.ResetOdometry(Empty())
+        await asyncio.sleep(0.03)
+
+    async def set_speed(self, x_vel: float, y_vel: float, rot_vel: float) -> None:
+        """Send target speed. x_vel, y_vel are in m/s and rot_vel in deg/s for 200ms."""
+        _check_speed_limits(x_vel, y_vel, rot_vel, self._max_xy_vel, self._max_rot_vel)
+        if self._drive_mode != "cmd_vel":
+            await self._set_drive_mode("cmd_vel")
+        await self._mobility_stub.SendDirection(_direction_command(x_vel, y_vel, rot_vel))
+
+    async def goto(
+        self,
+        x: float,
+        y: float,
+        theta: float,
+        timeout: Optional[float] = None,
+        tolerance: dict = {"delta_x": 0.1, "delta_y": 0.1, "delta_theta": 15, "distance": 0.1},
+    ) -> GotoResult:
+        """Send target position and wait until it is reached. x, y are in meters and theta is in degree.
+
+        See MobileBaseSDK.goto for the meaning of timeout and tolerance, and of the returned GotoResult.
+        """
+        if await self.is_off():
+            raise RuntimeError(("Mobile base is off. Goto not sent."))
+        _check_goto_limits(x, y, self._max_xy_goto)
+
+        if not timeout:
+            timeout = 2 * self._max_xy_goto / 0.5
+
+        self._drive_mode = "goto"
+        await self._mobility_stub.SendGoTo(_goto_command(x, y, theta))
+
+        tic = time.time()
+        monitor = ConvergenceMonitor(tolerance)
+        status = "timeout"
+        last_obstacle_check = time.monotonic()
+        while True:
+            response = await self._mobility_stub.DistanceToGoal(Empty())
+            now = time.monotonic()
+            if monitor.update(
+                response.delta_x.value, response.delta_y.value, response.delta_theta.value, response.distance.value, now
+            ):
+                status = "arrived"
+                break
+
+            stalled_for = monitor.time_without_progress(now)
+            # The obstacle detection status is checked at most every GOTO_STALL_CHECK, whatever the polling rate.
+            if stalled_for >= GOTO_STALL_CHECK and now - last_obstacle_check >= GOTO_STALL_CHECK:
+                last_obstacle_check = now
+                if await self.lidar.obstacle_detection_status() == "OBJECT_DETECTED_STOP":
+                    self._logger.warning("Target not reached. Mobile base stopped because of obstacle.")
+                    status = "obstacle"
+                    break
+                if stalled_for >= GOTO_STALL_TIMEOUT:
+                    self._logger.warning("Target not reached. Mobile base stopped making progress.")
+                    status = "stalled"
+                    break
+
+            remaining = timeout - (time.time() - tic)
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(monitor.next_interval(), remaining))
+
+        return GotoResult(
+            arrived=status == "arrived",
+            status=status,
+            distance=_distance_from_response(response),
+            duration=time.time() - tic,
+        )
+
+    async def _distance_to_goto_goal(self) -> Dict[str, float]:
+        return _distance_from_response(await self._mobility_stub.DistanceToGoal(Empty()))
+
+    async def turn_on(self) -> None:
+        """Stop the mobile base immediately by changing its drive mode to 'brake'."""
+        await self._set_drive_mode("brake")
+
+    async def turn_off(self) -> None:
+        """Set the mobile base in free wheel mode."""
+        await self._set_drive_mode("free_wheel")
+
+    async def is_on(self) -> bool:
+        """Return True if the mobile base is not compliant."""
+        self._drive_mode = await self._get_drive_mode()
+        return not self._drive_mode == "free_wheel"
+
+    async def is_off(self) -> bool:
+        """Return True if the mobile base is compliant."""
+        self._drive_mode = await self._get_drive_mode()
+        return self._drive_mode == "free_wheel"
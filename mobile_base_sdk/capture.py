@@ -0,0 +1,373 @@
+"""Capture module for mobile base SDK.
+
+Records the gRPC traffic of the SDK and replays it offline:
+    - TrafficCapture is a client interceptor writing every RPC (method, timing, status, serialized
+      request and response) to a compact append-only binary file, from a background thread
+    - ReplayChannel is a channel serving the recorded responses back, in the recorded order for each
+      method, at the original pace or faster
+
+File format: the FILE_MAGIC header, then records made of a little-endian uint32 length followed by
+that many bytes, starting with a kind byte:
+    - RECORD_METHOD: uint16 method id, then the full method name in UTF-8
+    - RECORD_CALL: uint16 method id, float64 start time (seconds since the epoch), float32 latency
+      (seconds), uint8 status code, uint32 request size, then the request and response bytes
+"""
+import queue
+import struct
+import threading
+import time
+from collections import deque
+from logging import getLogger
+from typing import Deque, Dict, Iterator, NamedTuple, Optional
+
+import grpc
+
+FILE_MAGIC = b"MBCAP\x00\x01\n"
+RECORD_METHOD = 0
+RECORD_CALL = 1
+
+_LENGTH = struct.Struct("<I")
+_METHOD = struct.Struct("<BH")
+_CALL = struct.Struct("<BHdfBI")
+_STATUS_CODES = {code.value[0]: code for code in grpc.StatusCode}
+
+
+class CapturedCall(NamedTuple):
+    """RPC read from a capture file. request and response are serialized protobuf messages."""
+
+    method: str
+    timestamp: float
+    latency: float
+    code: grpc.StatusCode
+    request: bytes
+    response: bytes
+
+
+class TrafficCapture(grpc.UnaryUnaryClientInterceptor):
+    """Client interceptor writing the RPCs of a channel to a capture file.
+
+    Calls are queued and written by a background thread, so an RPC never waits on the disk. At most
+    max_queue calls are queued: calls made while the queue is full are dropped and counted in dropped.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10000) -> None:
+        """Create (or truncate) the capture file and start the writer thread."""
+        self._logger = getLogger()
+        self._file = open(path, "wb")
+        self._file.write(FILE_MAGIC)
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_queue)
+        self._method_ids: Dict[str, int] = {}
+        self._closed = False
+        self.captured = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._write_loop, name="mobile-base-capture", daemon=True)
+        self._thread.start()
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        """Queue the call once it is done, blocking calls and futures alike."""
+        method = client_call_details.method
+        if isinstance(method, bytes):
+            method = method.decode()
+        timestamp = time.time()
+        tic = time.perf_counter()
+        outcome = continuation(client_call_details, request)
+
+        def capture(future):
+            latency = time.perf_counter() - tic
+            code = future.code()
+            response = future.result() if code == grpc.StatusCode.OK else None
+            # Messages are serialized by the writer thread, off the path of the RPC.
+            self._put((method, timestamp, latency, code, request, response))
+
+        outcome.add_done_callback(capture)
+        return outcome
+
+    def close(self) -> None:
+        """Write the queued calls and close the file. Later calls are not captured."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+    def __enter__(self) -> "TrafficCapture":
+        """Return the capture."""
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Close the capture."""
+        self.close()
+
+    def _put(self, call: tuple) -> None:
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(call)
+        except queue.Full:
+            if not self.dropped:
+                self._logger.warning("Capture queue is full, calls are dropped.")
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        while True:
+            calls = [self._queue.get()]
+            # Write everything queued meanwhile before flushing.
+            while True:
+                try:
+                    calls.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            done = calls[-1] is None
+            try:
+                for call in calls:
+                    if call is not None:
+                        self._write_call(*call)
+                self._file.flush()
+            except Exception as e:
+                self._logger.warning(f"Could not write to the capture file: {e}")
+            if done:
+                return
+
+    def _write_call(self, method: str, timestamp: float, latency: float, code: grpc.StatusCode, request, response) -> None:
+        method_id = self._method_ids.get(method)
+        if method_id is None:
+            method_id = self._method_ids[method] = len(self._method_ids)
+            name = method.encode()
+            self._file.write(_LENGTH.pack(_METHOD.size + len(name)) + _METHOD.pack(RECORD_METHOD, method_id) + name)
+        request_bytes = request.SerializeToString()
+        response_bytes = response.SerializeToString() if response is not None else b""
+        header = _CALL.pack(RECORD_CALL, method_id, timestamp, latency, code.value[0], len(request_bytes))
+        self._file.write(_LENGTH.pack(len(header) + len(request_bytes) + len(response_bytes)))
+        self._file.write(header + request_bytes + response_bytes)
+        self.captured += 1
+
+
+def read_capture(path: str) -> Iterator[CapturedCall]:
+    """Yield the calls of a capture file, in the order they ended. A truncated last record is ignored."""
+    with open(path, "rb") as f:
+        if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"{path} is not a capture file!")
+        methods: Dict[int, str] = {}
+        while True:
+            length = f.read(_LENGTH.size)
+            if len(length) < _LENGTH.size:
+                return
+            size = _LENGTH.unpack(length)[0]
+            record = f.read(size)
+            if len(record) < size:
+                return
+            if record[0] == RECORD_METHOD:
+                _, method_id = _METHOD.unpack_from(record)
+                methods[method_id] = record[_METHOD.size:].decode()
+            elif record[0] == RECORD_CALL:
+                _, method_id, timestamp, latency, code, request_size = _CALL.unpack_from(record)
+                request_end = _CALL.size + request_size
+                yield CapturedCall(
+                    method=methods[method_id],
+                    timestamp=timestamp,
+                    latency=latency,
+                    code=_STATUS_CODES[code],
+                    request=record[_CALL.size:request_end],
+                    response=record[request_end:],
+                )
+
+
+class ReplayError(grpc.RpcError, grpc.Call):
+    """Error of a replayed call: either the recorded error, or no recorded call left."""
+
+    def __init__(self, code: grpc.StatusCode, details: str) -> None:
+        """Create the error with its status code and details."""
+        super().__init__(details)
+        self._code = code
+        self._details = details
+
+    def code(self) -> grpc.StatusCode:
+        """Return the status code of the call."""
+        return self._code
+
+    def details(self) -> str:
+        """Return the details of the error."""
+        return self._details
+
+    def initial_metadata(self):
+        """Return no metadata."""
+        return ()
+
+    def trailing_metadata(self):
+        """Return no metadata."""
+        return ()
+
+    def is_active(self) -> bool:
+        """Return False, the call is over."""
+        return False
+
+    def time_remaining(self):
+        """Return None, the call is over."""
+        return None
+
+    def cancel(self) -> bool:
+        """Return False, the call is over."""
+        return False
+
+    def add_callback(self, callback) -> bool:
+        """Return False, the call is over."""
+        return False
+
+
+class ReplayChannel(grpc.Channel):
+    """Channel serving the calls of a capture file, to use the SDK offline.
+
+    Each call gets the next recorded response of its method. Responses are returned at the pace they
+    were recorded, speed times faster, or right away if speed is None. Requests are not sent anywhere:
+    the ones that differ from the recorded request are counted in mismatches.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0) -> None:
+        """Load the capture file."""
+        if speed is not None and speed <= 0:
+            raise ValueError("speed should be strictly positive!")
+        self._logger = getLogger()
+        self._speed = speed
+        self._calls: Dict[str, Deque[CapturedCall]] = {}
+        first: Optional[float] = None
+        for call in read_capture(path):
+            self._calls.setdefault(call.method, deque()).append(call)
+            first = call.timestamp if first is None else min(first, call.timestamp)
+        self._first_timestamp = first if first is not None else 0.0
+        self._start: Optional[float] = None
+        self._lock = threading.Lock()
+        self.replayed = 0
+        self.mismatches = 0
+
+    @property
+    def remaining(self) -> Dict[str, int]:
+        """Number of recorded calls not replayed yet, by method."""
+        with self._lock:
+            return {method: len(calls) for method, calls in self._calls.items()}
+
+    def unary_unary(self, method, request_serializer=None, response_deserializer=None, _registered_method=False):
+        """Return a callable replaying the calls of method."""
+        return _ReplayMultiCallable(self, method, request_serializer, response_deserializer)
+
+    def unary_stream(self, method, request_serializer=None, response_deserializer=None, _registered_method=False):
+        """Streaming calls are not captured."""
+        raise NotImplementedError("Streaming calls cannot be replayed.")
+
+    def stream_unary(self, method, request_serializer=None, response_deserializer=None, _registered_method=False):
+        """Streaming calls are not captured."""
+        raise NotImplementedError("Streaming calls cannot be replayed.")
+
+    def stream_stream(self, method, request_serializer=None, response_deserializer=None, _registered_method=False):
+        """Streaming calls are not captured."""
+        raise NotImplementedError("Streaming calls cannot be replayed.")
+
+    def subscribe(self, callback, try_to_connect: bool = False) -> None:
+        """Report the channel as ready right away."""
+        callback(grpc.ChannelConnectivity.READY)
+
+    def unsubscribe(self, callback) -> None:
+        """Nothing to unsubscribe from."""
+
+    def close(self) -> None:
+        """Nothing to close."""
+
+    def _replay(self, method: str, request_bytes: bytes) -> CapturedCall:
+        with self._lock:
+            calls = self._calls.get(method)
+            if not calls:
+                raise ReplayError(grpc.StatusCode.OUT_OF_RANGE, f"No recorded call of {method} left to replay.")
+            call = calls.popleft()
+            self.replayed += 1
+            if call.request != request_bytes:
+                self.mismatches += 1
+            if self._start is None:
+                # The replay clock starts with the first call.
+                self._start = time.monotonic() - (call.timestamp - self._first_timestamp) / (self._speed or 1.0)
+
+        if self._speed is not None:
+            # The response is returned when it was received during the capture.
+            due = self._start + (call.timestamp + call.latency - self._first_timestamp) / self._speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        if call.code != grpc.StatusCode.OK:
+            raise ReplayError(call.code, f"Recorded error of {method}.")
+        return call
+
+
+class _ReplayMultiCallable(grpc.UnaryUnaryMultiCallable):
+    def __init__(self, channel: ReplayChannel, method, request_serializer, response_deserializer) -> None:
+        self._channel = channel
+        self._method = method.decode() if isinstance(method, bytes) else method
+        self._serialize = request_serializer or (lambda message: message)
+        self._deserialize = response_deserializer or (lambda data: data)
+
+    def __call__(self, request, timeout=None, metadata=None, credentials=None, wait_for_ready=None, compression=None):
+        call = self._channel._replay(self._method, self._serialize(request))
+        return self._deserialize(call.response)
+
+    def with_call(self, request, timeout=None, metadata=None, credentials=None, wait_for_ready=None, compression=None):
+        response = self(request)
+        return response, _ReplayFuture(response, None)
+
+    def future(self, request, timeout=None, metadata=None, credentials=None, wait_for_ready=None, compression=None):
+        try:
+            return _ReplayFuture(self(request), None)
+        except ReplayError as e:
+            return _ReplayFuture(None, e)
+
+
+class _ReplayFuture(grpc.Future, grpc.Call):
+    """Already completed call, returned by the replayed futures."""
+
+    def __init__(self, response, error: Optional[ReplayError]) -> None:
+        self._response = response
+        self._error = error
+
+    def cancel(self) -> bool:
+        return False
+
+    def cancelled(self) -> bool:
+        return False
+
+    def running(self) -> bool:
+        return False
+
+    def done(self) -> bool:
+        return True
+
+    def result(self, timeout=None):
+        if self._error is not None:
+            raise self._error
+        return self._response
+
+    def exception(self, timeout=None):
+        return self._error
+
+    def traceback(self, timeout=None):
+        return None
+
+    def add_done_callback(self, fn) -> None:
+        fn(self)
+
+    def code(self) -> grpc.StatusCode:
+        return self._error.code() if self._error is not None else grpc.StatusCode.OK
+
+    def details(self) -> str:
+        return self._error.details() if self._error is not None else ""
+
+    def initial_metadata(self):
+        return ()
+
+    def trailing_metadata(self):
+        return ()
+
+    def is_active(self) -> bool:
+        return False
+
+    def time_remaining(self):
+        return None
+
+    def add_callback(self, callback) -> bool:
+        return False
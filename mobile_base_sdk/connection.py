@@ -0,0 +1,142 @@
+"""Connection module for mobile base SDK.
+
+Monitors the connectivity of a gRPC channel and keeps the client in sync with the mobile base:
+    - the state of the base is synchronized in the background once the channel is ready
+    - when the connection is lost or closed by the server, the synchronization is retried with an
+      exponential backoff until the base is reachable again
+    - the client's state is only pushed back to the base after a loss of connection: when the channel
+      merely went idle, the state of the base is fetched again, so that changes made by other clients
+      are kept
+"""
+import random
+import threading
+from logging import getLogger
+from typing import Callable, Optional
+
+import grpc
+
+
+class ConnectionMonitor:
+    """Background synchronization of a client with the mobile base, over a monitored channel.
+
+    sync is called from the monitor thread when the channel first becomes ready, and again after
+    each loss of connection or when the channel comes back from idle. Its restore argument is True
+    if the connection was lost (TRANSIENT_FAILURE or SHUTDOWN) since the last synchronization.
+    If it raises, it is retried after a delay starting at initial_backoff seconds and multiplied by
+    multiplier after each failure, up to max_backoff.
+    """
+
+    def __init__(
+        self,
+        channel: grpc.Channel,
+        sync: Callable[[bool], None],
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        multiplier: float = 2.0,
+    ) -> None:
+        """Set up the monitor. Monitoring starts with the start method."""
+        if initial_backoff <= 0 or max_backoff < initial_backoff or multiplier < 1:
+            raise ValueError("Backoff should be strictly positive, with max_backoff >= initial_backoff and multiplier >= 1!")
+        self._logger = getLogger()
+        self._channel = channel
+        self._sync = sync
+        self._initial_backoff = initial_backoff
+        self._max_backoff = max_backoff
+        self._multiplier = multiplier
+
+        self._state: Optional[grpc.ChannelConnectivity] = None
+        self._synced = threading.Event()
+        self._sync_needed = threading.Event()
+        # True if the connection was lost since the last synchronization.
+        self._restore_needed = False
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # True while waiting before retrying a failed synchronization.
+        self._retrying = False
+        self.reconnections = 0
+
+    @property
+    def state(self) -> Optional[grpc.ChannelConnectivity]:
+        """Last connectivity state of the channel."""
+        return self._state
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the channel is ready and the client is in sync with the base."""
+        return self._state == grpc.ChannelConnectivity.READY and self._synced.is_set()
+
+    def start(self, synced: bool = False) -> None:
+        """Start monitoring the channel. If synced is False, the client is synchronized as soon as possible."""
+        if self._thread is not None:
+            return
+        if synced:
+            self._synced.set()
+        else:
+            self._sync_needed.set()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sync_loop, name="mobile-base-connection", daemon=True)
+        self._thread.start()
+        self._channel.subscribe(self._on_state_change, try_to_connect=True)
+
+    def stop(self) -> None:
+        """Stop monitoring the channel."""
+        if self._thread is None:
+            return
+        self._channel.unsubscribe(self._on_state_change)
+        self._stop_event.set()
+        self._sync_needed.set()
+        self._thread.join()
+        self._thread = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the client is in sync with the base. Return False if timeout elapsed before."""
+        return self._synced.wait(timeout)
+
+    def _on_state_change(self, state: grpc.ChannelConnectivity) -> None:
+        previous, self._state = self._state, state
+        if state in (grpc.ChannelConnectivity.TRANSIENT_FAILURE, grpc.ChannelConnectivity.SHUTDOWN):
+            if self._synced.is_set():
+                self._logger.warning(f"Connection with the mobile base lost ({state.name}).")
+            self._synced.clear()
+            self._restore_needed = True
+            self._sync_needed.set()
+        elif state == grpc.ChannelConnectivity.IDLE and previous == grpc.ChannelConnectivity.READY:
+            # The server closed the connection (e.g. it restarted), or the channel was idle for too long: the
+            # state of the base is fetched again. If the base is actually down, reconnecting fails and the state
+            # is restored once it is back.
+            self._logger.debug("Connection with the mobile base went idle.")
+            self._synced.clear()
+            self._sync_needed.set()
+        elif state == grpc.ChannelConnectivity.READY and self._retrying:
+            # Retry right away rather than at the end of the current backoff.
+            self._sync_needed.set()
+
+    def _sync_loop(self) -> None:
+        backoff = self._initial_backoff
+        first = not self._synced.is_set()
+        while not self._stop_event.is_set():
+            self._sync_needed.wait()
+            if self._stop_event.is_set():
+                break
+            self._sync_needed.clear()
+            restore, self._restore_needed = self._restore_needed, False
+            try:
+                grpc.channel_ready_future(self._channel).result(timeout=backoff)
+                self._sync(restore)
+            except Exception as e:
+                self._logger.debug(f"Could not synchronize with the mobile base, retrying in {backoff:.1f}s: {e!r}")
+                self._restore_needed = self._restore_needed or restore
+                # Full jitter spreads the retries of many clients reconnecting at once.
+                self._retrying = True
+                self._sync_needed.wait(random.uniform(0.0, backoff))
+                self._retrying = False
+                backoff = min(backoff * self._multiplier, self._max_backoff)
+                self._sync_needed.set()
+                continue
+
+            if restore and not first:
+                self.reconnections += 1
+                self._logger.info("Connection with the mobile base restored.")
+            first = False
+            backoff = self._initial_backoff
+            self._synced.set()
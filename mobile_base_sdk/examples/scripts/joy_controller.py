@@ -1,13 +1,12 @@
 # flake8: noqa
 import math
-import sys
 import time
 import traceback
-from signal import SIGINT, signal
 
 import pygame
 
 from mobile_base_sdk import MobileBaseSDK
+from mobile_base_sdk.teleop import AxisMapping, TeleopEngine, TeleopMapping
 
 # To be able to use pygame in "headless" mode, typically if there is no screen connected,
 # set SDL to use the dummy NULL video driver, so it doesn't need a windowing system:
@@ -15,7 +14,7 @@ from mobile_base_sdk import MobileBaseSDK
 # os.environ["SDL_VIDEODRIVER"] = "dummy"
 
 msg = """
-This program takes inputs from a controller and sets speeds to the mobile base. 
+This program takes inputs from a controller and sets speeds to the mobile base.
 
 Tested on a SONY Dual shock 4 controller
 and an XBOX controller.
@@ -59,12 +58,13 @@ CTRL-C  or press CIRCLE on the controller to quit
 # When using the XBOX controller, most of it is the same,
 # except that you must use Start and Back to increase the max speeds.
 
-
-def sign(x):
-    if x >= 0:
-        return 1
-    else:
-        return -1
+# The speeds are sent by a TeleopEngine from its own thread, at a fixed rate: a slow RPC never delays
+# the reading of the controller. If no input reaches the engine for INPUT_TIMEOUT seconds (e.g. this
+# loop is stuck), the base is stopped.
+OUTPUT_RATE_HZ = 20.0
+INPUT_TIMEOUT = 0.5
+# While the joysticks are held still, no event comes: the current state is sent again after this delay.
+INPUT_REFRESH_MS = 100
 
 
 class JoyController:
@@ -80,77 +80,71 @@ class JoyController:
         # The joyticks dont come back at a perfect 0 position when released.
         # Any abs(value) below min_joy_position will be assumed to be 0
         self.min_joy_position = 0.03
+        self.running = True
 
         print(msg)
         ip_address = "192.168.86.35"  # Replace with your Reachy's IP address
         print(f"Connecting to {ip_address}")
         self.mobile_base = MobileBaseSDK(ip_address)
+        self.teleop = TeleopEngine(
+            self.mobile_base, mapping=self.mapping(), output_rate_hz=OUTPUT_RATE_HZ, input_timeout=INPUT_TIMEOUT
+        )
 
-        def emergency_shutdown_(signal_received, frame):
-            self.emergency_shutdown("SIGINT received")
-
-        # Tell Python to run the emergency_shutdown() function when SIGINT is recieved
-        signal(SIGINT, emergency_shutdown_)
         print("Connected!")
         self.nb_joy = pygame.joystick.get_count()
         if self.nb_joy < 1:
-            self.emergency_shutdown("No controller detected.")
+            self.mobile_base.close()
+            raise RuntimeError("No controller detected.")
         print("nb joysticks: {}".format(self.nb_joy))
         self.j = pygame.joystick.Joystick(0)
 
-    def emergency_shutdown(self, msg=""):
-        # Calling the emergency_shutdown() method is an option but it seems excessive in the controller use case
-        # self.mobile_base.emergency_shutdown()
-        # Instead, we set the speeds to 0
-        self.mobile_base.set_speed(x_vel=0.0, y_vel=0.0, rot_vel=0.0)
-        print("Emergency shutdown. Setting speeds to 0")
+    def mapping(self):
+        # Speeds are in m/s and deg/s for the mobile base.
+        cycle_max_t = self.lin_speed_ratio
+        cycle_max_r = math.degrees(self.rot_speed_ratio)
+        return TeleopMapping(
+            x_vel=AxisMapping(axis=1, scale=-cycle_max_t, deadzone=self.min_joy_position),
+            y_vel=AxisMapping(axis=0, scale=-cycle_max_t, deadzone=self.min_joy_position),
+            rot_vel=AxisMapping(axis=3, scale=-cycle_max_r, deadzone=self.min_joy_position),
+        )
 
-        raise RuntimeError(msg)
+    def set_speed_ratios(self, lin_speed_ratio, rot_speed_ratio):
+        self.lin_speed_ratio = lin_speed_ratio
+        self.rot_speed_ratio = rot_speed_ratio
+        self.teleop.mapping = self.mapping()
+        print(
+            "max translational speed: {:.2f}m/s, max rotational speed: {:.1f}rad/s".format(
+                self.lin_speed_ratio, self.rot_speed_ratio
+            )
+        )
+
+    def quit(self, msg=""):
+        print(msg)
+        self.running = False
+
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            self.quit("Normal pygame quit")
+        elif event.type == pygame.JOYBUTTONDOWN:
+            if event.button == 1:
+                self.quit("Pressed emergency stop!")
+            elif event.button == 6:  # l2
+                self.set_speed_ratios(min(3.0, self.lin_speed_ratio + 0.05), self.rot_speed_ratio)
+            elif event.button == 7:  # r2
+                self.set_speed_ratios(self.lin_speed_ratio, min(12.0, self.rot_speed_ratio + 0.2))
+            elif event.button == 4:  # l1
+                self.set_speed_ratios(max(0.0, self.lin_speed_ratio - 0.05), self.rot_speed_ratio)
+            elif event.button == 5:  # r1
+                self.set_speed_ratios(self.lin_speed_ratio, max(0.0, self.rot_speed_ratio - 0.2))
 
     def tick_controller(self):
+        # Wait for the controller to change rather than polling it at a fixed pace.
+        self.handle_event(pygame.event.wait(INPUT_REFRESH_MS))
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.emergency_shutdown("Normal pygame quit")
-            elif event.type == pygame.JOYBUTTONDOWN:
-                if self.j.get_button(1):
-                    msg = "Pressed emergency stop!"
-                    print(msg)
-                    self.emergency_shutdown(msg)
-                if self.j.get_button(6):  # l2
-                    self.lin_speed_ratio = min(3.0, self.lin_speed_ratio + 0.05)
-                    print(
-                        "max translational speed: {:.1f}m/s, max rotational speed: {:.1f}rad/s".format(
-                            self.lin_speed_ratio * 100, self.rot_speed_ratio * 100
-                        )
-                    )
-                if self.j.get_button(7):  # r2
-                    self.rot_speed_ratio = min(12.0, self.rot_speed_ratio + 0.2)
-                    print(
-                        "max translational speed: {:.1f}m/s, max rotational speed: {:.1f}rad/s".format(
-                            self.lin_speed_ratio * 100, self.rot_speed_ratio * 100
-                        )
-                    )
-                if self.j.get_button(4):  # l1
-                    self.lin_speed_ratio = max(0.0, self.lin_speed_ratio - 0.05)
-                    print(
-                        "max translational speed: {:.1f}m/s, max rotational speed: {:.1f}rad/s".format(
-                            self.lin_speed_ratio * 100, self.rot_speed_ratio * 100
-                        )
-                    )
-                if self.j.get_button(5):  # r1
-                    self.rot_speed_ratio = max(0.0, self.rot_speed_ratio - 0.2)
-                    print(
-                        "max translational speed: {:.1f}m/s, max rotational speed: {:.1f}rad/s".format(
-                            self.lin_speed_ratio * 100, self.rot_speed_ratio * 100
-                        )
-                    )
-            elif event.type == pygame.JOYBUTTONUP:
-                pass
+            self.handle_event(event)
 
         if self.nb_joy != pygame.joystick.get_count():
-            msg = "Controller disconnected!"
-            print(msg)
-            self.emergency_shutdown(msg)
+            self.quit("Controller disconnected!")
 
     def rumble(self, duration):
         self.rumble_start = time.time()
@@ -180,52 +174,42 @@ class JoyController:
             button = self.j.get_button(i)
             print("Button {:>2} value: {}".format(i, button))
 
-    def speeds_from_joystick(self):
-        cycle_max_t = self.lin_speed_ratio  # 0.2*factor
-        cycle_max_r = self.rot_speed_ratio  # 0.1*factor
-
-        if abs(self.j.get_axis(1)) < self.min_joy_position:
-            x = 0.0
-        else:
-            x = -self.j.get_axis(1) * cycle_max_t
-
-        if abs(self.j.get_axis(0)) < self.min_joy_position:
-            y = 0.0
-        else:
-            y = -self.j.get_axis(0) * cycle_max_t
-
-        if abs(self.j.get_axis(3)) < self.min_joy_position:
-            rot = 0.0
-        else:
-            rot = -self.j.get_axis(3) * cycle_max_r
-
-        return x, y, rot
-
     def main_tick(self):
         self.tick_controller()
-        x_vel, y_vel, rot_vel = self.speeds_from_joystick()
-        self.mobile_base.set_speed(x_vel=x_vel, y_vel=y_vel, rot_vel=rot_vel * 180.0 / math.pi)
-
+        if not self.running:
+            return
+        # Only the latest state is sent by the engine: all the events received above are coalesced.
+        axes = [self.j.get_axis(i) for i in range(self.j.get_numaxes())]
+        buttons = [bool(self.j.get_button(i)) for i in range(self.j.get_numbuttons())]
+        self.teleop.push_input(axes, buttons)
+
+    def run(self):
+        # Leaving the engine sends a null velocity.
+        with self.teleop:
+            while self.running:
+                self.main_tick()
+
+    def print_stats(self):
+        stats = self.teleop.stats()
         print(
-            "\nx_vel: {:.2f}m/s, y_vel: {:.2f}m/s, theta_vel: {:.2f}rad/s.\n"
-            "Max lin_vel: {:.2f}m/s, max rot_vel: {:.2f}rad/s".format(
-                x_vel, y_vel, rot_vel, self.lin_speed_ratio, self.rot_speed_ratio
+            "{} commands sent, input to command latency: {:.0f}ms (p95 {:.0f}ms, max {:.0f}ms)".format(
+                stats.commands, stats.latency_mean * 1e3, stats.latency_p95 * 1e3, stats.latency_max * 1e3
             )
         )
-        # self.print_controller()
-        time.sleep(0.01)
 
 
 def main():
     controller = JoyController()
 
     try:
-        while True:
-            controller.main_tick()
-    except Exception as e:
+        controller.run()
+    except KeyboardInterrupt:
+        print("SIGINT received")
+    except Exception:
         traceback.print_exc()
     finally:
-        controller.emergency_shutdown()
+        controller.print_stats()
+        controller.mobile_base.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+"""Fleet module for mobile base SDK.
+
+Controls many mobile bases from a single event loop:
+    - one AsyncMobileBaseSDK (and one grpc.aio channel) per base, no thread per base
+    - batched operations fanned out concurrently to the bases, with a timeout per base
+    - per-base results and errors, so that a slow or unreachable base does not block the others
+
+    async with Fleet({"base_1": "10.0.0.11", "base_2": "10.0.0.12"}) as fleet:
+        print(await fleet.odometry())
+        await fleet.goto({"base_1": (0.5, 0.0, 0.0), "base_2": (0.0, 0.5, 90.0)})
+"""
+import asyncio
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import grpc
+
+from .aio import AsyncMobileBaseSDK
+
+# Channel arguments suited to long-lived connections with many bases: keepalive pings detect dead
+# connections without waiting for a call to fail, and the receive limit leaves room for large maps.
+FLEET_CHANNEL_OPTIONS = (
+    ("grpc.keepalive_time_ms", 10000),
+    ("grpc.keepalive_timeout_ms", 5000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.max_receive_message_length", 16 * 1024 * 1024),
+    ("grpc.max_send_message_length", 4 * 1024 * 1024),
+)
+
+
+class FleetResult(NamedTuple):
+    """Outcome of a fleet operation: the result of each base that succeeded and the error of each that failed."""
+
+    results: Dict[str, Any]
+    errors: Dict[str, BaseException]
+
+    @property
+    def ok(self) -> bool:
+        """Return True if the operation succeeded on every base."""
+        return not self.errors
+
+
+class Fleet:
+    """Group of mobile bases controlled from one event loop.
+
+    bases maps the name of each base to its host, or to a (host, port) pair. The instance should be
+    created from within the event loop that will use it. Each batched operation runs concurrently on
+    the selected bases (all of them by default), with at most timeout seconds per base, and returns
+    a FleetResult.
+    """
+
+    def __init__(
+        self,
+        bases: Dict[str, Union[str, Tuple[str, int]]],
+        timeout: float = 2.0,
+        options: Sequence[Tuple[str, Any]] = FLEET_CHANNEL_OPTIONS,
+        compression: Optional[grpc.Compression] = None,
+        metrics: bool = False,
+    ) -> None:
+        """Set up one channel per base. The bases are contacted by connect."""
+        if not bases:
+            raise ValueError("A fleet should have at least one mobile base!")
+        self._logger = getLogger()
+        self._timeout = timeout
+        self.bases: Dict[str, AsyncMobileBaseSDK] = {}
+        for name, address in bases.items():
+            host, port = (address, 50051) if isinstance(address, str) else address
+            self.bases[name] = AsyncMobileBaseSDK(
+                host,
+                mobile_base_port=port,
+                metrics=metrics,
+                options=options,
+                compression=compression,
+            )
+        self._goto_tasks: Dict[str, asyncio.Task] = {}
+
+    def __repr__(self) -> str:
+        """Clean representation of a fleet."""
+        return f"<Fleet bases={list(self.bases)}>"
+
+    def __getitem__(self, name: str) -> AsyncMobileBaseSDK:
+        """Return the mobile base of the given name."""
+        return self.bases[name]
+
+    async def __aenter__(self) -> "Fleet":
+        """Connect to the mobile bases. Bases that cannot be reached are logged, not raised."""
+        result = await self.connect()
+        for name, error in result.errors.items():
+            self._logger.warning(f"Could not connect to mobile base {name}: {error!r}")
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        """Close the connections with the mobile bases."""
+        await self.close()
+
+    async def connect(self, names: Optional[Iterable[str]] = None) -> FleetResult:
+        """Fetch the initial state of the bases."""
+        return await self._fan_out(names, lambda base, _: base.connect(), self._timeout)
+
+    async def close(self) -> None:
+        """Cancel the running gotos and close all the channels."""
+        for task in self._goto_tasks.values():
+            task.cancel()
+        await asyncio.gather(*(base.close() for base in self.bases.values()), return_exceptions=True)
+
+    async def odometry(self, names: Optional[Iterable[str]] = None) -> FleetResult:
+        """Return the odometry of the bases."""
+        return await self._fan_out(names, lambda base, _: base.odometry(), self._timeout)
+
+    async def battery_voltage(self, names: Optional[Iterable[str]] = None) -> FleetResult:
+        """Return the battery voltage of the bases."""
+        return await self._fan_out(names, lambda base, _: base.battery_voltage(), self._timeout)
+
+    async def obstacle_detection_status(self, names: Optional[Iterable[str]] = None) -> FleetResult:
+        """Return the lidar obstacle detection status of the bases."""
+        return await self._fan_out(names, lambda base, _: base.lidar.obstacle_detection_status(), self._timeout)
+
+    async def set_speed(self, velocities: Dict[str, Tuple[float, float, float]]) -> FleetResult:
+        """Send a (x_vel, y_vel, rot_vel) target speed to each base of velocities."""
+        return await self._fan_out(velocities, lambda base, name: base.set_speed(*velocities[name]), self._timeout)
+
+    async def goto(
+        self,
+        goals: Dict[str, Tuple[float, float, float]],
+        timeout: Optional[float] = None,
+        tolerance: dict = {"delta_x": 0.1, "delta_y": 0.1, "delta_theta": 15, "distance": 0.1},
+    ) -> FleetResult:
+        """Send a (x, y, theta) goal to each base of goals and wait until all the gotos are over.
+
+        The result of each base is its GotoResult. timeout is the timeout of each goto, see
+        MobileBaseSDK.goto. A new goto of a base cancels its running one, stop_all cancels all of them.
+        """
+        for name in goals:
+            task = self._goto_tasks.pop(name, None)
+            if task is not None:
+                task.cancel()
+
+        async def goto(base: AsyncMobileBaseSDK, name: str):
+            task = asyncio.ensure_future(base.goto(*goals[name], timeout=timeout, tolerance=tolerance))
+            self._goto_tasks[name] = task
+            # The goto ends by itself after its timeout, the fleet timeout only adds a margin for its RPCs.
+            goto_timeout = timeout if timeout else 2 * base._max_xy_goto / 0.5
+            try:
+                return await asyncio.wait_for(task, goto_timeout + self._timeout)
+            finally:
+                if self._goto_tasks.get(name) is task:
+                    del self._goto_tasks[name]
+
+        return await self._fan_out(goals, goto, None)
+
+    async def stop_all(self, names: Optional[Iterable[str]] = None) -> FleetResult:
+        """Cancel the running gotos and brake the bases."""
+        names = list(self.bases) if names is None else list(names)
+        for name in names:
+            task = self._goto_tasks.pop(name, None)
+            if task is not None:
+                task.cancel()
+        return await self._fan_out(names, lambda base, _: base.turn_on(), self._timeout)
+
+    async def _fan_out(
+        self,
+        names: Optional[Iterable[str]],
+        operation: Callable[[AsyncMobileBaseSDK, str], Awaitable[Any]],
+        timeout: Optional[float],
+    ) -> FleetResult:
+        """Run operation(base, name) concurrently on the bases and gather the results and errors of each."""
+        names = list(self.bases) if names is None else list(names)
+        for name in names:
+            if name not in self.bases:
+                raise ValueError(f"Unknown mobile base {name}, should be in {list(self.bases)}!")
+
+        async def run(name: str):
+            return await asyncio.wait_for(operation(self.bases[name], name), timeout)
+
+        outcomes: List[Any] = await asyncio.gather(*(run(name) for name in names), return_exceptions=True)
+        results, errors = {}, {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, BaseException):
+                errors[name] = outcome
+            else:
+                results[name] = outcome
+        return FleetResult(results=results, errors=errors)
@@ -0,0 +1,226 @@
+"""Goto module for mobile base SDK.
+
+Handles the result of goto calls:
+    - GotoResult describes how a goto ended
+    - GotoHandle follows a goto running in the background, and can cancel it
+    - ConvergenceMonitor decides when to poll the distance to the goal and when the goto is over
+"""
+import math
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from logging import getLogger
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+class GotoResult(NamedTuple):
+    """Outcome of a goto.
+
+    status is either "arrived", "timeout", "obstacle", "stalled" (no progress without any obstacle),
+    "cancelled" (by the user) or "preempted" (by a newer goal). distance is the last distance to the goal received, if any.
+    """
+
+    arrived: bool
+    status: str
+    distance: Optional[Dict[str, float]]
+    duration: float
+
+
+class GotoHandle:
+    """Handle on a goto running in the background.
+
+    Returned by MobileBaseSDK.goto(..., wait=False). The goal is followed until it is reached, the
+    timeout is elapsed, the goto is cancelled or a new goal preempts it.
+    """
+
+    def __init__(self, goal: Dict[str, float], convert_distance: Optional[Callable[[Any], Dict[str, float]]] = None) -> None:
+        """Create the handle of a goto towards goal. The goto future is attached afterwards.
+
+        convert_distance turns the raw distances reported by the goto into distance dicts.
+        """
+        self._logger = getLogger()
+        self.goal = goal
+        self._start = time.time()
+        self._future: Optional[Future] = None
+        self._cancel_reason: Optional[str] = None
+        self._last_distance: Optional[Dict[str, float]] = None
+        self._raw_distance: Any = None
+        self._convert_distance = convert_distance
+        self._progress_callbacks: List[Callable[[Dict[str, float]], None]] = []
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        """Clean representation of a goto handle."""
+        return f"<GotoHandle goal={self.goal} status={self.status}>"
+
+    def _set_future(self, future: Future) -> None:
+        with self._lock:
+            self._future = future
+            cancel = self._cancel_reason is not None
+        if cancel:
+            future.cancel()
+
+    @property
+    def status(self) -> str:
+        """Current status of the goto: "running", "failed" or the status of its result."""
+        if self._cancel_reason is not None:
+            return self._cancel_reason
+        if self._future is None or not self._future.done():
+            return "running"
+        if self._future.exception() is not None:
+            return "failed"
+        return self._future.result().status
+
+    @property
+    def last_distance(self) -> Optional[Dict[str, float]]:
+        """Last distance to the goal received."""
+        if self._last_distance is None and self._raw_distance is not None:
+            self._last_distance = self._convert_distance(self._raw_distance)
+        return self._last_distance
+
+    def done(self) -> bool:
+        """Return True if the goto is over."""
+        return self._cancel_reason is not None or (self._future is not None and self._future.done())
+
+    def cancel(self) -> bool:
+        """Cancel the goto and stop the mobile base. Return False if the goto was already over."""
+        return self._cancel("cancelled")
+
+    def _preempt(self) -> bool:
+        return self._cancel("preempted")
+
+    def _cancel(self, reason: str) -> bool:
+        with self._lock:
+            if self.done():
+                return False
+            self._cancel_reason = reason
+            future = self._future
+        if future is not None:
+            future.cancel()
+        return True
+
+    def result(self, timeout: Optional[float] = None) -> GotoResult:
+        """Wait for the end of the goto and return its result.
+
+        Raise concurrent.futures.TimeoutError if the goto is not over after timeout seconds,
+        or the exception raised by the goto if it failed.
+        """
+        if self._future is None:
+            raise RuntimeError("Goto was not started.")
+        try:
+            return self._future.result(timeout)
+        except CancelledError:
+            return GotoResult(
+                arrived=False,
+                status=self._cancel_reason or "cancelled",
+                distance=self.last_distance,
+                duration=time.time() - self._start,
+            )
+
+    def add_done_callback(self, callback: Callable[["GotoHandle"], None]) -> None:
+        """Call callback with the handle once the goto is over."""
+        if self._future is None:
+            raise RuntimeError("Goto was not started.")
+        self._future.add_done_callback(lambda _: callback(self))
+
+    def add_progress_callback(self, callback: Callable[[Dict[str, float]], None]) -> None:
+        """Call callback with the distance to the goal each time it is received.
+
+        Callbacks are run in the SDK's worker thread and should return quickly.
+        """
+        self._progress_callbacks.append(callback)
+
+    def _report_raw_progress(self, raw_distance: Any) -> None:
+        # The distance dict is only built when a callback needs it or when it is read.
+        if self._progress_callbacks:
+            self._report_progress(self._convert_distance(raw_distance))
+        else:
+            self._raw_distance = raw_distance
+            self._last_distance = None
+
+    def _report_progress(self, distance: Dict[str, float]) -> None:
+        self._raw_distance = None
+        self._last_distance = distance
+        for callback in self._progress_callbacks:
+            try:
+                callback(distance)
+            except Exception as e:
+                self._logger.warning(f"Goto progress callback failed: {e}")
+
+
+class ConvergenceMonitor:
+    """Adaptive arrival detection of a goto.
+
+    Fed with the raw DistanceToGoal fields (meters and radians), it checks the tolerance, estimates
+    the approach velocity and derives the next poll interval from the estimated time to arrival:
+    polls are sparse far from the goal and dense close to it. It also tracks the time since the last
+    progress towards the goal, to detect a base stopped before its goal.
+    """
+
+    def __init__(
+        self,
+        tolerance: Dict[str, float],
+        min_interval: float = 0.01,
+        max_interval: float = 0.5,
+        default_interval: float = 0.1,
+    ) -> None:
+        """Set up the monitor. tolerance is given as in goto, with delta_theta in degree."""
+        inf = float("inf")
+        self._tolerance_x = tolerance.get("delta_x", inf)
+        self._tolerance_y = tolerance.get("delta_y", inf)
+        self._tolerance_theta = math.radians(tolerance.get("delta_theta", inf))
+        self._tolerance_distance = tolerance.get("distance", inf)
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._default_interval = default_interval
+
+        self._last_time: Optional[float] = None
+        self._xy_remaining = 0.0
+        self._theta_remaining = 0.0
+        self._xy_speed = 0.0
+        self._theta_speed = 0.0
+        # Remaining motion when progress was last recorded.
+        self._xy_progress_mark = float("inf")
+        self._theta_progress_mark = float("inf")
+        self._last_progress = time.monotonic()
+
+    def update(self, delta_x: float, delta_y: float, delta_theta: float, distance: float, now: float) -> bool:
+        """Record a distance to the goal received at now (time.monotonic) and return True if it is arrived."""
+        # Remaining motion before entering the tolerance, along the translation and the rotation.
+        xy_remaining = max(
+            abs(delta_x) - self._tolerance_x, abs(delta_y) - self._tolerance_y, distance - self._tolerance_distance, 0.0
+        )
+        theta_remaining = max(abs(delta_theta) - self._tolerance_theta, 0.0)
+
+        if self._last_time is not None and now > self._last_time:
+            elapsed = now - self._last_time
+            # Smoothed approach velocities, the base accelerates and decelerates along the way.
+            self._xy_speed = 0.5 * self._xy_speed + 0.5 * (self._xy_remaining - xy_remaining) / elapsed
+            self._theta_speed = 0.5 * self._theta_speed + 0.5 * (self._theta_remaining - theta_remaining) / elapsed
+
+        # Progress is measured from a mark, so that a slow approach is not mistaken for a stall.
+        if xy_remaining < self._xy_progress_mark - 1e-3 or theta_remaining < self._theta_progress_mark - 1e-3:
+            self._xy_progress_mark = xy_remaining
+            self._theta_progress_mark = theta_remaining
+            self._last_progress = now
+
+        self._last_time = now
+        self._xy_remaining = xy_remaining
+        self._theta_remaining = theta_remaining
+        return xy_remaining == 0.0 and theta_remaining == 0.0
+
+    def next_interval(self) -> float:
+        """Return the time to wait before the next poll: half the estimated time to arrival, clamped."""
+        eta = 0.0
+        for remaining, speed in ((self._xy_remaining, self._xy_speed), (self._theta_remaining, self._theta_speed)):
+            if remaining <= 0.0:
+                continue
+            if speed <= 1e-3:
+                # No approach observed (yet): fall back to a regular poll.
+                return self._default_interval
+            eta = max(eta, remaining / speed)
+        return min(max(eta / 2, self._min_interval), self._max_interval)
+
+    def time_without_progress(self, now: float) -> float:
+        """Return the time in seconds since the distance to the goal last decreased."""
+        return now - self._last_progress
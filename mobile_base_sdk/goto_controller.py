@@ -0,0 +1,114 @@
+"""Goto controller module for mobile base SDK.
+
+Computes the velocity commands of a client-side goto, run at a high rate by MobileBaseSDK.goto_closed_loop:
+    - the speed towards the goal is proportional to the distance, capped by the velocity limit and by
+      the speed from which the base can still stop at the goal with the acceleration limit
+    - commands change by at most the acceleration limit between two ticks
+    - outside of the tolerance, a minimum speed keeps the base moving through the final millimeters
+"""
+import math
+from typing import Dict, Tuple
+
+
+class GotoController:
+    """Controller driving the base to a goal pose, one velocity command per tick.
+
+    Velocities are in m/s and deg/s, accelerations in m/s^2 and deg/s^2. xy_gain and rot_gain are the
+    proportional gains (in 1/s) of the final approach. min_xy_vel and min_rot_vel are the minimum speeds
+    used while the error is larger than the tolerance.
+    """
+
+    def __init__(
+        self,
+        max_xy_vel: float = 0.5,
+        max_xy_acc: float = 0.5,
+        max_rot_vel: float = 90.0,
+        max_rot_acc: float = 180.0,
+        xy_gain: float = 2.0,
+        rot_gain: float = 2.0,
+        min_xy_vel: float = 0.01,
+        min_rot_vel: float = 2.0,
+        tolerance: Dict[str, float] = {"delta_x": 0.01, "delta_y": 0.01, "delta_theta": 1.0},
+    ) -> None:
+        """Set up the controller. The base is assumed to be still at first."""
+        for name, value in {
+            "max_xy_vel": max_xy_vel,
+            "max_xy_acc": max_xy_acc,
+            "max_rot_vel": max_rot_vel,
+            "max_rot_acc": max_rot_acc,
+            "xy_gain": xy_gain,
+            "rot_gain": rot_gain,
+        }.items():
+            if value <= 0:
+                raise ValueError(f"{name} should be strictly positive!")
+        self.max_xy_vel = max_xy_vel
+        self.max_xy_acc = max_xy_acc
+        self.max_rot_vel = max_rot_vel
+        self.max_rot_acc = max_rot_acc
+        self.xy_gain = xy_gain
+        self.rot_gain = rot_gain
+        self.min_xy_vel = min_xy_vel
+        self.min_rot_vel = min_rot_vel
+        self.tolerance = tolerance
+        # Last command, in the odometry frame.
+        self._velocity = (0.0, 0.0, 0.0)
+
+    def reset(self) -> None:
+        """Forget the last command, e.g. when the base was stopped."""
+        self._velocity = (0.0, 0.0, 0.0)
+
+    def in_tolerance(self, distance: Dict[str, float]) -> bool:
+        """Return True if the distance to the goal (see MobileBaseSDK.goto) is within the tolerance."""
+        return all(abs(distance[key]) <= value for key, value in self.tolerance.items())
+
+    def command(self, pose: Dict[str, float], goal: Tuple[float, float, float], dt: float) -> Tuple[float, float, float]:
+        """Return the (x_vel, y_vel, rot_vel) command in the robot frame, for the pose and goal in the odometry frame.
+
+        dt is the time in seconds until the next command.
+        """
+        error_x, error_y = goal[0] - pose["x"], goal[1] - pose["y"]
+        error_theta = (goal[2] - pose["theta"] + 180.0) % 360.0 - 180.0
+        distance = math.hypot(error_x, error_y)
+
+        speed = self._target_speed(
+            distance,
+            self.max_xy_vel,
+            self.max_xy_acc,
+            self.xy_gain,
+            self.min_xy_vel if max(abs(error_x), abs(error_y)) > self._xy_tolerance() else 0.0,
+        )
+        rot_speed = self._target_speed(
+            abs(error_theta),
+            self.max_rot_vel,
+            self.max_rot_acc,
+            self.rot_gain,
+            self.min_rot_vel if abs(error_theta) > self.tolerance.get("delta_theta", 0.0) else 0.0,
+        )
+        x_vel = speed * error_x / distance if distance > 0 else 0.0
+        y_vel = speed * error_y / distance if distance > 0 else 0.0
+        rot_vel = math.copysign(rot_speed, error_theta)
+
+        # Acceleration limits, applied to the translation as a whole to keep its direction.
+        last_x_vel, last_y_vel, last_rot_vel = self._velocity
+        change = math.hypot(x_vel - last_x_vel, y_vel - last_y_vel)
+        max_change = self.max_xy_acc * dt
+        if change > max_change:
+            x_vel = last_x_vel + (x_vel - last_x_vel) * max_change / change
+            y_vel = last_y_vel + (y_vel - last_y_vel) * max_change / change
+        max_rot_change = self.max_rot_acc * dt
+        rot_vel = min(max(rot_vel, last_rot_vel - max_rot_change), last_rot_vel + max_rot_change)
+        self._velocity = (x_vel, y_vel, rot_vel)
+
+        # The base turns during the tick: the translation is expressed in the robot frame at mid-tick.
+        theta = math.radians(pose["theta"] + rot_vel * dt / 2)
+        cos, sin = math.cos(theta), math.sin(theta)
+        return cos * x_vel + sin * y_vel, cos * y_vel - sin * x_vel, rot_vel
+
+    def _xy_tolerance(self) -> float:
+        return min(self.tolerance.get("delta_x", 0.0), self.tolerance.get("delta_y", 0.0))
+
+    @staticmethod
+    def _target_speed(error: float, max_vel: float, max_acc: float, gain: float, min_vel: float) -> float:
+        # Proportional approach, capped by the speed from which the base can stop within the error.
+        speed = min(max_vel, gain * error, math.sqrt(2.0 * max_acc * error))
+        return min(max(speed, min_vel), max_vel) if error > 0 else 0.0
@@ -0,0 +1,158 @@
+"""Velocity governor module for mobile base SDK.
+
+Limits the velocity commands of the mobile base before they reach the server-side safety:
+    - a maximum speed is precomputed for each heading from the lidar map and the safety distances
+    - commanded velocities are scaled down to the maximum speed of their heading before being sent
+    - the table is refreshed in the background as the map changes
+
+The maximum speed ramps down smoothly from the slowdown distance to the critical distance (both
+widened by a margin), so the base slows down before the server-side safety has to step in.
+"""
+import math
+import threading
+from logging import getLogger
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .occupancy_grid import OccupancyGrid
+
+
+class VelocityGovernor:
+    """Per-heading maximum speed table, built from the map of a Lidar.
+
+    resolution is the size of a map cell in meters. The range of the obstacles in each heading is the
+    smallest one within sector_width degrees around it, to account for the width of the base.
+    Between the critical and slowdown distances (plus margin), the maximum speed ramps smoothly
+    from min_speed to max_speed (in m/s).
+    """
+
+    def __init__(
+        self,
+        lidar,
+        resolution: float = 0.05,
+        max_speed: float = 1.0,
+        min_speed: float = 0.0,
+        margin: float = 0.1,
+        sector_width: float = 60.0,
+        angular_bins: int = 360,
+    ) -> None:
+        """Set up the governor. The table allows every speed until the first update."""
+        if not 0.0 <= min_speed <= max_speed:
+            raise ValueError("Speeds should be such that 0 <= min_speed <= max_speed!")
+        self._logger = getLogger()
+        self._lidar = lidar
+        self._resolution = resolution
+        self._max_speed = max_speed
+        self._min_speed = min_speed
+        self._margin = margin
+        self._half_sector = int(round(sector_width / 2 / 360.0 * angular_bins))
+        self._angular_bins = angular_bins
+
+        self._grid: Optional[OccupancyGrid] = None
+        self._table = np.full(angular_bins, max_speed)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def grid(self) -> Optional[OccupancyGrid]:
+        """Occupancy grid of the last map, None before the first update."""
+        return self._grid
+
+    @property
+    def table(self) -> np.ndarray:
+        """Maximum speed in m/s for each heading bin, from -180 degrees counterclockwise."""
+        return self._table
+
+    @property
+    def is_running(self) -> bool:
+        """Return True if the table is refreshed in the background."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def update(self) -> None:
+        """Fetch the map and recompute the table."""
+        critical_distance = self._lidar.safety_critical_distance
+        slowdown_distance = self._lidar.safety_slowdown_distance
+        if critical_distance is None or slowdown_distance is None:
+            raise RuntimeError("Safety distances of the lidar are not known yet.")
+        lidar_map = self._lidar.get_map_array()
+        if self._grid is None or self._grid.shape != lidar_map.shape[:2]:
+            self._grid = OccupancyGrid.from_map(lidar_map, self._resolution, angular_bins=self._angular_bins)
+        else:
+            self._grid.update(lidar_map)
+        self._table = self._speed_table(self._grid.polar_ranges, critical_distance, slowdown_distance)
+
+    def start(self, rate_hz: float = 5.0) -> None:
+        """Refresh the table at rate_hz in a background thread."""
+        if self.is_running:
+            return
+        if rate_hz <= 0:
+            raise ValueError("rate_hz should be strictly positive!")
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._update_loop, args=(1.0 / rate_hz,), name="mobile-base-governor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop refreshing the table. The last table is kept."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def max_speed(self, heading: float) -> float:
+        """Return the maximum speed in m/s towards heading, in degrees (0 is forward, counterclockwise)."""
+        index = int(math.floor((heading + 180.0) / 360.0 * self._angular_bins)) % self._angular_bins
+        return float(self._table[index])
+
+    def limit(self, x_vel: float, y_vel: float, rot_vel: float) -> Tuple[float, float, float]:
+        """Scale the translation of a velocity command down to the maximum speed of its heading."""
+        speed = math.hypot(x_vel, y_vel)
+        if speed == 0.0:
+            return x_vel, y_vel, rot_vel
+        limit = self.max_speed(math.degrees(math.atan2(y_vel, x_vel)))
+        if speed <= limit:
+            return x_vel, y_vel, rot_vel
+        scale = limit / speed
+        return x_vel * scale, y_vel * scale, rot_vel
+
+    def path_clear(self, x: float, y: float) -> bool:
+        """Return True if the straight path to (x, y), in the robot frame, stays out of the critical distance.
+
+        If the robot is already within that distance, the path should just not get closer to the obstacles.
+        """
+        critical_distance = self._lidar.safety_critical_distance
+        if self._grid is None or critical_distance is None:
+            return True
+        current_clearance = float(self._grid.distance([(0.0, 0.0)])[0])
+        return self._grid.goto_free(x, y, clearance=min(critical_distance + self._margin, current_clearance - 1e-6))
+
+    def _speed_table(self, ranges: np.ndarray, critical_distance: float, slowdown_distance: float) -> np.ndarray:
+        # Nearest obstacle within the sector around each heading: minimum over the shifted range arrays.
+        sector_ranges = ranges.copy()
+        for shift in range(1, self._half_sector + 1):
+            np.minimum(sector_ranges, np.roll(ranges, shift), out=sector_ranges)
+            np.minimum(sector_ranges, np.roll(ranges, -shift), out=sector_ranges)
+
+        low = critical_distance + self._margin
+        high = max(slowdown_distance + self._margin, low + 1e-3)
+        ramp = np.clip((sector_ranges - low) / (high - low), 0.0, 1.0)
+        # Smoothstep, so that the speed has no kink when entering or leaving the slowdown zone.
+        ramp = ramp * ramp * (3.0 - 2.0 * ramp)
+        table = self._min_speed + (self._max_speed - self._min_speed) * ramp
+        table[sector_ranges <= low] = 0.0
+        return table
+
+    def _update_loop(self, period: float) -> None:
+        error = False
+        while not self._stop_event.is_set():
+            try:
+                self.update()
+                error = False
+            except Exception as e:
+                # Only the first failure of a series is logged, the last table is kept meanwhile.
+                if not error:
+                    self._logger.warning(f"Could not update the velocity governor: {e}")
+                error = True
+            self._stop_event.wait(period)
@@ -6,24 +6,40 @@ Handles the LIDAR features:
     - set the critical distance
     - enable/disable the safety feature
 """
-import io
-import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
 
 from google.protobuf.empty_pb2 import Empty
 from google.protobuf.wrappers_pb2 import BoolValue, FloatValue
-from PIL import Image
 from reachy2_sdk_api import mobile_base_lidar_pb2_grpc as lidar_pb2_grpc
 from reachy2_sdk_api.mobile_base_lidar_pb2 import LidarObstacleDetectionEnum, LidarObstacleDetectionStatus, LidarSafety
 
+from .tracing import NULL_TRACER
+
 
 class Lidar:
     """LIDAR class for mobile base SDK."""
 
-    def __init__(self, grpc_channel) -> None:
-        """Initialize the LIDAR class."""
-        self._stub = lidar_pb2_grpc.MobileBaseLidarServiceStub(grpc_channel)
+    def __init__(self, grpc_channel, update_safety: bool = True) -> None:
+        """Initialize the LIDAR class.
 
-        self._update_safety_info()
+        If update_safety is False, the safety values are None until they are fetched.
+        """
+        self._stub = lidar_pb2_grpc.MobileBaseLidarServiceStub(grpc_channel)
+        # Set by MobileBaseSDK.start_telemetry
+        self._telemetry = None
+        # Set by MobileBaseSDK.start_tracing
+        self._tracer = NULL_TRACER
+        # Created on the first map, so that NumPy and PIL are only loaded when a map is requested.
+        self._map_cache = None
+        # Safety values set during a safety transaction, sent when it ends.
+        self._pending_safety: Optional[Dict[str, Any]] = None
+
+        self._safety_distance: Optional[float] = None
+        self._critical_distance: Optional[float] = None
+        self._safety_enabled: Optional[bool] = None
+        if update_safety:
+            self._update_safety_info()
 
     def __repr__(self) -> str:
         """Clean representation of a Reachy."""
@@ -31,14 +47,33 @@ class Lidar:
 
     def get_map(self):
         """Get the current map of the environment."""
-        compressed_map = self._stub.GetLidarMap(Empty()).data
-        uncompressed_bytes = zlib.decompress(compressed_map)
-        buf = io.BytesIO(uncompressed_bytes)
-        self.map = Image.open(buf)
+        with self._tracer.span("lidar.get_map"):
+            with self._tracer.span("GetLidarMap"):
+                compressed_map = self._stub.GetLidarMap(Empty()).data
+            self.map = self._get_map_cache().image(compressed_map, self._tracer)
         return self.map
 
+    def get_map_array(self):
+        """Get the current map of the environment as a read-only NumPy array.
+
+        The array is reused as long as the map does not change: copy it to keep it.
+        """
+        with self._tracer.span("lidar.get_map_array"):
+            with self._tracer.span("GetLidarMap"):
+                compressed_map = self._stub.GetLidarMap(Empty()).data
+            return self._get_map_cache().array(compressed_map, self._tracer)
+
+    def _get_map_cache(self):
+        if self._map_cache is None:
+            from .lidar_map import LidarMapCache
+
+            self._map_cache = LidarMapCache()
+        return self._map_cache
+
     def _update_safety_info(self):
-        response = self._stub.GetZuuuSafety(Empty())
+        self._apply_safety_info(self._stub.GetZuuuSafety(Empty()))
+
+    def _apply_safety_info(self, response):
         self._safety_distance = round(response.safety_distance.value, 2)
         self._critical_distance = round(response.critical_distance.value, 2)
         self._safety_enabled = response.safety_on.value
@@ -50,18 +85,11 @@ class Lidar:
         The mobile base's speed is slowed down if the direction of speed matches the direction of
         at least 1 LIDAR point in the safety_distance range.
         """
-        return self._safety_distance
+        return self._pending_safety_value("slowdown_distance", self._safety_distance)
 
     @safety_slowdown_distance.setter
     def safety_slowdown_distance(self, value):
-        self._stub.SetZuuuSafety(
-            LidarSafety(
-                safety_distance=FloatValue(value=value),
-                critical_distance=FloatValue(value=self._critical_distance),
-                safety_on=BoolValue(value=self._safety_enabled),
-            )
-        )
-        self._update_safety_info()
+        self._set_safety(slowdown_distance=value)
 
     @property
     def safety_critical_distance(self):
@@ -72,34 +100,20 @@ class Lidar:
         If at least 1 point is in the critical distance, then even motions that move away from the obstacles are
         slowed down to the "safety_zone" speed.
         """
-        return self._critical_distance
+        return self._pending_safety_value("critical_distance", self._critical_distance)
 
     @safety_critical_distance.setter
     def safety_critical_distance(self, value):
-        self._stub.SetZuuuSafety(
-            LidarSafety(
-                safety_distance=FloatValue(value=self._safety_distance),
-                critical_distance=FloatValue(value=value),
-                safety_on=BoolValue(value=self._safety_enabled),
-            )
-        )
-        self._update_safety_info()
+        self._set_safety(critical_distance=value)
 
     @property
     def safety_enabled(self):
         """Enable or disable the safety feature."""
-        return self._safety_enabled
+        return self._pending_safety_value("enabled", self._safety_enabled)
 
     @safety_enabled.setter
     def safety_enabled(self, value):
-        self._stub.SetZuuuSafety(
-            LidarSafety(
-                safety_distance=FloatValue(value=self._safety_distance),
-                critical_distance=FloatValue(value=self._critical_distance),
-                safety_on=BoolValue(value=value),
-            )
-        )
-        self._update_safety_info()
+        self._set_safety(enabled=value)
 
     @property
     def obstacle_detection_status(self) -> LidarObstacleDetectionStatus:
@@ -107,6 +121,11 @@ class Lidar:
 
         Can be either NO_OBJECT_DETECTED, OBJECT_DETECTED_SLOWDOWN, OBJECT_DETECTED_STOP or DETECTION_ERROR.
         """
+        if self._telemetry is not None:
+            return self._telemetry.read("obstacle_detection_status")
+        return self._get_obstacle_detection_status()
+
+    def _get_obstacle_detection_status(self) -> LidarObstacleDetectionStatus:
         return LidarObstacleDetectionEnum.Name(self._stub.GetZuuuSafety(Empty()).obstacle_detection_status.status)
 
     def reset_safety_default_values(self) -> None:
@@ -116,5 +135,60 @@ class Lidar:
         - safety_critical_distance
         - safety_slowdown_distance.
         """
-        self.safety_critical_distance = 0.55
-        self.safety_slowdown_distance = 0.7
+        self.configure_safety(critical_distance=0.55, slowdown_distance=0.7)
+
+    def configure_safety(
+        self,
+        slowdown_distance: Optional[float] = None,
+        critical_distance: Optional[float] = None,
+        enabled: Optional[bool] = None,
+    ) -> None:
+        """Set the safety values in a single request. Values left to None are kept unchanged."""
+        if None in (self._safety_distance, self._critical_distance, self._safety_enabled):
+            self._update_safety_info()
+        self._stub.SetZuuuSafety(self._safety_request(slowdown_distance, critical_distance, enabled))
+        self._update_safety_info()
+
+    def _safety_request(
+        self,
+        slowdown_distance: Optional[float] = None,
+        critical_distance: Optional[float] = None,
+        enabled: Optional[bool] = None,
+    ) -> LidarSafety:
+        return LidarSafety(
+            safety_distance=FloatValue(value=self._safety_distance if slowdown_distance is None else slowdown_distance),
+            critical_distance=FloatValue(value=self._critical_distance if critical_distance is None else critical_distance),
+            safety_on=BoolValue(value=self._safety_enabled if enabled is None else enabled),
+        )
+
+    @contextmanager
+    def safety_transaction(self) -> Iterator["Lidar"]:
+        """Group the changes of the safety values made in the context into a single request.
+
+        The request is sent when leaving the context, and not at all if an exception is raised.
+
+            with lidar.safety_transaction():
+                lidar.safety_slowdown_distance = 0.5
+                lidar.safety_critical_distance = 0.3
+        """
+        if self._pending_safety is not None:
+            raise RuntimeError("A safety transaction is already running.")
+        self._pending_safety = {}
+        try:
+            yield self
+            pending = self._pending_safety
+        finally:
+            self._pending_safety = None
+        if pending:
+            self.configure_safety(**pending)
+
+    def _set_safety(self, **values) -> None:
+        if self._pending_safety is not None:
+            self._pending_safety.update(values)
+        else:
+            self.configure_safety(**values)
+
+    def _pending_safety_value(self, key: str, value):
+        if self._pending_safety is not None:
+            return self._pending_safety.get(key, value)
+        return value
@@ -0,0 +1,126 @@
+"""Lidar map module for mobile base SDK.
+
+Decodes the map sent by the mobile base (a zlib-compressed image file) and caches it, keyed on
+a hash of the compressed payload, so that an unchanged map is neither decompressed nor decoded again.
+
+The map can be decoded either as a PIL image or as a NumPy array. Uncompressed image formats
+(BMP, binary PGM/PPM) are decoded as NumPy views on the decompressed payload without going through
+PIL, other formats are decoded by PIL into a reusable preallocated buffer.
+"""
+import io
+import re
+import struct
+import threading
+import zlib
+from hashlib import blake2b
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from .tracing import NULL_TRACER
+
+_PNM_HEADER = re.compile(rb"P([56])\s+(\d+)\s+(\d+)\s+(\d+)\s")
+
+
+class LidarMapCache:
+    """Cache of the last lidar map received, decoded lazily as an image or an array."""
+
+    def __init__(self) -> None:
+        """Create an empty cache."""
+        self._lock = threading.Lock()
+        self._key: Optional[bytes] = None
+        self._raw: Optional[bytes] = None
+        self._image = None
+        self._array: Optional[np.ndarray] = None
+        self._buffer: Optional[np.ndarray] = None
+        self.hits = 0
+        self.misses = 0
+
+    def image(self, compressed_map: bytes, tracer=NULL_TRACER):
+        """Return the map as a PIL image. The decompression and decoding are traced with tracer."""
+        with self._lock:
+            self._update(compressed_map, tracer)
+            if self._image is None:
+                with tracer.span("lidar_map.decode", format="image"):
+                    self._image = Image.open(io.BytesIO(self._raw))
+            return self._image
+
+    def array(self, compressed_map: bytes, tracer=NULL_TRACER) -> np.ndarray:
+        """Return the map as a read-only NumPy array of shape (height, width) or (height, width, channels).
+
+        The array is only valid until the map changes: copy it to keep it. The decompression and
+        decoding are traced with tracer.
+        """
+        with self._lock:
+            self._update(compressed_map, tracer)
+            if self._array is None:
+                with tracer.span("lidar_map.decode", format="array"):
+                    array = _decode_array(self._raw)
+                    if array is None:
+                        array = self._decode_array_with_pil()
+                    array.flags.writeable = False
+                    self._array = array
+            return self._array
+
+    def _update(self, compressed_map: bytes, tracer=NULL_TRACER) -> None:
+        with tracer.span("lidar_map.decompress", compressed_bytes=len(compressed_map)) as span:
+            key = blake2b(compressed_map, digest_size=16).digest()
+            if key == self._key:
+                self.hits += 1
+                span.set_attribute("cached", True)
+                return
+            self.misses += 1
+            self._key = key
+            self._raw = zlib.decompress(compressed_map)
+            self._image = None
+            self._array = None
+
+    def _decode_array_with_pil(self) -> np.ndarray:
+        image = Image.open(io.BytesIO(self._raw))
+        if image.mode not in ("L", "RGB", "RGBA"):
+            image = image.convert("RGB")
+        decoded = np.asarray(image)
+        if self._buffer is None or self._buffer.shape != decoded.shape:
+            self._buffer = np.empty(decoded.shape, dtype=np.uint8)
+        np.copyto(self._buffer, decoded)
+        return self._buffer.view()
+
+
+def _decode_array(raw: bytes) -> Optional[np.ndarray]:
+    """Decode uncompressed image formats as views on raw. Return None for other formats."""
+    if raw[:2] == b"BM":
+        return _decode_bmp(raw)
+    match = _PNM_HEADER.match(raw)
+    if match is not None:
+        kind, width, height, max_value = match.groups()
+        if int(max_value) > 255:
+            return None
+        shape = (int(height), int(width)) if kind == b"5" else (int(height), int(width), 3)
+        return np.frombuffer(raw, np.uint8, count=int(np.prod(shape)), offset=match.end()).reshape(shape)
+    return None
+
+
+def _decode_bmp(raw: bytes) -> Optional[np.ndarray]:
+    (offset,) = struct.unpack_from("<I", raw, 10)
+    header_size, width, height, _, bits, compression = struct.unpack_from("<IiiHHI", raw, 14)
+    if compression != 0 or bits not in (8, 24, 32):
+        return None
+
+    channels = bits // 8
+    stride = (width * bits + 31) // 32 * 4
+    rows = np.frombuffer(raw, np.uint8, count=stride * abs(height), offset=offset).reshape(abs(height), stride)
+    pixels = rows[:, : width * channels].reshape(abs(height), width, channels)
+    if height > 0:
+        # Rows are stored bottom-up
+        pixels = pixels[::-1]
+
+    if channels == 1:
+        (colors,) = struct.unpack_from("<I", raw, 46)
+        palette = np.frombuffer(raw, np.uint8, count=4 * (colors or 256), offset=14 + header_size).reshape(-1, 4)
+        indices = pixels[..., 0]
+        if np.array_equal(palette[:, :3], np.repeat(np.arange(len(palette), dtype=np.uint8)[:, None], 3, axis=1)):
+            return indices
+        return palette[indices][..., 2::-1]
+    # BGR(A) to RGB
+    return pixels[..., 2::-1]
@@ -0,0 +1,173 @@
+"""Metrics module for mobile base SDK.
+
+gRPC client interceptors recording, for each RPC method:
+    - the number of calls per status code
+    - a latency histogram
+    - the request and response payload sizes
+
+The metrics can be read as a snapshot, or exported in the Prometheus text format or as JSON.
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Sequence
+
+import grpc
+
+# Upper bounds in seconds of the latency histogram buckets.
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class _MethodMetrics:
+    __slots__ = ("codes", "buckets", "latency_sum", "request_bytes", "response_bytes")
+
+    def __init__(self, bucket_count: int) -> None:
+        self.codes: Dict[str, int] = {}
+        # Last bucket counts the latencies above the last upper bound.
+        self.buckets = [0] * (bucket_count + 1)
+        self.latency_sum = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class RpcMetrics:
+    """Thread-safe per-method RPC statistics."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        """Create empty statistics with the given latency histogram buckets."""
+        self._bucket_bounds = tuple(sorted(buckets))
+        self._methods: Dict[str, _MethodMetrics] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, latency: float, code: grpc.StatusCode, request_size: int, response_size: int) -> None:
+        """Record one call of method."""
+        bucket = bisect_left(self._bucket_bounds, latency)
+        with self._lock:
+            metrics = self._methods.get(method)
+            if metrics is None:
+                metrics = self._methods[method] = _MethodMetrics(len(self._bucket_bounds))
+            metrics.codes[code.name] = metrics.codes.get(code.name, 0) + 1
+            metrics.buckets[bucket] += 1
+            metrics.latency_sum += latency
+            metrics.request_bytes += request_size
+            metrics.response_bytes += response_size
+
+    def reset(self) -> None:
+        """Clear all the statistics."""
+        with self._lock:
+            self._methods.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return a copy of the statistics of each method.
+
+        Histogram buckets are given as (upper bound, count) pairs, the last bound being inf.
+        """
+        bounds = self._bucket_bounds + (float("inf"),)
+        with self._lock:
+            return {
+                method: {
+                    "count": sum(metrics.codes.values()),
+                    "errors": sum(count for code, count in metrics.codes.items() if code != "OK"),
+                    "codes": dict(metrics.codes),
+                    "latency_sum": metrics.latency_sum,
+                    "latency_buckets": list(zip(bounds, metrics.buckets)),
+                    "request_bytes": metrics.request_bytes,
+                    "response_bytes": metrics.response_bytes,
+                }
+                for method, metrics in self._methods.items()
+            }
+
+    def to_json(self) -> str:
+        """Export the statistics as JSON."""
+        snapshot = self.snapshot()
+        for metrics in snapshot.values():
+            metrics["latency_buckets"] = [
+                ["+Inf" if bound == float("inf") else bound, count] for bound, count in metrics["latency_buckets"]
+            ]
+        return json.dumps(snapshot)
+
+    def to_prometheus(self, prefix: str = "mobile_base_sdk") -> str:
+        """Export the statistics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_rpc_calls_total Number of RPCs by method and status code.",
+            f"# TYPE {prefix}_rpc_calls_total counter",
+        ]
+        for method, metrics in snapshot.items():
+            for code, count in metrics["codes"].items():
+                lines.append(f'{prefix}_rpc_calls_total{{method="{method}",code="{code}"}} {count}')
+
+        lines += [
+            f"# HELP {prefix}_rpc_latency_seconds Latency of the RPCs by method.",
+            f"# TYPE {prefix}_rpc_latency_seconds histogram",
+        ]
+        for method, metrics in snapshot.items():
+            cumulative = 0
+            for bound, count in metrics["latency_buckets"]:
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_rpc_latency_seconds_bucket{{method="{method}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_rpc_latency_seconds_sum{{method="{method}"}} {metrics["latency_sum"]}')
+            lines.append(f'{prefix}_rpc_latency_seconds_count{{method="{method}"}} {metrics["count"]}')
+
+        for direction in ("request", "response"):
+            lines += [
+                f"# HELP {prefix}_rpc_{direction}_bytes_total Size of the serialized {direction}s by method.",
+                f"# TYPE {prefix}_rpc_{direction}_bytes_total counter",
+            ]
+            for method, metrics in snapshot.items():
+                lines.append(f'{prefix}_rpc_{direction}_bytes_total{{method="{method}"}} {metrics[direction + "_bytes"]}')
+        return "\n".join(lines) + "\n"
+
+
+class MetricsInterceptor(grpc.UnaryUnaryClientInterceptor):
+    """Client interceptor recording the RPCs of a channel in an RpcMetrics."""
+
+    def __init__(self, metrics: RpcMetrics) -> None:
+        """Record the RPCs in metrics."""
+        self._metrics = metrics
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        """Record the call once it is done, blocking calls and futures alike."""
+        method = _short_method_name(client_call_details.method)
+        tic = time.perf_counter()
+        outcome = continuation(client_call_details, request)
+
+        def record(future):
+            latency = time.perf_counter() - tic
+            code = future.code()
+            response_size = future.result().ByteSize() if code == grpc.StatusCode.OK else 0
+            self._metrics.record(method, latency, code, request.ByteSize(), response_size)
+
+        outcome.add_done_callback(record)
+        return outcome
+
+
+class AsyncMetricsInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    """grpc.aio client interceptor recording the RPCs of a channel in an RpcMetrics."""
+
+    def __init__(self, metrics: RpcMetrics) -> None:
+        """Record the RPCs in metrics."""
+        self._metrics = metrics
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        """Record the call once it is done."""
+        method = _short_method_name(client_call_details.method)
+        tic = time.perf_counter()
+        call = await continuation(client_call_details, request)
+        try:
+            response = await call
+        except grpc.aio.AioRpcError as e:
+            self._metrics.record(method, time.perf_counter() - tic, e.code(), request.ByteSize(), 0)
+            raise
+        self._metrics.record(method, time.perf_counter() - tic, grpc.StatusCode.OK, request.ByteSize(), response.ByteSize())
+        return call
+
+
+def _short_method_name(method) -> str:
+    """Return Service/Method from the full /package.Service/Method name."""
+    if isinstance(method, bytes):
+        method = method.decode()
+    service, _, name = method.lstrip("/").rpartition("/")
+    return f"{service.rpartition('.')[2]}/{name}"
@@ -7,23 +7,60 @@ in cartesian coordinates (x, y, theta) or directly send velocities (x_vel, y_vel
 """
 
 import asyncio
+import math
 import time
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future
 from logging import getLogger
-from queue import Queue
-from typing import Optional
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
 
 
 import grpc
 from google.protobuf.empty_pb2 import Empty
 from google.protobuf.wrappers_pb2 import BoolValue, FloatValue
-from numpy import deg2rad, rad2deg, round
 from reachy2_sdk_api import mobile_base_mobility_pb2 as mob_pb2
 from reachy2_sdk_api import mobile_base_mobility_pb2_grpc as mob_pb2_grpc
 from reachy2_sdk_api import mobile_base_utility_pb2 as util_pb2
 from reachy2_sdk_api import mobile_base_utility_pb2_grpc as util_pb2_grpc
+from reachy2_sdk_api.mobile_base_lidar_pb2 import LidarObstacleDetectionEnum
 
+from .capture import TrafficCapture
+from .connection import ConnectionMonitor
+from .goto import ConvergenceMonitor, GotoHandle, GotoResult
+from .goto_controller import GotoController
 from .lidar import Lidar
+from .metrics import MetricsInterceptor, RpcMetrics
+from .modes import ModeCache
+from .state import MobileBaseState
+from .telemetry import TelemetryCache, TelemetrySample
+from .tracing import NULL_TRACER, NullTracer, Tracer
+from .velocity_stream import VelocityStream
+from .worker import EventLoopThread
+
+if TYPE_CHECKING:
+    from .governor import VelocityGovernor
+    from .path_following import PathTrajectory
+    from .pose_estimator import PoseEstimator
+
+# Time in seconds without progress towards a goto goal after which the obstacle detection status is
+# checked, and after which the goto is considered stalled.
+GOTO_STALL_CHECK = 0.3
+GOTO_STALL_TIMEOUT = 2.0
+
+# Deadline in seconds of the RPCs synchronizing the SDK with the base.
+SYNC_TIMEOUT = 5.0
+# Reconnection backoff of the channel, matching the resynchronization backoff of the SDK.
+RECONNECT_CHANNEL_OPTIONS = (
+    ("grpc.initial_reconnect_backoff_ms", 500),
+    ("grpc.min_reconnect_backoff_ms", 500),
+    ("grpc.max_reconnect_backoff_ms", 30000),
+)
+
+# Rate in Hz at which the drive and control modes are refreshed in the background.
+MODE_REFRESH_RATE = 1.0
+
+# Default polling rates (in Hz) of the signals cached by the telemetry mode.
+DEFAULT_TELEMETRY_RATES = {"odometry": 50.0, "battery_voltage": 1.0, "obstacle_detection_status": 10.0}
 
 
 class MobileBaseSDK:
@@ -39,27 +76,125 @@ class MobileBaseSDK:
     If you encounter a problem when using the base, you have access to an emergency shutdown method.
     """
 
-    def __init__(self, host: str, mobile_base_port: int = 50051) -> None:
-        """Set up the connection with the mobile base."""
+    def __init__(
+        self,
+        host: str,
+        mobile_base_port: int = 50051,
+        metrics: bool = False,
+        lazy: bool = False,
+        channel: Optional[grpc.Channel] = None,
+        capture: Optional[str] = None,
+    ) -> None:
+        """Set up the connection with the mobile base.
+
+        If metrics is True, the calls, latency, payload sizes and status codes of every RPC are
+        recorded in the metrics attribute (an RpcMetrics).
+        If channel is given, it is used instead of connecting to host, e.g. a capture.ReplayChannel to
+        replay a recorded session offline. If capture is a path, every RPC is written to that capture
+        file by the capture attribute (a TrafficCapture), which should be closed at the end.
+        By default, the drive mode, control mode and safety values of the base are fetched before
+        returning. If lazy is True, the constructor returns immediately and they are fetched in the
+        background as soon as the base is reachable (see wait_for_connection).
+        In both cases, the connection is monitored: after a loss of connection, the SDK reconnects with
+        an exponential backoff and restores the drive mode, control mode and safety values of the base.
+        When the channel only went idle, these values are fetched again from the base instead.
+        """
         self._logger = getLogger()
         self._host = host
         self._mobile_base_port = mobile_base_port
-        self._grpc_channel = grpc.insecure_channel(f"{self._host}:{self._mobile_base_port}")
+        # Channel created by the SDK, closed with it. A channel given by the caller is left open.
+        self._own_channel: Optional[grpc.Channel] = None
+        if channel is None:
+            channel = self._own_channel = grpc.insecure_channel(
+                f"{self._host}:{self._mobile_base_port}",
+                options=RECONNECT_CHANNEL_OPTIONS,
+            )
+        self._grpc_channel = channel
+
+        self.metrics: Optional[RpcMetrics] = None
+        if metrics:
+            self.metrics = RpcMetrics()
+            self._grpc_channel = grpc.intercept_channel(self._grpc_channel, MetricsInterceptor(self.metrics))
+
+        self.capture: Optional[TrafficCapture] = None
+        if capture is not None:
+            self.capture = TrafficCapture(capture)
+            self._grpc_channel = grpc.intercept_channel(self._grpc_channel, self.capture)
 
         self._utility_stub = util_pb2_grpc.MobileBaseUtilityServiceStub(self._grpc_channel)
         self._mobility_stub = mob_pb2_grpc.MobileBaseMobilityServiceStub(self._grpc_channel)
 
-        self._drive_mode = self._get_drive_mode().lower()
-        self._control_mode = self._get_control_mode().lower()
+        # Drive and control modes, refreshed in the background while the telemetry mode is on.
+        self.modes = ModeCache(
+            fetchers={
+                "drive_mode": lambda: self._get_drive_mode().lower(),
+                "control_mode": lambda: self._get_control_mode().lower(),
+            }
+        )
 
         self._max_xy_vel = 1.0
         self._max_rot_vel = 180.0
         self._max_xy_goto = 1.0
 
-        self.lidar = Lidar(self._grpc_channel)
+        self.lidar = Lidar(self._grpc_channel, update_safety=False)
+        if not lazy:
+            self._sync_state()
+        self._connection = ConnectionMonitor(self._grpc_channel, self._sync_state)
+        self._connection.start(synced=not lazy)
+
+        self._telemetry: Optional[TelemetryCache] = None
+
+        # Long-lived event loop running the gotos, started on the first one.
+        self._worker = EventLoopThread()
+        self._goto_handle: Optional[GotoHandle] = None
+
+        self._velocity_stream: Optional[VelocityStream] = None
+        self._last_state: Optional[MobileBaseState] = None
+        # Last velocity sent with SendDirection, in m/s and deg/s, and when it was sent (time.time).
+        self._commanded_velocity = (0.0, 0.0, 0.0)
+        self._commanded_at: Optional[float] = None
+        self.governor: Optional["VelocityGovernor"] = None
+        self._tracer: Union[Tracer, NullTracer] = NULL_TRACER
+        self._closed = False
+
+    def __enter__(self) -> "MobileBaseSDK":
+        """Return the SDK, closed when leaving the context."""
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Close the SDK."""
+        self.close()
+
+    def close(self) -> None:
+        """Stop every background thread of the SDK and close its connection with the base.
+
+        The running goto or path is cancelled, then the velocity stream (of the SDK or of a teleop engine),
+        telemetry, governor, mode refresh, connection monitoring and capture are stopped. The SDK should not
+        be used once closed.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._goto_handle is not None:
+            self._goto_handle.cancel()
+        # Waits for the cancelled motion to brake the base.
+        self._worker.stop()
+        try:
+            self.stop_velocity_stream()
+        except grpc.RpcError as e:
+            self._logger.warning(f"Could not stop the mobile base: {e}")
+        self._velocity_stream = None
+        self.stop_telemetry()
+        self.disable_governor()
+        self._connection.stop()
+        if self.capture is not None:
+            self.capture.close()
+        if self._own_channel is not None:
+            self._own_channel.close()
 
     def __repr__(self) -> str:
         """Clean representation of a mobile base."""
+        state = self.state()
         repr_template = (
             '<MobileBase host="{host}" on={on} \n'
             " lidar_safety_enabled={lidar_safety_enabled} \n"
@@ -67,11 +202,102 @@ class MobileBaseSDK:
         )
         return repr_template.format(
             host=self._host,
-            on=self.is_on(),
-            lidar_safety_enabled=self.lidar.safety_enabled,
-            battery_voltage=self.battery_voltage,
+            on=state.is_on,
+            lidar_safety_enabled=state.safety_enabled,
+            battery_voltage=state.battery_voltage,
         )
 
+    def state(self, max_age: Optional[float] = None) -> MobileBaseState:
+        """Return a snapshot of the drive and control modes, battery voltage, odometry and lidar safety status.
+
+        All the RPCs are made concurrently, so the snapshot takes about as long as the slowest of them.
+        If max_age is given, the last snapshot is returned instead if it is not older than max_age seconds.
+        """
+        last = self._last_state
+        if max_age is not None and last is not None and last.age <= max_age:
+            return last
+
+        drive_mode = self._utility_stub.GetZuuuMode.future(Empty())
+        control_mode = self._utility_stub.GetControlMode.future(Empty())
+        battery = self._utility_stub.GetBatteryLevel.future(Empty())
+        odometry = self._utility_stub.GetOdometry.future(Empty())
+        safety = self.lidar._stub.GetZuuuSafety.future(Empty())
+
+        self._drive_mode = util_pb2.ZuuuModePossiblities.keys()[drive_mode.result().mode].lower()
+        self._control_mode = util_pb2.ControlModePossiblities.keys()[control_mode.result().mode].lower()
+        safety_response = safety.result()
+        self.lidar._apply_safety_info(safety_response)
+        state = MobileBaseState(
+            timestamp=time.time(),
+            drive_mode=self._drive_mode,
+            control_mode=self._control_mode,
+            battery_voltage=round(battery.result().level.value, 1),
+            odometry=MappingProxyType(_odometry_from_response(odometry.result())),
+            safety_enabled=self.lidar._safety_enabled,
+            safety_slowdown_distance=self.lidar._safety_distance,
+            safety_critical_distance=self.lidar._critical_distance,
+            obstacle_detection_status=LidarObstacleDetectionEnum.Name(safety_response.obstacle_detection_status.status),
+        )
+        self._last_state = state
+        return state
+
+    @property
+    def is_connected(self) -> bool:
+        """Return True if the base is reachable and the SDK is in sync with it."""
+        return self._connection.connected
+
+    def wait_for_connection(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the SDK is in sync with the base. Return False if timeout elapsed before."""
+        return self._connection.wait(timeout)
+
+    def _sync_state(self, restore: bool = False) -> None:
+        """Fetch the drive mode, control mode and safety values of the base with concurrent RPCs.
+
+        If restore is True (after a loss of connection), the known values are restored on the base first.
+        Otherwise nothing is sent, so that the changes made meanwhile by other clients are kept.
+        """
+        if restore:
+            self._restore_state()
+
+        drive_mode = self._utility_stub.GetZuuuMode.future(Empty(), timeout=SYNC_TIMEOUT)
+        control_mode = self._utility_stub.GetControlMode.future(Empty(), timeout=SYNC_TIMEOUT)
+        safety = self.lidar._stub.GetZuuuSafety.future(Empty(), timeout=SYNC_TIMEOUT)
+        self._drive_mode = util_pb2.ZuuuModePossiblities.keys()[drive_mode.result().mode].lower()
+        self._control_mode = util_pb2.ControlModePossiblities.keys()[control_mode.result().mode].lower()
+        self.lidar._apply_safety_info(safety.result())
+
+    def _restore_state(self) -> None:
+        """Send the known drive mode, control mode and safety values to the base, with concurrent RPCs."""
+        restores = []
+        if self._control_mode in _settable_modes(util_pb2.ControlModePossiblities):
+            req = util_pb2.ControlModeCommand(mode=getattr(util_pb2.ControlModePossiblities, self._control_mode.upper()))
+            restores.append(self._utility_stub.SetControlMode.future(req, timeout=SYNC_TIMEOUT))
+        if self._drive_mode in _settable_modes(util_pb2.ZuuuModePossiblities):
+            req = util_pb2.ZuuuModeCommand(mode=getattr(util_pb2.ZuuuModePossiblities, self._drive_mode.upper()))
+            restores.append(self._utility_stub.SetZuuuMode.future(req, timeout=SYNC_TIMEOUT))
+        if None not in (self.lidar._safety_distance, self.lidar._critical_distance, self.lidar._safety_enabled):
+            restores.append(self.lidar._stub.SetZuuuSafety.future(self.lidar._safety_request(), timeout=SYNC_TIMEOUT))
+        for future in restores:
+            future.result()
+
+    @property
+    def _drive_mode(self) -> Optional[str]:
+        """Last known drive mode, without any RPC."""
+        return self.modes.peek("drive_mode")
+
+    @_drive_mode.setter
+    def _drive_mode(self, mode: Optional[str]) -> None:
+        self.modes.set("drive_mode", mode)
+
+    @property
+    def _control_mode(self) -> Optional[str]:
+        """Last known control mode, without any RPC."""
+        return self.modes.peek("control_mode")
+
+    @_control_mode.setter
+    def _control_mode(self, mode: Optional[str]) -> None:
+        self.modes.set("control_mode", mode)
+
     def _get_drive_mode(self):
         mode_id = self._utility_stub.GetZuuuMode(Empty()).mode
         return util_pb2.ZuuuModePossiblities.keys()[mode_id]
@@ -83,23 +309,81 @@ class MobileBaseSDK:
     @property
     def battery_voltage(self) -> float:
         """Return the battery voltage. Battery should be recharged if it reaches 24.5V or below."""
+        if self._telemetry is not None:
+            return self._telemetry.read("battery_voltage")
+        return self._get_battery_voltage()
+
+    def _get_battery_voltage(self) -> float:
         return round(self._utility_stub.GetBatteryLevel(Empty()).level.value, 1)
 
     @property
     def odometry(self):
         """Return the odometry of the base. x, y are in meters and theta in degree."""
-        response = self._utility_stub.GetOdometry(Empty())
-        odom = {
-            "x": round(response.x.value, 3),
-            "y": round(response.y.value, 3),
-            "theta": round(rad2deg(response.theta.value), 3),
+        if self._telemetry is not None:
+            return dict(self._telemetry.read("odometry"))
+        return self._get_odometry()
+
+    def _get_odometry(self):
+        return _odometry_from_response(self._utility_stub.GetOdometry(Empty()))
+
+    def start_telemetry(self, rates: Optional[Dict[str, float]] = None, max_staleness: Optional[float] = None):
+        """Start caching the odometry, battery voltage and lidar obstacle detection status in the background.
+
+        rates gives the polling rate in Hz of each signal (see DEFAULT_TELEMETRY_RATES), signals left out
+        are not cached. Once started, the odometry, battery_voltage and lidar.obstacle_detection_status
+        properties return the cached values without making any RPC, as long as they are not older than
+        max_staleness seconds (three polling periods by default).
+        The drive and control modes are also refreshed in the background at MODE_REFRESH_RATE, so that
+        changes made by other clients are noticed by the modes callbacks.
+        """
+        self.stop_telemetry()
+        fetchers = {
+            "odometry": self._get_odometry,
+            "battery_voltage": self._get_battery_voltage,
+            "obstacle_detection_status": self.lidar._get_obstacle_detection_status,
         }
-        return odom
+        self._telemetry = TelemetryCache(
+            fetchers=fetchers,
+            rates=rates if rates is not None else DEFAULT_TELEMETRY_RATES,
+            max_staleness=max_staleness,
+        )
+        self.lidar._telemetry = self._telemetry
+        self._telemetry.start()
+        self.modes.start(MODE_REFRESH_RATE)
+        return self._telemetry
+
+    def stop_telemetry(self) -> None:
+        """Stop the telemetry mode. The properties go back to making one RPC per read."""
+        self.modes.stop()
+        if self._telemetry is not None:
+            self._telemetry.stop()
+        self._telemetry = None
+        self.lidar._telemetry = None
+
+    def telemetry_sample(self, signal: str) -> Optional[TelemetrySample]:
+        """Return the last cached sample (value and timestamp) of a signal, None if not available."""
+        if self._telemetry is None:
+            return None
+        return self._telemetry.get(signal)
+
+    def start_tracing(self, capacity: int = 100000) -> Tracer:
+        """Start recording the phases of the SDK and lidar operations (goto, get_map...) as spans.
+
+        The returned Tracer keeps the last capacity spans and exports them in the Chrome trace-event
+        format or as OpenTelemetry spans.
+        """
+        self._tracer = Tracer(capacity=capacity)
+        self.lidar._tracer = self._tracer
+        return self._tracer
+
+    def stop_tracing(self) -> None:
+        """Stop recording spans. The tracer returned by start_tracing keeps the recorded ones."""
+        self._tracer = NULL_TRACER
+        self.lidar._tracer = NULL_TRACER
 
     def _set_drive_mode(self, mode: str):
         """Set the base's drive mode."""
-        all_drive_modes = [mode.lower() for mode in util_pb2.ZuuuModePossiblities.keys()][1:]
-        possible_drive_modes = [mode for mode in all_drive_modes if mode not in ("speed", "goto")]
+        possible_drive_modes = _settable_modes(util_pb2.ZuuuModePossiblities)
         if mode in possible_drive_modes:
             req = util_pb2.ZuuuModeCommand(mode=getattr(util_pb2.ZuuuModePossiblities, mode.upper()))
             self._utility_stub.SetZuuuMode(req)
@@ -109,7 +393,7 @@ class MobileBaseSDK:
 
     def _set_control_mode(self, mode: str):
         """Set the base's control mode."""
-        possible_control_modes = [mode.lower() for mode in util_pb2.ControlModePossiblities.keys()][1:]
+        possible_control_modes = _settable_modes(util_pb2.ControlModePossiblities)
         if mode in possible_control_modes:
             req = util_pb2.ControlModeCommand(mode=getattr(util_pb2.ControlModePossiblities, mode.upper()))
             self._utility_stub.SetControlMode(req)
@@ -128,24 +412,78 @@ class MobileBaseSDK:
         The 200ms duration is predifined at the ROS level of the mobile base's code.
         This mode is prefered if the user wants to send speed instructions frequently.
         """
-        if self._drive_mode != "cmd_vel":
-            self._set_drive_mode("cmd_vel")
+        with self._tracer.span("set_speed"):
+            if self.modes.get("drive_mode") != "cmd_vel":
+                with self._tracer.span("SetZuuuMode"):
+                    self._set_drive_mode("cmd_vel")
 
-        for vel, value in {"x_vel": x_vel, "y_vel": y_vel}.items():
-            if abs(value) > self._max_xy_vel:
-                raise ValueError(f"The asbolute value of {vel} should not be more than {self._max_xy_vel}!")
+            _check_speed_limits(x_vel, y_vel, rot_vel, self._max_xy_vel, self._max_rot_vel)
+            self._send_direction(x_vel, y_vel, rot_vel)
 
-        if abs(rot_vel) > self._max_rot_vel:
-            raise ValueError(f"The asbolute value of rot_vel should not be more than {self._max_rot_vel}!")
+    def _send_direction(self, x_vel: float, y_vel: float, rot_vel: float) -> None:
+        governor = self.governor
+        if governor is not None:
+            x_vel, y_vel, rot_vel = governor.limit(x_vel, y_vel, rot_vel)
+        with self._tracer.span("SendDirection"):
+            self._mobility_stub.SendDirection(_direction_command(x_vel, y_vel, rot_vel))
+        self._commanded_velocity = (x_vel, y_vel, rot_vel)
+        self._commanded_at = time.time()
 
-        req = mob_pb2.TargetDirectionCommand(
-            direction=mob_pb2.DirectionVector(
-                x=FloatValue(value=x_vel),
-                y=FloatValue(value=y_vel),
-                theta=FloatValue(value=deg2rad(rot_vel)),
-            )
+    def start_velocity_stream(self, rate_hz: float = 20.0, setpoint_timeout: Optional[float] = 0.5) -> VelocityStream:
+        """Start sending the velocity set with update_velocity at a fixed rate, from a dedicated thread.
+
+        The command is refreshed before its 200ms duration expires. As a deadman, the setpoint must be
+        updated at least every setpoint_timeout seconds, even if it does not change, otherwise a null
+        velocity is sent instead. With setpoint_timeout=None, it only has to be updated when it changes.
+        The returned VelocityStream gives access to the jitter and dropped updates statistics.
+        """
+        self.stop_velocity_stream()
+        if self.modes.get("drive_mode") != "cmd_vel":
+            self._set_drive_mode("cmd_vel")
+        self._velocity_stream = VelocityStream(
+            send=self._send_direction,
+            rate_hz=rate_hz,
+            setpoint_timeout=setpoint_timeout,
         )
-        self._mobility_stub.SendDirection(req)
+        self._velocity_stream.start()
+        return self._velocity_stream
+
+    def update_velocity(self, x_vel: float, y_vel: float, rot_vel: float) -> None:
+        """Update the velocity sent by the velocity stream. x_vel, y_vel are in m/s and rot_vel in deg/s."""
+        if self._velocity_stream is None:
+            raise RuntimeError("Velocity stream is not started. Call start_velocity_stream first.")
+        _check_speed_limits(x_vel, y_vel, rot_vel, self._max_xy_vel, self._max_rot_vel)
+        self._velocity_stream.update(x_vel, y_vel, rot_vel)
+
+    def stop_velocity_stream(self) -> None:
+        """Stop the velocity stream, if any, and send a null velocity."""
+        if self._velocity_stream is not None:
+            self._velocity_stream.stop()
+        self._velocity_stream = None
+
+    def enable_governor(self, rate_hz: float = 5.0, **kwargs) -> "VelocityGovernor":
+        """Limit the velocity commands depending on the obstacles around the base.
+
+        A VelocityGovernor computes a maximum speed for each heading from the lidar map and the safety
+        distances, refreshed at rate_hz. Velocity commands (set_speed, velocity stream, paths, teleop) are
+        scaled down to it before being sent, and gotos whose straight path gets within the critical
+        distance of an obstacle are not sent. Other keyword arguments are passed to the VelocityGovernor.
+        """
+        # Imported here so that NumPy is only loaded by the SDK when the governor is used.
+        from .governor import VelocityGovernor
+
+        self.disable_governor()
+        governor = VelocityGovernor(self.lidar, **kwargs)
+        governor.update()
+        governor.start(rate_hz)
+        self.governor = governor
+        return governor
+
+    def disable_governor(self) -> None:
+        """Stop limiting the velocity commands."""
+        governor, self.governor = self.governor, None
+        if governor is not None:
+            governor.stop()
 
     def goto(
         self,
@@ -154,7 +492,8 @@ class MobileBaseSDK:
         theta: float,
         timeout: Optional[float] = None,
         tolerance: dict = {"delta_x": 0.1, "delta_y": 0.1, "delta_theta": 15, "distance": 0.1},
-    ):
+        wait: bool = True,
+    ) -> Union[GotoResult, GotoHandle]:
         """Send target position. x, y are in meters and theta is in degree.
 
         (x, y) will define the position of the mobile base in cartesian space
@@ -164,35 +503,70 @@ class MobileBaseSDK:
         to call.
         The tolerance represents the margin along x, y and theta for which we consider
         that the mobile base has arrived its goal.
+
+        By default, the call blocks until the goto is over and returns its GotoResult.
+        With wait=False, a GotoHandle is returned immediately: it can be used to wait for the
+        result, follow the progress or cancel the goto. A new goto preempts the running one.
+        If the governor is enabled and the straight path to the goal is blocked, the goto is not sent and
+        its result has the "obstacle" status.
         """
-        if self.is_off():
-            raise RuntimeError(("Mobile base is off. Goto not sent."))
+        with self._tracer.span("goto", x=x, y=y, theta=theta) as span:
+            with self._tracer.span("goto.is_off"):
+                if self.is_off():
+                    raise RuntimeError(("Mobile base is off. Goto not sent."))
+            _check_goto_limits(x, y, self._max_xy_goto)
+            handle = GotoHandle(goal={"x": x, "y": y, "theta": theta}, convert_distance=_distance_from_response)
+            if self.governor is not None:
+                with self._tracer.span("goto.path_check"):
+                    path_clear = self._goto_path_clear(x, y)
+                if not path_clear:
+                    self._logger.warning("Goto not sent. Path to the target is blocked by an obstacle.")
+                    result = GotoResult(arrived=False, status="obstacle", distance=None, duration=0.0)
+                    if wait:
+                        return result
+                    future: Future = Future()
+                    future.set_result(result)
+                    handle._set_future(future)
+                    return handle
 
-        exc_queue: Queue[Exception] = Queue()
+            if not timeout:
+                # We consider that the max velocity for the mobile base is 0.5 m/s
+                # timeout is 2*_max_xy_goto / max velocity
+                timeout = 2 * self._max_xy_goto / 0.5
 
-        if not timeout:
-            # We consider that the max velocity for the mobile base is 0.5 m/s
-            # timeout is 2*_max_xy_goto / max velocity
-            timeout = 2 * self._max_xy_goto / 0.5
+            self._start_motion(
+                handle,
+                self._goto_async(
+                    x=x,
+                    y=y,
+                    theta=theta,
+                    timeout=timeout,
+                    tolerance=tolerance,
+                    handle=handle,
+                    trace_parent=span,
+                ),
+            )
 
-        def _wrapped_goto():
-            try:
-                asyncio.run(
-                    self._goto_async(
-                        x=x,
-                        y=y,
-                        theta=theta,
-                        timeout=timeout,
-                        tolerance=tolerance,
-                    ),
-                )
-            except Exception as e:
-                exc_queue.put(e)
-
-        with ThreadPoolExecutor() as exec:
-            exec.submit(_wrapped_goto)
-        if not exc_queue.empty():
-            raise exc_queue.get()
+            if not wait:
+                return handle
+            return handle.result()
+
+    def _goto_path_clear(self, x: float, y: float) -> bool:
+        """Return True if the governor finds the straight path to (x, y), in the odometry frame, free."""
+        odometry = self.odometry
+        dx, dy = x - odometry["x"], y - odometry["y"]
+        theta = math.radians(odometry["theta"])
+        # The lidar map is in the robot frame.
+        local_x = math.cos(theta) * dx + math.sin(theta) * dy
+        local_y = -math.sin(theta) * dx + math.cos(theta) * dy
+        return self.governor.path_clear(local_x, local_y)
+
+    def _start_motion(self, handle: GotoHandle, coroutine) -> None:
+        """Run the coroutine of a motion on the worker loop, preempting the running one."""
+        if self._goto_handle is not None:
+            self._goto_handle._preempt()
+        self._goto_handle = handle
+        handle._set_future(self._worker.submit(coroutine))
 
     async def _goto_async(
         self,
@@ -201,45 +575,386 @@ class MobileBaseSDK:
         theta: float,
         timeout: float,
         tolerance: dict = {"delta_x": 0.1, "delta_y": 0.1, "delta_theta": 15, "distance": 0.1},
-    ):
+        handle: Optional[GotoHandle] = None,
+        trace_parent=None,
+    ) -> GotoResult:
         """Async version of the goto method."""
-        for pos, value in {"x": x, "y": y}.items():
-            if abs(value) > self._max_xy_goto:
-                raise ValueError(f"The asbolute value of {pos} should not be more than {self._max_xy_goto}!")
-
-        req = mob_pb2.GoToVector(
-            x_goal=FloatValue(value=x),
-            y_goal=FloatValue(value=y),
-            theta_goal=FloatValue(value=deg2rad(theta)),
+        _check_goto_limits(x, y, self._max_xy_goto)
+
+        tic = time.time()
+        monitor = ConvergenceMonitor(tolerance)
+        status = "timeout"
+        response = None
+        last_obstacle_check = time.monotonic()
+        tracer = self._tracer
+        # The goto runs on the worker loop: its spans are attached to the span of the goto call explicitly.
+        with tracer.span("goto.control", parent=trace_parent) as span:
+            try:
+                self._drive_mode = "goto"
+                with tracer.span("SendGoTo"):
+                    self._mobility_stub.SendGoTo(_goto_command(x, y, theta))
+
+                while True:
+                    with tracer.span("DistanceToGoal"):
+                        response = self._mobility_stub.DistanceToGoal(Empty())
+                    now = time.monotonic()
+                    if handle is not None:
+                        handle._report_raw_progress(response)
+                    if monitor.update(
+                        response.delta_x.value, response.delta_y.value, response.delta_theta.value, response.distance.value, now
+                    ):
+                        status = "arrived"
+                        break
+
+                    stalled_for = monitor.time_without_progress(now)
+                    # The obstacle detection status is checked at most every GOTO_STALL_CHECK, whatever the polling rate.
+                    if stalled_for >= GOTO_STALL_CHECK and now - last_obstacle_check >= GOTO_STALL_CHECK:
+                        last_obstacle_check = now
+                        with tracer.span("goto.obstacle_check"):
+                            obstacle = self.lidar.obstacle_detection_status == "OBJECT_DETECTED_STOP"
+                        if obstacle:
+                            self._logger.warning("Target not reached. Mobile base stopped because of obstacle.")
+                            status = "obstacle"
+                            break
+                        if stalled_for >= GOTO_STALL_TIMEOUT:
+                            self._logger.warning("Target not reached. Mobile base stopped making progress.")
+                            status = "stalled"
+                            break
+
+                    remaining = timeout - (time.time() - tic)
+                    if remaining <= 0:
+                        break
+                    interval = min(monitor.next_interval(), remaining)
+                    with tracer.span("goto.sleep", interval=interval):
+                        await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                # A preempted goto is replaced by a new goal, only a cancelled one stops the base.
+                if handle is not None and handle.status == "cancelled":
+                    self._set_drive_mode("brake")
+                span.set_attribute("status", handle.status if handle is not None else "cancelled")
+                raise
+            span.set_attribute("status", status)
+
+        distance_to_goal = _distance_from_response(response) if response is not None else None
+        return GotoResult(
+            arrived=status == "arrived", status=status, distance=distance_to_goal, duration=time.time() - tic
+        )
+
+    def goto_closed_loop(
+        self,
+        x: float,
+        y: float,
+        theta: float,
+        timeout: Optional[float] = None,
+        tolerance: dict = {"delta_x": 0.01, "delta_y": 0.01, "delta_theta": 1.0},
+        rate_hz: float = 50.0,
+        max_xy_vel: float = 0.5,
+        max_xy_acc: float = 0.5,
+        max_rot_vel: float = 90.0,
+        max_rot_acc: float = 180.0,
+        xy_gain: float = 2.0,
+        rot_gain: float = 2.0,
+        min_xy_vel: float = 0.01,
+        min_rot_vel: float = 2.0,
+        settle_time: float = 0.1,
+        pose_estimator: Optional["PoseEstimator"] = None,
+        wait: bool = True,
+    ) -> Union[GotoResult, GotoHandle]:
+        """Send target position, reached with velocity commands computed by the SDK. x, y are in meters and theta is in degree.
+
+        Unlike goto, the goal is not limited to 1m and the approach can be tuned: a GotoController
+        sends a command at rate_hz, within the velocity and acceleration limits (m/s, m/s^2, deg/s and
+        deg/s^2), with the given proportional gains and minimum speeds for the final approach (see
+        GotoController). The goal is reached once within tolerance for settle_time seconds.
+        The pose is read from the odometry at each tick (cached if the telemetry is started), or
+        estimated without any RPC by pose_estimator if given.
+
+        The result and handle are the same as with goto: by default, the call blocks and returns a
+        GotoResult, wait=False returns a GotoHandle, and a new goto or path preempts the running one.
+        """
+        if self.is_off():
+            raise RuntimeError(("Mobile base is off. Goto not sent."))
+        if rate_hz <= 0:
+            raise ValueError("rate_hz should be strictly positive!")
+        _check_speed_limits(max_xy_vel, max_xy_vel, max_rot_vel, self._max_xy_vel, self._max_rot_vel)
+        controller = GotoController(
+            max_xy_vel=max_xy_vel,
+            max_xy_acc=max_xy_acc,
+            max_rot_vel=max_rot_vel,
+            max_rot_acc=max_rot_acc,
+            xy_gain=xy_gain,
+            rot_gain=rot_gain,
+            min_xy_vel=min_xy_vel,
+            min_rot_vel=min_rot_vel,
+            tolerance=tolerance,
+        )
+        read_pose = (lambda: pose_estimator.pose) if pose_estimator is not None else (lambda: self.odometry)
+
+        if not timeout:
+            # Twice the time at full speed, plus time to accelerate and settle.
+            distance = _distance_to_pose(read_pose(), x, y, theta)
+            timeout = 2 * (distance["distance"] / max_xy_vel + abs(distance["delta_theta"]) / max_rot_vel) + 2.0
+
+        handle = GotoHandle(goal={"x": x, "y": y, "theta": theta})
+        self._start_motion(
+            handle,
+            self._goto_closed_loop_async(
+                goal=(x, y, theta),
+                controller=controller,
+                read_pose=read_pose,
+                period=1.0 / rate_hz,
+                timeout=timeout,
+                settle_time=settle_time,
+                handle=handle,
+            ),
         )
-        self._drive_mode = "go_to"
-        self._mobility_stub.SendGoTo(req)
 
+        if not wait:
+            return handle
+        return handle.result()
+
+    async def _goto_closed_loop_async(
+        self,
+        goal: Tuple[float, float, float],
+        controller: GotoController,
+        read_pose: Callable[[], Dict[str, float]],
+        period: float,
+        timeout: float,
+        settle_time: float,
+        handle: Optional[GotoHandle] = None,
+    ) -> GotoResult:
+        """Drive the base to the goal with velocity commands, see goto_closed_loop."""
         tic = time.time()
-        arrived: bool
-        while time.time() - tic < timeout:
-            arrived = True
-            distance_to_goal = self._distance_to_goto_goal()
-            for delta_key in tolerance.keys():
-                if tolerance[delta_key] < abs(distance_to_goal[delta_key]):
-                    arrived = False
-                    break
-            await asyncio.sleep(0.1)
-            if arrived:
-                break
-
-        if not arrived and self.lidar.obstacle_detection_status == "OBJECT_DETECTED_STOP":
-            self._logger.warning("Target not reached. Mobile base stopped because of obstacle.")
+        status = "timeout"
+        distance_to_goal = None
+        settled_since: Optional[float] = None
+        # Progress is measured on the remaining distance, with one degree counting as one centimeter.
+        best_error = math.inf
+        progress_at = last_obstacle_check = time.monotonic()
+        with self._tracer.span("goto_closed_loop", x=goal[0], y=goal[1], theta=goal[2]) as span:
+            try:
+                if self._drive_mode != "cmd_vel":
+                    self._set_drive_mode("cmd_vel")
+
+                tick = 0
+                while True:
+                    pose = read_pose()
+                    now = time.monotonic()
+                    distance_to_goal = _distance_to_pose(pose, *goal)
+                    if handle is not None:
+                        handle._report_progress(distance_to_goal)
+
+                    if controller.in_tolerance(distance_to_goal):
+                        settled_since = now if settled_since is None else settled_since
+                        if now - settled_since >= settle_time:
+                            status = "arrived"
+                            break
+                    else:
+                        settled_since = None
+
+                    error = distance_to_goal["distance"] + abs(distance_to_goal["delta_theta"]) / 100.0
+                    if error < best_error - 1e-3:
+                        best_error, progress_at = error, now
+                    elif now - progress_at >= GOTO_STALL_CHECK and now - last_obstacle_check >= GOTO_STALL_CHECK:
+                        last_obstacle_check = now
+                        with self._tracer.span("goto.obstacle_check"):
+                            obstacle = self.lidar.obstacle_detection_status == "OBJECT_DETECTED_STOP"
+                        if obstacle:
+                            self._logger.warning("Target not reached. Mobile base stopped because of obstacle.")
+                            status = "obstacle"
+                            break
+                        if now - progress_at >= GOTO_STALL_TIMEOUT:
+                            self._logger.warning("Target not reached. Mobile base stopped making progress.")
+                            status = "stalled"
+                            break
+
+                    if time.time() - tic >= timeout:
+                        break
+                    self._send_direction(*controller.command(pose, goal, period))
+
+                    # Commands are sent on a fixed time grid, so that a slow RPC does not shift the next ones.
+                    tick = max(tick + 1, int((time.time() - tic) / period))
+                    await asyncio.sleep(max(tic + tick * period - time.time(), 0.0))
+            except asyncio.CancelledError:
+                # A preempted goto is replaced by a new motion, only a cancelled one stops the base.
+                if handle is not None and handle.status == "cancelled":
+                    self._set_drive_mode("brake")
+                span.set_attribute("status", handle.status if handle is not None else "cancelled")
+                raise
+            self._send_direction(0.0, 0.0, 0.0)
+            span.set_attribute("status", status)
+
+        return GotoResult(
+            arrived=status == "arrived", status=status, distance=distance_to_goal, duration=time.time() - tic
+        )
+
+    def follow_path(
+        self,
+        waypoints,
+        max_xy_vel: float = 0.5,
+        max_xy_acc: float = 0.5,
+        max_rot_vel: float = 90.0,
+        blend_distance: float = 0.2,
+        rate_hz: float = 20.0,
+        gain: float = 1.5,
+        settle_timeout: float = 2.0,
+        tolerance: dict = {"delta_x": 0.1, "delta_y": 0.1, "delta_theta": 15, "distance": 0.1},
+        wait: bool = True,
+    ) -> Union[GotoResult, GotoHandle]:
+        """Follow a path through waypoints without stopping at the intermediate ones.
+
+        waypoints is a list of (x, y, theta) or (x, y) positions in the odometry frame, in meters and
+        degree, an (x, y) waypoint keeping the orientation of the previous one. A trajectory is planned
+        from the current odometry, with the corners blended over blend_distance meters and the speed
+        limited by max_xy_vel (m/s), max_xy_acc (m/s^2) and max_rot_vel (deg/s). It is then followed
+        with velocity commands sent at rate_hz, corrected by a proportional feedback of the given gain on
+        the position error.
+
+        The path is over once the trajectory has been played and the final waypoint is within tolerance,
+        or settle_timeout seconds after the end of the trajectory. As with goto, wait=False returns a
+        GotoHandle, and a new goto or path preempts the running one.
+        """
+        if self.is_off():
+            raise RuntimeError(("Mobile base is off. Path not sent."))
+        if rate_hz <= 0:
+            raise ValueError("rate_hz should be strictly positive!")
+        _check_speed_limits(max_xy_vel, max_xy_vel, max_rot_vel, self._max_xy_vel, self._max_rot_vel)
+
+        # Imported here so that NumPy is only loaded by the SDK when a path is planned.
+        from .path_following import plan_path
+
+        odometry = self.odometry
+        with self._tracer.span("follow_path.plan", waypoints=len(waypoints)):
+            trajectory = plan_path(
+                start=(odometry["x"], odometry["y"], odometry["theta"]),
+                waypoints=waypoints,
+                max_xy_vel=max_xy_vel,
+                max_xy_acc=max_xy_acc,
+                max_rot_vel=max_rot_vel,
+                blend_distance=blend_distance,
+                dt=1.0 / rate_hz,
+            )
+
+        goal = {"x": float(trajectory.x[-1]), "y": float(trajectory.y[-1]), "theta": float(trajectory.theta[-1])}
+        handle = GotoHandle(goal=goal)
+        self._start_motion(
+            handle,
+            self._follow_path_async(
+                trajectory=trajectory,
+                period=1.0 / rate_hz,
+                gain=gain,
+                settle_timeout=settle_timeout,
+                tolerance=tolerance,
+                handle=handle,
+            ),
+        )
+
+        if not wait:
+            return handle
+        return handle.result()
+
+    async def _follow_path_async(
+        self,
+        trajectory: "PathTrajectory",
+        period: float,
+        gain: float,
+        settle_timeout: float,
+        tolerance: dict,
+        handle: Optional[GotoHandle] = None,
+    ) -> GotoResult:
+        """Play the trajectory with velocity commands, see follow_path."""
+        goal_x, goal_y, goal_theta = float(trajectory.x[-1]), float(trajectory.y[-1]), float(trajectory.theta[-1])
+        timeout = trajectory.duration + settle_timeout
+
+        tic = time.time()
+        status = "timeout"
+        distance_to_goal = None
+        # Unlike a goto, the distance to the final waypoint may grow along the path. Progress is measured
+        # on the motion of the base instead, with one degree counting as one centimeter.
+        moved_from = None
+        progress_at = last_obstacle_check = time.monotonic()
+        with self._tracer.span(
+            "follow_path", x=goal_x, y=goal_y, theta=goal_theta, duration=trajectory.duration
+        ) as span:
+            try:
+                if self._drive_mode != "cmd_vel":
+                    self._set_drive_mode("cmd_vel")
+
+                tick = 0
+                while True:
+                    elapsed = time.time() - tic
+                    odometry = self.odometry
+                    now = time.monotonic()
+                    distance_to_goal = _distance_to_pose(odometry, goal_x, goal_y, goal_theta)
+                    if handle is not None:
+                        handle._report_progress(distance_to_goal)
+                    if elapsed >= trajectory.duration:
+                        if all(abs(distance_to_goal[key]) <= value for key, value in tolerance.items()):
+                            status = "arrived"
+                            break
+                        if elapsed >= timeout:
+                            break
+
+                    moved = (
+                        math.inf
+                        if moved_from is None
+                        else math.hypot(odometry["x"] - moved_from["x"], odometry["y"] - moved_from["y"])
+                        + abs(_wrap_angle(odometry["theta"] - moved_from["theta"])) / 100.0
+                    )
+                    if moved > 1e-3:
+                        moved_from, progress_at = odometry, now
+                    elif now - progress_at >= GOTO_STALL_CHECK and now - last_obstacle_check >= GOTO_STALL_CHECK:
+                        last_obstacle_check = now
+                        with self._tracer.span("goto.obstacle_check"):
+                            obstacle = self.lidar.obstacle_detection_status == "OBJECT_DETECTED_STOP"
+                        if obstacle:
+                            self._logger.warning("Path not completed. Mobile base stopped because of obstacle.")
+                            status = "obstacle"
+                            break
+                        if now - progress_at >= GOTO_STALL_TIMEOUT:
+                            self._logger.warning("Path not completed. Mobile base stopped making progress.")
+                            status = "stalled"
+                            break
+
+                    x, y, theta, x_vel, y_vel, rot_vel = trajectory.sample(elapsed)
+                    # Feedforward velocity plus a proportional correction, in the odometry frame.
+                    x_vel += gain * (x - odometry["x"])
+                    y_vel += gain * (y - odometry["y"])
+                    rot_vel += gain * _wrap_angle(theta - odometry["theta"])
+                    self._send_direction(*self._path_command(x_vel, y_vel, rot_vel, odometry["theta"]))
+
+                    # Commands are sent on a fixed time grid, so that a slow RPC does not shift the next ones.
+                    tick = max(tick + 1, int((time.time() - tic) / period))
+                    await asyncio.sleep(max(tic + tick * period - time.time(), 0.0))
+            except asyncio.CancelledError:
+                # A preempted path is replaced by a new motion, only a cancelled one stops the base.
+                if handle is not None and handle.status == "cancelled":
+                    self._set_drive_mode("brake")
+                span.set_attribute("status", handle.status if handle is not None else "cancelled")
+                raise
+            self._send_direction(0.0, 0.0, 0.0)
+
+            if status == "timeout" and self.lidar.obstacle_detection_status == "OBJECT_DETECTED_STOP":
+                self._logger.warning("Path not completed. Mobile base stopped because of obstacle.")
+                status = "obstacle"
+            span.set_attribute("status", status)
+
+        return GotoResult(
+            arrived=status == "arrived", status=status, distance=distance_to_goal, duration=time.time() - tic
+        )
+
+    def _path_command(self, x_vel: float, y_vel: float, rot_vel: float, theta: float):
+        """Rotate an odometry frame velocity in the robot frame, clipped to the speed limits."""
+        cos, sin = math.cos(math.radians(theta)), math.sin(math.radians(theta))
+        x_vel, y_vel = cos * x_vel + sin * y_vel, cos * y_vel - sin * x_vel
+        return (
+            min(max(x_vel, -self._max_xy_vel), self._max_xy_vel),
+            min(max(y_vel, -self._max_xy_vel), self._max_xy_vel),
+            min(max(rot_vel, -self._max_rot_vel), self._max_rot_vel),
+        )
 
     def _distance_to_goto_goal(self):
-        response = self._mobility_stub.DistanceToGoal(Empty())
-        distance = {
-            "delta_x": round(response.delta_x.value, 3),
-            "delta_y": round(response.delta_y.value, 3),
-            "delta_theta": round(rad2deg(response.delta_theta.value), 3),
-            "distance": round(response.distance.value, 3),
-        }
-        return distance
+        return _distance_from_response(self._mobility_stub.DistanceToGoal(Empty()))
 
     def turn_on(self) -> None:
         """Stop the mobile base immediately by changing its drive mode to 'brake'."""
@@ -250,15 +965,83 @@ class MobileBaseSDK:
         self._set_drive_mode("free_wheel")
 
     def is_on(self) -> bool:
-        """Return True if the mobile base is not compliant."""
-        self._drive_mode = self._get_drive_mode().lower()
-        return not self._drive_mode == "free_wheel"
+        """Return True if the mobile base is not compliant. The drive mode is fetched if the cached one expired."""
+        return not self.modes.get("drive_mode") == "free_wheel"
 
     def is_off(self) -> bool:
-        """Return True if the mobile base is compliant."""
-        self._drive_mode = self._get_drive_mode().lower()
-        return self._drive_mode == "free_wheel"
+        """Return True if the mobile base is compliant. The drive mode is fetched if the cached one expired."""
+        return self.modes.get("drive_mode") == "free_wheel"
 
     def _set_safety(self, safety_on):
         req = mob_pb2.SetZuuuSafetyRequest(safety_on=BoolValue(value=safety_on))
         self._utility_stub.SetZuuuSafety(req)
+
+
+def _settable_modes(possibilities) -> List[str]:
+    """Return the modes of a mode enum that can be set by the SDK, in lower case."""
+    return [mode.lower() for mode in possibilities.keys()[1:] if mode.lower() not in ("speed", "goto")]
+
+
+def _odometry_from_response(response) -> Dict[str, float]:
+    return {
+        "x": round(response.x.value, 3),
+        "y": round(response.y.value, 3),
+        "theta": round(math.degrees(response.theta.value), 3),
+    }
+
+
+def _distance_from_response(response) -> Dict[str, float]:
+    return {
+        "delta_x": round(response.delta_x.value, 3),
+        "delta_y": round(response.delta_y.value, 3),
+        "delta_theta": round(math.degrees(response.delta_theta.value), 3),
+        "distance": round(response.distance.value, 3),
+    }
+
+
+def _distance_to_pose(odometry: Dict[str, float], x: float, y: float, theta: float) -> Dict[str, float]:
+    """Return the distance from the odometry to a pose, in the same format as DistanceToGoal."""
+    delta_x, delta_y = x - float(odometry["x"]), y - float(odometry["y"])
+    return {
+        "delta_x": round(delta_x, 3),
+        "delta_y": round(delta_y, 3),
+        "delta_theta": round(_wrap_angle(theta - float(odometry["theta"])), 3),
+        "distance": round(math.hypot(delta_x, delta_y), 3),
+    }
+
+
+def _wrap_angle(angle: float) -> float:
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+def _check_speed_limits(x_vel: float, y_vel: float, rot_vel: float, max_xy_vel: float, max_rot_vel: float) -> None:
+    for vel, value in {"x_vel": x_vel, "y_vel": y_vel}.items():
+        if abs(value) > max_xy_vel:
+            raise ValueError(f"The asbolute value of {vel} should not be more than {max_xy_vel}!")
+
+    if abs(rot_vel) > max_rot_vel:
+        raise ValueError(f"The asbolute value of rot_vel should not be more than {max_rot_vel}!")
+
+
+def _check_goto_limits(x: float, y: float, max_xy_goto: float) -> None:
+    for pos, value in {"x": x, "y": y}.items():
+        if abs(value) > max_xy_goto:
+            raise ValueError(f"The asbolute value of {pos} should not be more than {max_xy_goto}!")
+
+
+def _direction_command(x_vel: float, y_vel: float, rot_vel: float):
+    return mob_pb2.TargetDirectionCommand(
+        direction=mob_pb2.DirectionVector(
+            x=FloatValue(value=x_vel),
+            y=FloatValue(value=y_vel),
+            theta=FloatValue(value=math.radians(rot_vel)),
+        )
+    )
+
+
+def _goto_command(x: float, y: float, theta: float):
+    return mob_pb2.GoToVector(
+        x_goal=FloatValue(value=x),
+        y_goal=FloatValue(value=y),
+        theta_goal=FloatValue(value=math.radians(theta)),
+    )
@@ -0,0 +1,124 @@
+"""Modes module for mobile base SDK.
+
+Caches the drive mode and control mode of the mobile base:
+    - a cached mode is used as long as it is not older than its time to live, and fetched otherwise
+    - modes set by the SDK replace the cached ones right away
+    - modes are refreshed in the background, so that changes made by other clients are noticed
+    - callbacks are called whenever a mode changes
+"""
+import threading
+import time
+from logging import getLogger
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class ModeCache:
+    """Cache of modes, each one defined by a fetch function (doing the RPC) returning it.
+
+    A cached mode older than ttl seconds is fetched again when read with get.
+    """
+
+    def __init__(self, fetchers: Dict[str, Callable[[], str]], ttl: float = 2.0) -> None:
+        """Set up an empty cache. Background refresh starts with the start method."""
+        if ttl < 0:
+            raise ValueError("ttl should be positive!")
+        self._logger = getLogger()
+        self._fetchers = fetchers
+        self._ttl = ttl
+        # Mode and time.monotonic at which it was known to be valid.
+        self._modes: Dict[str, Tuple[Optional[str], float]] = {name: (None, -float("inf")) for name in fetchers}
+        self._callbacks: List[Callable[[str, Optional[str], str], None]] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        """Return True if the modes are refreshed in the background."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def get(self, name: str, max_age: Optional[float] = None) -> str:
+        """Return the mode, fetching it if the cached one is older than max_age seconds (ttl by default)."""
+        mode, timestamp = self._modes[name]
+        if mode is None or time.monotonic() - timestamp > (self._ttl if max_age is None else max_age):
+            mode = self.refresh(name)
+        return mode
+
+    def peek(self, name: str) -> Optional[str]:
+        """Return the cached mode without fetching it, None if it was never known."""
+        return self._modes[name][0]
+
+    def age(self, name: str) -> float:
+        """Return the time in seconds since the mode was last known to be valid (inf if never)."""
+        return time.monotonic() - self._modes[name][1]
+
+    def refresh(self, name: str) -> str:
+        """Fetch the mode now and return it."""
+        started = time.monotonic()
+        mode = self._fetchers[name]()
+        # A mode set while the RPC was in flight is more recent than the fetched one.
+        return self._store(name, mode, started)
+
+    def set(self, name: str, mode: Optional[str]) -> None:
+        """Replace the cached mode, e.g. after setting it. None marks it as unknown."""
+        self._store(name, mode, time.monotonic() if mode is not None else -float("inf"), force=True)
+
+    def _store(self, name: str, mode: Optional[str], timestamp: float, force: bool = False) -> Optional[str]:
+        with self._lock:
+            previous, previous_timestamp = self._modes[name]
+            if not force and timestamp < previous_timestamp:
+                return previous
+            self._modes[name] = (mode, timestamp)
+            callbacks = list(self._callbacks) if mode is not None and mode != previous else []
+        for callback in callbacks:
+            try:
+                callback(name, previous, mode)
+            except Exception as e:
+                self._logger.warning(f"Mode change callback failed: {e}")
+        return mode
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Mark a mode (every mode by default) as outdated, so that the next get fetches it."""
+        with self._lock:
+            for key in [name] if name is not None else list(self._modes):
+                self._modes[key] = (self._modes[key][0], -float("inf"))
+
+    def add_callback(self, callback: Callable[[str, Optional[str], str], None]) -> None:
+        """Call callback(name, previous, mode) whenever a mode changes. previous is None the first time."""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[str, Optional[str], str], None]) -> None:
+        """Stop calling callback."""
+        with self._lock:
+            self._callbacks.remove(callback)
+
+    def start(self, rate_hz: float = 1.0) -> None:
+        """Refresh every mode at rate_hz in a background thread."""
+        if self.is_running:
+            return
+        if rate_hz <= 0:
+            raise ValueError("rate_hz should be strictly positive!")
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, args=(1.0 / rate_hz,), name="mobile-base-modes", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop refreshing the modes in the background."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _refresh_loop(self, period: float) -> None:
+        error = False
+        while not self._stop_event.wait(period):
+            try:
+                for name in self._fetchers:
+                    self.refresh(name)
+                error = False
+            except Exception as e:
+                # Only the first failure of a series is logged, cached modes expire meanwhile.
+                if not error:
+                    self._logger.warning(f"Could not refresh the modes: {e}")
+                error = True
@@ -0,0 +1,287 @@
+"""Occupancy grid module for mobile base SDK.
+
+Builds an occupancy grid from the lidar map and answers vectorized queries on it:
+    - distance to the nearest obstacle of many points at once
+    - ray casts along many headings
+    - free-space checks along segments (e.g. the path of a goto)
+    - free angular sectors around the robot
+
+Points are expressed in meters in the robot frame: x forward (towards the top of the map),
+y to the left. Headings are in degrees, 0 is forward and positive angles turn counterclockwise.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class OccupancyGrid:
+    """Occupancy grid with a precomputed distance transform and polar index.
+
+    The distance transform is truncated at max_distance: points farther than that from any obstacle
+    are reported at max_distance. The truncation lets a new map only recompute the regions around
+    the cells that changed.
+    """
+
+    def __init__(
+        self,
+        occupied: np.ndarray,
+        resolution: float,
+        origin: Optional[Tuple[float, float]] = None,
+        max_distance: float = 2.0,
+        angular_bins: int = 360,
+    ) -> None:
+        """Create the grid from a boolean array of occupied cells.
+
+        resolution is the size of a cell in meters, origin is the (row, col) position of the robot in the
+        grid (the center of the grid by default).
+        """
+        if occupied.ndim != 2:
+            raise ValueError("occupied should be a 2D array!")
+        if resolution <= 0 or max_distance <= 0:
+            raise ValueError("resolution and max_distance should be strictly positive!")
+
+        self._resolution = resolution
+        self._max_distance = max_distance
+        # Number of cells over which the distance transform is computed.
+        self._max_cells = int(np.ceil(max_distance / resolution))
+        self._angular_bins = angular_bins
+
+        height, width = occupied.shape
+        self._origin = origin if origin is not None else ((height - 1) / 2, (width - 1) / 2)
+
+        rows, cols = np.mgrid[:height, :width]
+        x = (self._origin[0] - rows) * resolution
+        y = (self._origin[1] - cols) * resolution
+        self._cell_ranges = np.hypot(x, y)
+        self._cell_bins = self._heading_to_bin(np.rad2deg(np.arctan2(y, x)))
+        # Cells grouped by angular bin, so that the polar index of a few bins is recomputed from their cells only.
+        flat_bins = self._cell_bins.ravel()
+        self._polar_order = np.argsort(flat_bins, kind="stable")
+        self._polar_bounds = np.searchsorted(flat_bins[self._polar_order], np.arange(angular_bins + 1))
+        self._polar_cell_ranges = self._cell_ranges.ravel()[self._polar_order]
+
+        self._occupied = occupied.astype(bool)
+        self._distance = self._distance_transform(self._occupied)
+        self._polar_ranges = np.full(angular_bins, np.inf)
+        self._update_polar_index(np.arange(angular_bins))
+
+    @classmethod
+    def from_map(
+        cls,
+        lidar_map,
+        resolution: float,
+        threshold: int = 127,
+        obstacles_are_dark: bool = False,
+        **kwargs,
+    ) -> "OccupancyGrid":
+        """Create the grid from a lidar map (PIL image or NumPy array).
+
+        Cells brighter than threshold are occupied, or darker than it if obstacles_are_dark.
+        Other keyword arguments are passed to the constructor.
+        """
+        return cls(_occupied_cells(lidar_map, threshold, obstacles_are_dark), resolution, **kwargs)
+
+    @classmethod
+    def from_lidar(cls, lidar, resolution: float, **kwargs) -> "OccupancyGrid":
+        """Create the grid from the current map of a Lidar."""
+        return cls.from_map(lidar.get_map_array(), resolution, **kwargs)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Shape (rows, cols) of the grid."""
+        return self._occupied.shape
+
+    @property
+    def resolution(self) -> float:
+        """Size of a cell in meters."""
+        return self._resolution
+
+    @property
+    def occupied(self) -> np.ndarray:
+        """Boolean array of the occupied cells."""
+        return self._occupied
+
+    @property
+    def distance_map(self) -> np.ndarray:
+        """Distance in meters from each cell to the nearest obstacle, truncated at max_distance."""
+        return self._distance
+
+    @property
+    def polar_ranges(self) -> np.ndarray:
+        """Range in meters of the nearest obstacle from the robot in each angular bin (inf if none)."""
+        return self._polar_ranges
+
+    def update(
+        self, lidar_map=None, occupied: Optional[np.ndarray] = None, threshold: int = 127, obstacles_are_dark: bool = False
+    ) -> bool:
+        """Update the grid with a new map, or directly with a new array of occupied cells.
+
+        Only the region around the cells that changed is recomputed. Return False if nothing changed.
+        """
+        if occupied is None:
+            if lidar_map is None:
+                raise ValueError("Either lidar_map or occupied should be given!")
+            occupied = _occupied_cells(lidar_map, threshold, obstacles_are_dark)
+        occupied = occupied.astype(bool)
+        if occupied.shape != self._occupied.shape:
+            raise ValueError(f"The new map should have the same shape as the grid {self.shape}!")
+
+        changed_rows, changed_cols = np.nonzero(occupied != self._occupied)
+        if len(changed_rows) == 0:
+            return False
+        self._occupied = occupied
+
+        # Truncated distances only depend on obstacles closer than max_cells: cells farther than that from
+        # every change keep their distance, and the ones to update only need obstacles up to 2 * max_cells away.
+        margin = self._max_cells + 1
+        height, width = self.shape
+        r0, r1 = max(changed_rows.min() - margin, 0), min(changed_rows.max() + margin + 1, height)
+        c0, c1 = max(changed_cols.min() - margin, 0), min(changed_cols.max() + margin + 1, width)
+        s_r0, s_r1 = max(r0 - margin, 0), min(r1 + margin, height)
+        s_c0, s_c1 = max(c0 - margin, 0), min(c1 + margin, width)
+
+        distance = self._distance_transform(occupied[s_r0:s_r1, s_c0:s_c1])
+        self._distance[r0:r1, c0:c1] = distance[r0 - s_r0:r1 - s_r0, c0 - s_c0:c1 - s_c0]
+        # Only the angular bins holding a changed cell can see their nearest obstacle change.
+        self._update_polar_index(np.unique(self._cell_bins[changed_rows, changed_cols]))
+        return True
+
+    def distance(self, points) -> np.ndarray:
+        """Return the distance in meters to the nearest obstacle of each point of an (N, 2) array.
+
+        Points outside of the grid are considered at max_distance from any obstacle.
+        """
+        rows, cols, inside = self._to_cells(np.asarray(points, dtype=float))
+        distance = np.full(len(rows), self._max_distance)
+        distance[inside] = self._distance[rows[inside], cols[inside]]
+        return distance
+
+    def raycast(self, headings, origins=None, max_range: Optional[float] = None) -> np.ndarray:
+        """Cast rays along headings (in degrees) and return the range in meters of the first obstacle hit.
+
+        origins is an (N, 2) array of ray origins, the robot by default. Rays that hit nothing
+        within max_range (the extent of the grid by default) return max_range.
+        """
+        headings = np.deg2rad(np.atleast_1d(np.asarray(headings, dtype=float)))
+        if origins is None:
+            origins = np.zeros((len(headings), 2))
+        origins = np.broadcast_to(np.asarray(origins, dtype=float), (len(headings), 2))
+        if max_range is None:
+            max_range = float(np.hypot(*self.shape)) * self._resolution
+        directions = np.stack((np.cos(headings), np.sin(headings)), axis=1)
+
+        # Sphere tracing: each ray advances by the distance to the nearest obstacle, which cannot be crossed.
+        ranges = np.zeros(len(headings))
+        active = np.ones(len(headings), dtype=bool)
+        while active.any():
+            index = np.nonzero(active)[0]
+            distance = self.distance(origins[index] + ranges[index, None] * directions[index])
+            hit = distance < self._resolution
+            ranges[index[~hit]] += distance[~hit]
+            active[index[hit]] = False
+            active &= ranges < max_range
+        return np.minimum(ranges, max_range)
+
+    def segments_free(self, starts, ends, clearance: float = 0.0) -> np.ndarray:
+        """Return for each segment (from an (N, 2) starts array to an (N, 2) ends array) whether it is free.
+
+        A segment is free if all its points are farther than clearance meters from any obstacle.
+        """
+        starts = np.atleast_2d(np.asarray(starts, dtype=float))
+        ends = np.atleast_2d(np.asarray(ends, dtype=float))
+        length = np.hypot(*(ends - starts).T).max(initial=0.0)
+        steps = np.linspace(0.0, 1.0, int(np.ceil(length / self._resolution)) + 2)
+        points = starts[:, None, :] + steps[None, :, None] * (ends - starts)[:, None, :]
+        distance = self.distance(points.reshape(-1, 2)).reshape(points.shape[:2])
+        return distance.min(axis=1) > clearance
+
+    def segment_free(self, start, end, clearance: float = 0.0) -> bool:
+        """Return True if all the points of the segment are farther than clearance meters from any obstacle."""
+        return bool(self.segments_free(start, end, clearance)[0])
+
+    def goto_free(self, x: float, y: float, clearance: float = 0.0) -> bool:
+        """Return True if the straight path from the robot to (x, y) is free."""
+        return self.segment_free((0.0, 0.0), (x, y), clearance)
+
+    def polar_range(self, headings) -> np.ndarray:
+        """Return the range of the nearest obstacle from the robot in the angular bin of each heading."""
+        return self._polar_ranges[self._heading_to_bin(np.asarray(headings, dtype=float))]
+
+    def free_sectors(self, min_range: float) -> List[Tuple[float, float]]:
+        """Return the angular sectors (start, end) in degrees where no obstacle is closer than min_range.
+
+        Sectors are counterclockwise from start to end, and can wrap around 180 degrees.
+        """
+        free = self._polar_ranges >= min_range
+        if free.all():
+            return [(-180.0, 180.0)]
+        # Rotate the bins to start on an occupied one so that no sector wraps around the array.
+        shift = int(np.argmin(free))
+        rolled = np.roll(free, -shift).astype(np.int8)
+        edges = np.diff(np.concatenate(([0], rolled, [0])))
+        starts, ends = np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0]
+        bin_width = 360.0 / self._angular_bins
+        return [
+            (
+                _wrap_angle((start + shift) * bin_width - 180.0),
+                _wrap_angle((end + shift) * bin_width - 180.0),
+            )
+            for start, end in zip(starts, ends)
+        ]
+
+    def _to_cells(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows = np.rint(self._origin[0] - points[:, 0] / self._resolution).astype(int)
+        cols = np.rint(self._origin[1] - points[:, 1] / self._resolution).astype(int)
+        height, width = self.shape
+        inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        return rows, cols, inside
+
+    def _heading_to_bin(self, headings: np.ndarray) -> np.ndarray:
+        bins = np.floor((headings + 180.0) / 360.0 * self._angular_bins).astype(int)
+        return bins % self._angular_bins
+
+    def _update_polar_index(self, bins: np.ndarray) -> None:
+        """Recompute the range of the nearest obstacle in the given angular bins, from their cells only."""
+        starts = self._polar_bounds[bins]
+        lengths = self._polar_bounds[bins + 1] - starts
+        nonempty = lengths > 0
+        bins, starts, lengths = bins[nonempty], starts[nonempty], lengths[nonempty]
+        if len(bins) == 0:
+            return
+        # Positions, in the cells grouped by bin, of every cell of the bins, one bin after the other.
+        offsets = np.cumsum(lengths) - lengths
+        cells = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+        occupied = self._occupied.ravel()[self._polar_order[cells]]
+        ranges = np.where(occupied, self._polar_cell_ranges[cells], np.inf)
+        self._polar_ranges[bins] = np.minimum.reduceat(ranges, offsets)
+
+    def _distance_transform(self, occupied: np.ndarray) -> np.ndarray:
+        """Exact euclidean distance transform, truncated at max_cells, computed separably."""
+        height, width = occupied.shape
+        cap = self._max_cells + 1
+
+        # Distance along each column to the nearest obstacle of the column.
+        index = np.arange(height, dtype=float)[:, None]
+        previous = np.maximum.accumulate(np.where(occupied, index, -np.inf), axis=0)
+        following = np.minimum.accumulate(np.where(occupied, index, np.inf)[::-1], axis=0)[::-1]
+        column_distance = np.minimum(np.minimum(index - previous, following - index), cap)
+
+        # Combine along the rows: only columns closer than the truncation can hold the nearest obstacle.
+        padded = np.pad(column_distance**2, ((0, 0), (cap, cap)), constant_values=cap**2)
+        squared = np.full((height, width), float(cap**2))
+        for offset in range(-cap, cap + 1):
+            shifted = padded[:, cap + offset:cap + offset + width]
+            np.minimum(squared, shifted + offset**2, out=squared)
+
+        return np.minimum(np.sqrt(squared) * self._resolution, self._max_distance)
+
+
+def _occupied_cells(lidar_map, threshold: int, obstacles_are_dark: bool) -> np.ndarray:
+    pixels = np.asarray(lidar_map)
+    if pixels.ndim == 3:
+        pixels = pixels[..., :3].mean(axis=2)
+    return pixels < threshold if obstacles_are_dark else pixels > threshold
+
+
+def _wrap_angle(angle: float) -> float:
+    return (angle + 180.0) % 360.0 - 180.0
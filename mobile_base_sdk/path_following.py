@@ -0,0 +1,154 @@
+"""Path following module for mobile base SDK.
+
+Plans a smooth trajectory through a list of waypoints, to be followed with velocity commands
+without stopping at the intermediate waypoints:
+    - the polyline through the waypoints is sampled and its corners are blended
+    - the speed along the path is limited by the max velocity, the max acceleration (both along
+      the path and in the blended corners) and the max rotational velocity
+    - the result is sampled in time at the control period
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+
+class PathTrajectory(NamedTuple):
+    """Trajectory sampled in time, in the odometry frame.
+
+    x, y are in meters and theta in degree, x_vel, y_vel in m/s and rot_vel in deg/s.
+    Velocities are expressed in the odometry frame.
+    """
+
+    t: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    theta: np.ndarray
+    x_vel: np.ndarray
+    y_vel: np.ndarray
+    rot_vel: np.ndarray
+
+    @property
+    def duration(self) -> float:
+        """Duration of the trajectory in seconds."""
+        return float(self.t[-1])
+
+    def sample(self, t: float):
+        """Return the reference (x, y, theta, x_vel, y_vel, rot_vel) at time t, held at the end."""
+        if t >= self.t[-1]:
+            return self.x[-1], self.y[-1], self.theta[-1], 0.0, 0.0, 0.0
+        return tuple(float(np.interp(t, self.t, values)) for values in self[1:])
+
+
+def plan_path(
+    start,
+    waypoints,
+    max_xy_vel: float,
+    max_xy_acc: float,
+    max_rot_vel: float,
+    blend_distance: float = 0.2,
+    dt: float = 0.05,
+    resolution: float = 0.01,
+) -> PathTrajectory:
+    """Plan a trajectory from start (x, y, theta) through waypoints, an (N, 3) array of (x, y, theta).
+
+    Waypoints can also be (x, y), keeping the orientation of the previous waypoint (or of start), and a
+    list can mix both. Corners are blended over blend_distance meters, so intermediate waypoints are not
+    reached exactly.
+    max_rot_vel is in deg/s and the orientation is interpolated linearly along the path.
+    """
+    start = np.asarray(start, dtype=float)
+    points = np.vstack((start[None, :3], _waypoints_array(waypoints, start[2])))
+
+    # Keep the last of consecutive waypoints at the same position, the path can't rotate in place.
+    lengths = np.hypot(*np.diff(points[:, :2], axis=0).T)
+    points = points[np.append(lengths > 1e-6, True)]
+    if len(points) < 2:
+        raise ValueError("The path should go through at least one waypoint different from the start!")
+    knots = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(points[:, :2], axis=0).T))))
+
+    # Dense sampling of the polyline, with the orientation interpolated along it.
+    samples = int(np.ceil(knots[-1] / resolution)) + 1
+    s = np.linspace(0.0, knots[-1], samples)
+    x = np.interp(s, knots, points[:, 0])
+    y = np.interp(s, knots, points[:, 1])
+    theta = np.interp(s, knots, np.unwrap(np.deg2rad(points[:, 2])))
+
+    # Corner blending with a moving average, start and end are kept in place.
+    window = int(blend_distance / resolution)
+    if window > 1 and samples > window:
+        x, y = _moving_average(x, window), _moving_average(y, window)
+        s = np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))))
+        # Drop the samples collapsed by the blending
+        keep = np.append(True, np.diff(s) > 1e-9)
+        s, x, y, theta = s[keep], x[keep], y[keep], theta[keep]
+    length = s[-1]
+
+    # Speed limits: max velocity, lateral acceleration in the corners, rotational velocity.
+    dx, dy = np.gradient(x, s), np.gradient(y, s)
+    ddx, ddy = np.gradient(dx, s), np.gradient(dy, s)
+    curvature = np.abs(dx * ddy - dy * ddx) / np.maximum((dx**2 + dy**2) ** 1.5, 1e-9)
+    rot_per_meter = np.abs(np.gradient(theta, s))
+    speed_limit = np.minimum.reduce(
+        (
+            np.full_like(s, max_xy_vel),
+            np.sqrt(max_xy_acc / np.maximum(curvature, 1e-9)),
+            np.deg2rad(max_rot_vel) / np.maximum(rot_per_meter, 1e-9),
+        )
+    )
+    speed_limit[[0, -1]] = 0.0
+
+    # Acceleration limits along the path, as closed forms of the forward and backward passes:
+    # v(s)^2 <= min over s' <= s of (limit(s')^2 + 2 * acc * (s - s')), and symmetrically backwards.
+    squared_limit = speed_limit**2
+    forward = np.minimum.accumulate(squared_limit - 2 * max_xy_acc * s) + 2 * max_xy_acc * s
+    remaining = (length - s)[::-1]
+    backward = np.minimum.accumulate(squared_limit[::-1] - 2 * max_xy_acc * remaining) + 2 * max_xy_acc * remaining
+    backward = backward[::-1]
+    speed = np.sqrt(np.maximum(np.minimum.reduce((squared_limit, forward, backward)), 0.0))
+
+    # Time parametrization, then resampling at the control period. Velocities are the speed along
+    # the tangent of the path, so that they reach zero exactly at the end.
+    step_times = 2 * np.diff(s) / np.maximum(speed[:-1] + speed[1:], 1e-9)
+    times = np.concatenate(([0.0], np.cumsum(step_times)))
+    t = np.linspace(0.0, times[-1], int(np.ceil(times[-1] / dt)) + 1)
+    x_vel = np.interp(t, times, speed * dx)
+    y_vel = np.interp(t, times, speed * dy)
+    rot_vel = np.interp(t, times, speed * np.gradient(theta, s))
+    x, y, theta = np.interp(t, times, x), np.interp(t, times, y), np.interp(t, times, theta)
+
+    return PathTrajectory(
+        t=t,
+        x=x,
+        y=y,
+        theta=np.rad2deg(theta),
+        x_vel=x_vel,
+        y_vel=y_vel,
+        rot_vel=np.rad2deg(rot_vel),
+    )
+
+
+def _moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    # Odd reflection extends the ends linearly, so that straight lines are left unchanged.
+    padded = np.pad(values, (window // 2, window - 1 - window // 2), mode="reflect", reflect_type="odd")
+    smoothed = np.convolve(padded, np.ones(window) / window, mode="valid")
+    smoothed[[0, -1]] = values[[0, -1]]
+    return smoothed
+
+
+def _waypoints_array(waypoints, theta: float) -> np.ndarray:
+    """Return the waypoints as an (N, 3) array, (x, y) waypoints keeping the orientation theta of the previous one."""
+    if isinstance(waypoints, np.ndarray) or (len(waypoints) and np.ndim(waypoints[0]) == 0):
+        waypoints = np.atleast_2d(np.asarray(waypoints, dtype=float))
+        if waypoints.ndim == 2 and waypoints.shape[1] == 3:
+            return waypoints
+        if waypoints.ndim == 2 and waypoints.shape[1] == 2:
+            return np.column_stack((waypoints, np.full(len(waypoints), theta)))
+
+    rows = []
+    for waypoint in waypoints:
+        if np.ndim(waypoint) != 1 or len(waypoint) not in (2, 3):
+            raise ValueError(f"Waypoints should be (x, y, theta) or (x, y), got {waypoint!r}!")
+        if len(waypoint) == 3:
+            theta = waypoint[2]
+        rows.append((waypoint[0], waypoint[1], theta))
+    return np.array(rows, dtype=float).reshape(-1, 3)
@@ -0,0 +1,250 @@
+"""Pose estimator module for mobile base SDK.
+
+Estimates the pose of the mobile base at any time without an RPC per read:
+    - the odometry is sampled in the background, each sample stamped with the middle of its RPC
+    - poses between two samples are interpolated along the constant-velocity SE(2) motion joining them
+    - poses after the last sample are extrapolated with the commanded velocity in velocity control,
+      or with the velocity between the last two samples otherwise (e.g. during a goto)
+    - timestamps can be given as arrays, to match the frames of a sensor in one call
+"""
+import math
+import threading
+import time
+from logging import getLogger
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from google.protobuf.empty_pb2 import Empty
+
+from .ring_buffer import RingBuffer
+
+# Duration in seconds of a SendDirection command on the base, after which it stops.
+DIRECTION_DURATION = 0.2
+
+
+class PoseEstimator:
+    """Pose of a MobileBaseSDK at arbitrary timestamps, from odometry samples taken at rate_hz.
+
+    The last capacity samples are kept. Poses are never extrapolated more than max_extrapolation
+    seconds after the last sample. Timestamps are in seconds since the epoch, like the ones of
+    OdometryRecorder.
+    """
+
+    def __init__(
+        self,
+        mobile_base,
+        rate_hz: float = 20.0,
+        capacity: int = 256,
+        max_extrapolation: float = 0.5,
+    ) -> None:
+        """Set up the estimator of mobile_base. Sampling starts with the start method."""
+        if rate_hz <= 0:
+            raise ValueError("rate_hz should be strictly positive!")
+        if capacity < 2:
+            raise ValueError("capacity should be at least 2!")
+        self._logger = getLogger()
+        self._mobile_base = mobile_base
+        self._period = 1.0 / rate_hz
+        self._max_extrapolation = max_extrapolation
+
+        # Rows of timestamp, x, y and theta (in radians, unwrapped so that consecutive samples can be interpolated).
+        self._samples = RingBuffer(capacity, shape=(4,))
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        """Return the number of samples held."""
+        return len(self._samples)
+
+    @property
+    def is_running(self) -> bool:
+        """Return True if the odometry is being sampled."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Take a first sample and start sampling in a background thread."""
+        if self.is_running:
+            return
+        self.update()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._update_loop, name="mobile-base-pose-estimator", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling. Samples are kept."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "PoseEstimator":
+        """Start sampling."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Stop sampling."""
+        self.stop()
+
+    def update(self) -> None:
+        """Take one odometry sample now. Called by the sampling thread, but can also be called directly."""
+        tic = time.time()
+        response = self._mobile_base._utility_stub.GetOdometry(Empty())
+        toc = time.time()
+        # The odometry was read on the base somewhere during the RPC: the middle is the best guess.
+        self.add_sample((tic + toc) / 2, response.x.value, response.y.value, math.degrees(response.theta.value))
+
+    def add_sample(self, timestamp: float, x: float, y: float, theta: float) -> None:
+        """Add an odometry sample (x, y in meters and theta in degree), more recent than the previous ones."""
+        theta = math.radians(theta)
+        with self._lock:
+            last = self._samples.last()
+            if last is not None:
+                if timestamp <= last[0]:
+                    return
+                theta = last[3] + _wrap_angle(theta - last[3])
+            self._samples.append((timestamp, x, y, theta))
+
+    @property
+    def pose(self) -> Dict[str, float]:
+        """Estimated pose now, as a dict like MobileBaseSDK.odometry."""
+        return self.pose_at(time.time())
+
+    def pose_at(self, timestamps):
+        """Return the estimated pose at the given timestamp(s), in seconds since the epoch.
+
+        A single timestamp gives a dict like MobileBaseSDK.odometry. An array of N timestamps gives an
+        (N, 3) array of x, y (in meters) and theta (in degree, wrapped in [-180, 180)). Timestamps
+        before the first sample held get the first pose.
+        """
+        samples = self.samples()
+        if len(samples) == 0:
+            raise RuntimeError("No odometry sample yet. Call start or update first.")
+        times = np.asarray(timestamps, dtype=float)
+        poses = _estimate(samples, np.atleast_1d(times), self._extrapolation_twist(samples), self._max_extrapolation)
+        poses[:, 2] = np.degrees(_wrap_angles(poses[:, 2]))
+        if times.ndim == 0:
+            return {"x": float(poses[0, 0]), "y": float(poses[0, 1]), "theta": float(poses[0, 2])}
+        return poses
+
+    def samples(self) -> np.ndarray:
+        """Return a copy of the samples held as rows of timestamp, x, y and unwrapped theta in radians, oldest first."""
+        with self._lock:
+            return self._samples.to_array()
+
+    def _extrapolation_twist(self, samples: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Return the velocity (vx, vy in the robot frame, w in rad/s) after the last sample and until when it holds."""
+        last_time = samples[-1, 0]
+        if self._mobile_base._drive_mode == "cmd_vel":
+            x_vel, y_vel, rot_vel = self._mobile_base._commanded_velocity
+            commanded_at = self._mobile_base._commanded_at
+            if commanded_at is not None and commanded_at + DIRECTION_DURATION > last_time:
+                return np.array([x_vel, y_vel, math.radians(rot_vel)]), commanded_at + DIRECTION_DURATION
+            return np.zeros(3), last_time
+        if len(samples) < 2:
+            return np.zeros(3), last_time
+        # Constant velocity joining the last two samples.
+        dt = last_time - samples[-2, 0]
+        twist = _se2_log(_relative(samples[-2:-1, 1:], samples[-1:, 1:]))[0] / dt
+        return twist, math.inf
+
+    def _update_loop(self) -> None:
+        tic = time.monotonic()
+        tick = 0
+        error = False
+        while not self._stop_event.is_set():
+            try:
+                self.update()
+                error = False
+            except Exception as e:
+                # Only the first failure of a series is logged, poses are extrapolated meanwhile.
+                if not error:
+                    self._logger.warning(f"Could not sample the odometry: {e}")
+                error = True
+            # Samples are taken on a fixed time grid, skipping the ticks missed by a slow RPC.
+            tick = max(tick + 1, int((time.monotonic() - tic) / self._period))
+            self._stop_event.wait(max(tic + tick * self._period - time.monotonic(), 0.0))
+
+
+def _estimate(samples: np.ndarray, times: np.ndarray, extrapolation, max_extrapolation: float) -> np.ndarray:
+    twist, valid_until = extrapolation
+    poses = np.empty((len(times), 3))
+    sample_times = samples[:, 0]
+
+    # Before the first sample: first pose.
+    before = times <= sample_times[0]
+    poses[before] = samples[0, 1:]
+
+    # Between two samples: constant velocity motion from the previous sample to the next one.
+    between = ~before & (times < sample_times[-1])
+    if np.any(between):
+        t = times[between]
+        index = np.searchsorted(sample_times, t, side="right") - 1
+        start, end = samples[index, 1:], samples[index + 1, 1:]
+        alpha = (t - sample_times[index]) / (sample_times[index + 1] - sample_times[index])
+        poses[between] = _compose(start, _se2_exp(_se2_log(_relative(start, end)) * alpha[:, None]))
+
+    # After the last sample: last pose moved by the extrapolation velocity, while it holds.
+    after = ~before & ~between
+    if np.any(after):
+        dt = np.minimum(times[after] - sample_times[-1], min(valid_until - sample_times[-1], max_extrapolation))
+        last = np.broadcast_to(samples[-1, 1:], (len(dt), 3))
+        poses[after] = _compose(last, _se2_exp(twist[None, :] * dt[:, None]))
+    return poses
+
+
+def _compose(poses: np.ndarray, deltas: np.ndarray) -> np.ndarray:
+    """Apply the (N, 3) motions deltas, expressed in the frame of each pose, to the (N, 3) poses."""
+    cos, sin = np.cos(poses[:, 2]), np.sin(poses[:, 2])
+    return np.stack(
+        (
+            poses[:, 0] + cos * deltas[:, 0] - sin * deltas[:, 1],
+            poses[:, 1] + sin * deltas[:, 0] + cos * deltas[:, 1],
+            poses[:, 2] + deltas[:, 2],
+        ),
+        axis=1,
+    )
+
+
+def _relative(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Return the motions from the (N, 3) starts to the ends, expressed in the frame of the starts."""
+    cos, sin = np.cos(starts[:, 2]), np.sin(starts[:, 2])
+    dx, dy = ends[:, 0] - starts[:, 0], ends[:, 1] - starts[:, 1]
+    return np.stack((cos * dx + sin * dy, -sin * dx + cos * dy, ends[:, 2] - starts[:, 2]), axis=1)
+
+
+def _se2_coefficients(angles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return sin(w)/w and (1 - cos(w))/w, with their limits for small w."""
+    small = np.abs(angles) < 1e-6
+    safe = np.where(small, 1.0, angles)
+    a = np.where(small, 1.0 - angles**2 / 6.0, np.sin(safe) / safe)
+    b = np.where(small, angles / 2.0, (1.0 - np.cos(safe)) / safe)
+    return a, b
+
+
+def _se2_exp(twists: np.ndarray) -> np.ndarray:
+    """Return the motions obtained by following the (N, 3) constant twists (vx, vy, w) for a unit time."""
+    a, b = _se2_coefficients(twists[:, 2])
+    return np.stack(
+        (a * twists[:, 0] - b * twists[:, 1], b * twists[:, 0] + a * twists[:, 1], twists[:, 2]),
+        axis=1,
+    )
+
+
+def _se2_log(motions: np.ndarray) -> np.ndarray:
+    """Return the constant twists (vx, vy, w) producing the (N, 3) motions in a unit time."""
+    a, b = _se2_coefficients(motions[:, 2])
+    norm = a**2 + b**2
+    return np.stack(
+        ((a * motions[:, 0] + b * motions[:, 1]) / norm, (a * motions[:, 1] - b * motions[:, 0]) / norm, motions[:, 2]),
+        axis=1,
+    )
+
+
+def _wrap_angle(angle: float) -> float:
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+def _wrap_angles(angles: np.ndarray) -> np.ndarray:
+    return (angles + np.pi) % (2 * np.pi) - np.pi
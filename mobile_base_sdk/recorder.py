@@ -0,0 +1,208 @@
+"""Recorder module for mobile base SDK.
+
+Samples the odometry of the mobile base at a fixed rate into a preallocated ring buffer, along with
+the commanded velocity and the drive mode:
+    - recent samples are kept in memory and can be queried by time window
+    - all samples can also be logged to a memory-mapped .npy file, for long runs
+    - a recording can be replayed at its original pace
+
+The buffers are allocated once, so recording does not grow the Python heap over time. Log writes are
+plain memory writes, flushed to disk by the OS, so the sampling thread never waits on the file.
+"""
+import threading
+import time
+from logging import getLogger
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .ring_buffer import RingBuffer
+
+# Record of one sample. x, y are in meters, theta in degree, velocities in m/s and deg/s.
+RECORD_DTYPE = np.dtype(
+    [
+        ("timestamp", "f8"),
+        ("x", "f8"),
+        ("y", "f8"),
+        ("theta", "f8"),
+        ("x_vel", "f4"),
+        ("y_vel", "f4"),
+        ("rot_vel", "f4"),
+        ("drive_mode", "U16"),
+    ]
+)
+
+
+class OdometryRecorder:
+    """Background recorder of the odometry of a MobileBaseSDK.
+
+    The last capacity samples are kept in memory. If log_path is given, every sample is also written
+    to a memory-mapped .npy file able to hold log_capacity samples (one hour at 50Hz by default),
+    which can be read back with OdometryRecorder.load.
+    """
+
+    def __init__(
+        self,
+        mobile_base,
+        rate_hz: float = 50.0,
+        capacity: int = 30000,
+        log_path: Optional[str] = None,
+        log_capacity: int = 180000,
+    ) -> None:
+        """Set up the recorder of mobile_base. Recording starts with the start method."""
+        if rate_hz <= 0:
+            raise ValueError("rate_hz should be strictly positive!")
+        if capacity <= 0 or log_capacity <= 0:
+            raise ValueError("capacity and log_capacity should be strictly positive!")
+
+        self._logger = getLogger()
+        self._mobile_base = mobile_base
+        self._period = 1.0 / rate_hz
+
+        self._buffer = RingBuffer(capacity, dtype=RECORD_DTYPE)
+        self._log: Optional[np.memmap] = None
+        self._log_count = 0
+        if log_path is not None:
+            self._log = np.lib.format.open_memmap(log_path, mode="w+", dtype=RECORD_DTYPE, shape=(log_capacity,))
+            # Unused rows are marked with a NaN timestamp, so that a log can be loaded after a crash.
+            self._log["timestamp"] = np.nan
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        """Return the number of samples held in memory."""
+        return len(self._buffer)
+
+    @property
+    def capacity(self) -> int:
+        """Number of samples held in memory."""
+        return self._buffer.capacity
+
+    @property
+    def total_samples(self) -> int:
+        """Number of samples recorded since the creation of the recorder."""
+        return self._buffer.total
+
+    @property
+    def is_running(self) -> bool:
+        """Return True if the odometry is being recorded."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start recording in a background thread."""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._record_loop, name="mobile-base-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop recording and flush the log file, if any. Recorded samples are kept."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._log is not None:
+            self._log.flush()
+
+    def __enter__(self) -> "OdometryRecorder":
+        """Start recording."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Stop recording."""
+        self.stop()
+
+    def record(self) -> None:
+        """Take one sample now. Called by the recording thread, but can also be called directly."""
+        odometry = self._mobile_base.odometry
+        x_vel, y_vel, rot_vel = self._mobile_base._commanded_velocity
+        sample = (
+            time.time(),
+            odometry["x"],
+            odometry["y"],
+            odometry["theta"],
+            x_vel,
+            y_vel,
+            rot_vel,
+            self._mobile_base._drive_mode,
+        )
+        with self._lock:
+            self._buffer.append(sample)
+            if self._log is not None:
+                if self._log_count < len(self._log):
+                    self._log[self._log_count] = sample
+                elif self._log_count == len(self._log):
+                    self._logger.warning("Odometry log is full, samples are only kept in memory.")
+                self._log_count += 1
+
+    def samples(self) -> np.ndarray:
+        """Return a copy of the samples held in memory, oldest first."""
+        with self._lock:
+            return self._buffer.to_array()
+
+    def latest(self, count: int = 1) -> np.ndarray:
+        """Return a copy of the last count samples, oldest first."""
+        samples = self.samples()
+        return samples[max(len(samples) - count, 0):]
+
+    def window(self, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """Return a copy of the samples with a timestamp in [start, end], in seconds since the epoch."""
+        return _window(self.samples(), start, end)
+
+    def replay(self, start: Optional[float] = None, end: Optional[float] = None, speed: float = 1.0) -> Iterator[np.void]:
+        """Yield the samples of a time window at the pace they were recorded, speed times faster."""
+        return _replay(self.window(start, end), speed)
+
+    @staticmethod
+    def load(path: str) -> np.ndarray:
+        """Return the samples of a log file, as a read-only memory-mapped array."""
+        log = np.load(path, mmap_mode="r")
+        # Rows are written in order, so the recorded ones are the ones before the first NaN timestamp.
+        unused = np.nonzero(np.isnan(log["timestamp"]))[0]
+        return log[:unused[0]] if len(unused) else log
+
+    @staticmethod
+    def replay_log(path: str, start: Optional[float] = None, end: Optional[float] = None, speed: float = 1.0):
+        """Yield the samples of a log file at the pace they were recorded, speed times faster."""
+        return _replay(_window(OdometryRecorder.load(path), start, end), speed)
+
+    def _record_loop(self) -> None:
+        tic = time.monotonic()
+        tick = 0
+        while not self._stop_event.is_set():
+            try:
+                self.record()
+            except Exception as e:
+                self._logger.warning(f"Could not record the odometry: {e}")
+            # Samples are taken on a fixed time grid, skipping the ticks missed by a slow RPC.
+            tick = max(tick + 1, int((time.monotonic() - tic) / self._period))
+            self._stop_event.wait(max(tic + tick * self._period - time.monotonic(), 0.0))
+
+
+def _window(samples: np.ndarray, start: Optional[float], end: Optional[float]) -> np.ndarray:
+    timestamps = samples["timestamp"]
+    first = 0 if start is None else np.searchsorted(timestamps, start, side="left")
+    last = len(samples) if end is None else np.searchsorted(timestamps, end, side="right")
+    return samples[first:last]
+
+
+def _replay(samples: np.ndarray, speed: float) -> Iterator[np.void]:
+    if speed <= 0:
+        raise ValueError("speed should be strictly positive!")
+    return _replay_samples(samples, speed)
+
+
+def _replay_samples(samples: np.ndarray, speed: float) -> Iterator[np.void]:
+    if len(samples) == 0:
+        return
+    tic = time.monotonic()
+    first = samples["timestamp"][0]
+    for sample in samples:
+        delay = (sample["timestamp"] - first) / speed - (time.monotonic() - tic)
+        if delay > 0:
+            time.sleep(delay)
+        yield sample
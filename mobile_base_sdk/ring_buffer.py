@@ -0,0 +1,54 @@
+"""Ring buffer module for mobile base SDK.
+
+Keeps the last samples of a signal in a NumPy array allocated once, used by the odometry recorder and
+the pose estimator.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class RingBuffer:
+    """Preallocated buffer of the last capacity rows appended, each one of the given dtype and shape.
+
+    It is not thread-safe: callers appending and reading from different threads hold their own lock.
+    """
+
+    def __init__(self, capacity: int, dtype=float, shape: Tuple[int, ...] = ()) -> None:
+        """Allocate the buffer."""
+        if capacity <= 0:
+            raise ValueError("capacity should be strictly positive!")
+        self._buffer = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of rows held."""
+        return min(self._count, len(self._buffer))
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of rows held."""
+        return len(self._buffer)
+
+    @property
+    def total(self) -> int:
+        """Number of rows appended since the creation of the buffer, including the overwritten ones."""
+        return self._count
+
+    def append(self, row) -> None:
+        """Append a row, overwriting the oldest one if the buffer is full."""
+        self._buffer[self._count % len(self._buffer)] = row
+        self._count += 1
+
+    def last(self) -> Optional[np.ndarray]:
+        """Return the last row appended (not a copy), None if the buffer is empty."""
+        if not self._count:
+            return None
+        return self._buffer[(self._count - 1) % len(self._buffer)]
+
+    def to_array(self) -> np.ndarray:
+        """Return a copy of the rows held, oldest first."""
+        if self._count <= len(self._buffer):
+            return self._buffer[:self._count].copy()
+        start = self._count % len(self._buffer)
+        return np.concatenate((self._buffer[start:], self._buffer[:start]))
@@ -0,0 +1,402 @@
+"""Shared telemetry module for mobile base SDK.
+
+Shares the telemetry of one mobile base connection with every process of the robot computer:
+    - TelemetryPublisher owns a MobileBaseSDK and writes its latest odometry, battery voltage, modes,
+      lidar safety status and lidar map into a named shared memory block
+    - SharedTelemetry attaches to that block and exposes the same properties as the SDK, read-only
+
+Readers never block the publisher: each region of the block is protected by a sequence counter,
+odd while the publisher writes it. A read copies the region and retries if the counter was odd or
+changed meanwhile, so reads are consistent without any lock and cost no RPC.
+
+The publisher can also be run as a daemon with `python -m mobile_base_sdk.shared_telemetry`.
+"""
+import argparse
+import math
+import struct
+import threading
+import time
+from logging import getLogger
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+from reachy2_sdk_api.mobile_base_lidar_pb2 import LidarObstacleDetectionEnum
+from reachy2_sdk_api.mobile_base_utility_pb2 import ControlModePossiblities, ZuuuModePossiblities
+
+DEFAULT_SHARED_TELEMETRY_NAME = "mobile_base_telemetry"
+# Size in bytes reserved for the lidar map (a 1024x1024 grayscale map).
+DEFAULT_MAP_CAPACITY = 1024 * 1024
+
+_MAGIC = b"MBTELEM2"
+# Magic, map capacity in bytes.
+_HEADER = struct.Struct("<8sQ")
+_SEQUENCE = struct.Struct("<Q")
+# Publication time, odometry (time, x, y, theta), battery voltage (time, value), obstacle detection
+# status time, safety distances, safety enabled (0, 1 or 255 if unknown), obstacle detection status,
+# drive mode and control mode as the values of their enums. Unknown times and values are NaN, unknown
+# enum values are -1.
+_STATE = struct.Struct("<ddddddddddBiii")
+_STATE_OFFSET = _HEADER.size
+# Map time, height, width, channels (0 for a 2D map).
+_MAP_HEADER = struct.Struct("<dIII")
+# Rounded up to keep the map sequence counter 8-byte aligned.
+_MAP_OFFSET = (_STATE_OFFSET + _SEQUENCE.size + _STATE.size + 7) // 8 * 8
+_MAP_DATA_OFFSET = _MAP_OFFSET + _SEQUENCE.size + _MAP_HEADER.size
+
+# Names of the blocks published by this process, registered with its resource tracker.
+_published: Set[str] = set()
+
+
+class TelemetryPublisher:
+    """Publisher of the telemetry of a MobileBaseSDK into shared memory.
+
+    The SDK telemetry mode is started with the given rates (see MobileBaseSDK.start_telemetry), and its
+    cached values are published at publish_rate_hz. The lidar map, modes and safety values are
+    refreshed at map_rate_hz. The shared memory block is created on start (replacing a block left over
+    by a previous publisher) and removed on stop.
+    """
+
+    def __init__(
+        self,
+        mobile_base,
+        name: str = DEFAULT_SHARED_TELEMETRY_NAME,
+        rates: Optional[Dict[str, float]] = None,
+        publish_rate_hz: float = 50.0,
+        map_rate_hz: float = 2.0,
+        map_capacity: int = DEFAULT_MAP_CAPACITY,
+    ) -> None:
+        """Set up the publisher. Publishing starts with the start method."""
+        if publish_rate_hz <= 0 or map_rate_hz <= 0:
+            raise ValueError("publish_rate_hz and map_rate_hz should be strictly positive!")
+        self._logger = getLogger()
+        self._mobile_base = mobile_base
+        self._name = name
+        self._rates = rates
+        self._publish_period = 1.0 / publish_rate_hz
+        self._map_period = 1.0 / map_rate_hz
+        self._map_capacity = map_capacity
+
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self._name
+
+    @property
+    def is_running(self) -> bool:
+        """Return True if the telemetry is being published."""
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> None:
+        """Create the shared memory block and start publishing."""
+        if self.is_running:
+            return
+        size = _MAP_DATA_OFFSET + self._map_capacity
+        try:
+            self._shm = shared_memory.SharedMemory(name=self._name, create=True, size=size)
+        except FileExistsError:
+            # Left over by a publisher that did not stop cleanly.
+            self._logger.warning(f"Replacing the existing shared memory block {self._name}.")
+            stale = shared_memory.SharedMemory(name=self._name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=self._name, create=True, size=size)
+        _published.add(self._name)
+        _HEADER.pack_into(self._shm.buf, 0, _MAGIC, self._map_capacity)
+        self._mobile_base.start_telemetry(self._rates)
+        self._publish_slow()
+        self._publish_state()
+
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(
+                target=self._loop,
+                args=(self._publish_state, self._publish_period),
+                name="mobile-base-telemetry-publisher",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._loop,
+                args=(self._publish_slow, self._map_period),
+                name="mobile-base-map-publisher",
+                daemon=True,
+            ),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop publishing and remove the shared memory block. Attached readers keep the last values."""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._mobile_base.stop_telemetry()
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+            _published.discard(self._name)
+
+    def __enter__(self) -> "TelemetryPublisher":
+        """Start publishing."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Stop publishing."""
+        self.stop()
+
+    def _publish_state(self) -> None:
+        mobile_base = self._mobile_base
+        lidar = mobile_base.lidar
+        odometry = mobile_base.telemetry_sample("odometry")
+        battery = mobile_base.telemetry_sample("battery_voltage")
+        obstacle = mobile_base.telemetry_sample("obstacle_detection_status")
+        state = _STATE.pack(
+            time.time(),
+            odometry.timestamp if odometry is not None else math.nan,
+            odometry.value["x"] if odometry is not None else math.nan,
+            odometry.value["y"] if odometry is not None else math.nan,
+            odometry.value["theta"] if odometry is not None else math.nan,
+            battery.timestamp if battery is not None else math.nan,
+            battery.value if battery is not None else math.nan,
+            obstacle.timestamp if obstacle is not None else math.nan,
+            _or_nan(lidar._safety_distance),
+            _or_nan(lidar._critical_distance),
+            255 if lidar._safety_enabled is None else int(lidar._safety_enabled),
+            _enum_value(LidarObstacleDetectionEnum, obstacle.value if obstacle is not None else None),
+            _enum_value(ZuuuModePossiblities, mobile_base._drive_mode),
+            _enum_value(ControlModePossiblities, mobile_base._control_mode),
+        )
+        _write(self._shm.buf, _STATE_OFFSET, state)
+
+    def _publish_slow(self) -> None:
+        # Refreshes the modes and safety values, which are not polled by the telemetry mode.
+        self._mobile_base.state(max_age=self._map_period / 2)
+        lidar_map = self._mobile_base.lidar.get_map_array()
+        if lidar_map.nbytes > self._map_capacity:
+            raise ValueError(f"Lidar map of {lidar_map.nbytes} bytes exceeds the capacity of {self._map_capacity} bytes!")
+        channels = lidar_map.shape[2] if lidar_map.ndim == 3 else 0
+        header = _MAP_HEADER.pack(time.time(), lidar_map.shape[0], lidar_map.shape[1], channels)
+        _write(self._shm.buf, _MAP_OFFSET, header + np.ascontiguousarray(lidar_map, dtype=np.uint8).tobytes())
+
+    def _loop(self, publish, period: float) -> None:
+        tic = time.monotonic()
+        tick = 0
+        error = False
+        while not self._stop_event.is_set():
+            try:
+                publish()
+                error = False
+            except Exception as e:
+                # Only the first failure of a series is logged, readers see the age of the values grow.
+                if not error:
+                    self._logger.warning(f"Could not publish the telemetry: {e}")
+                error = True
+            tick = max(tick + 1, int((time.monotonic() - tic) / period))
+            self._stop_event.wait(max(tic + tick * period - time.monotonic(), 0.0))
+
+
+class SharedLidar:
+    """Read-only view of the lidar values published by a TelemetryPublisher."""
+
+    def __init__(self, telemetry: "SharedTelemetry") -> None:
+        """Read the values of telemetry."""
+        self._telemetry = telemetry
+
+    @property
+    def obstacle_detection_status(self) -> Optional[str]:
+        """Obstacle detection status of the lidar, None if not published yet."""
+        return _enum_name(LidarObstacleDetectionEnum, self._telemetry._state()[11])
+
+    @property
+    def safety_slowdown_distance(self) -> Optional[float]:
+        """Safety distance in meters of the mobile base from obstacles."""
+        return _or_none(self._telemetry._state()[8])
+
+    @property
+    def safety_critical_distance(self) -> Optional[float]:
+        """Critical distance in meters of the mobile base from obstacles."""
+        return _or_none(self._telemetry._state()[9])
+
+    @property
+    def safety_enabled(self) -> Optional[bool]:
+        """Return True if the safety feature is enabled."""
+        enabled = self._telemetry._state()[10]
+        return None if enabled == 255 else bool(enabled)
+
+    def get_map_array(self) -> np.ndarray:
+        """Return a copy of the last published map, as a NumPy array."""
+        return self._telemetry._map()[1]
+
+
+class SharedTelemetry:
+    """Read-only client of the telemetry published by a TelemetryPublisher, possibly in another process.
+
+    It exposes the same properties as MobileBaseSDK, read from shared memory without any RPC.
+    """
+
+    def __init__(self, name: str = DEFAULT_SHARED_TELEMETRY_NAME) -> None:
+        """Attach to the shared memory block of the publisher."""
+        self._shm = _attach(name)
+        magic, self._map_capacity = _HEADER.unpack_from(self._shm.buf, 0)
+        if magic != _MAGIC:
+            self._shm.close()
+            raise ValueError(f"Shared memory block {name} is not a mobile base telemetry block!")
+        self.lidar = SharedLidar(self)
+
+    def close(self) -> None:
+        """Detach from the shared memory block."""
+        self._shm.close()
+
+    def __enter__(self) -> "SharedTelemetry":
+        """Return the client."""
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Detach from the shared memory block."""
+        self.close()
+
+    @property
+    def odometry(self) -> Dict[str, float]:
+        """Return the odometry of the base. x, y are in meters and theta in degree."""
+        state = self._state()
+        return {"x": state[2], "y": state[3], "theta": state[4]}
+
+    @property
+    def battery_voltage(self) -> float:
+        """Return the battery voltage."""
+        return self._state()[6]
+
+    @property
+    def drive_mode(self) -> Optional[str]:
+        """Drive mode of the base, None if not published yet."""
+        mode = _enum_name(ZuuuModePossiblities, self._state()[12])
+        return mode.lower() if mode is not None else None
+
+    @property
+    def control_mode(self) -> Optional[str]:
+        """Control mode of the base, None if not published yet."""
+        mode = _enum_name(ControlModePossiblities, self._state()[13])
+        return mode.lower() if mode is not None else None
+
+    @property
+    def timestamp(self) -> float:
+        """Time (in seconds since the epoch) of the last publication."""
+        return self._state()[0]
+
+    @property
+    def age(self) -> float:
+        """Time in seconds since the last publication. Grows if the publisher is stopped or stuck."""
+        return time.time() - self.timestamp
+
+    def timestamps(self) -> Dict[str, float]:
+        """Return the time (in seconds since the epoch) at which each signal was received by the publisher."""
+        state = self._state()
+        return {"odometry": state[1], "battery_voltage": state[5], "obstacle_detection_status": state[7]}
+
+    def _state(self) -> Tuple:
+        return _STATE.unpack(_read(self._shm.buf, _STATE_OFFSET, _STATE.size))
+
+    def _map(self) -> Tuple[float, np.ndarray]:
+        data = _read(self._shm.buf, _MAP_OFFSET, _MAP_HEADER.size + self._map_capacity, _MAP_HEADER)
+        timestamp, height, width, channels = _MAP_HEADER.unpack_from(data)
+        shape = (height, width, channels) if channels else (height, width)
+        size = height * width * max(channels, 1)
+        return timestamp, np.frombuffer(data, dtype=np.uint8, count=size, offset=_MAP_HEADER.size).reshape(shape)
+
+
+def _write(buf: memoryview, offset: int, data: bytes) -> None:
+    """Write data after the sequence counter at offset, making the counter odd during the write."""
+    sequence = _SEQUENCE.unpack_from(buf, offset)[0]
+    _SEQUENCE.pack_into(buf, offset, sequence + 1)
+    start = offset + _SEQUENCE.size
+    buf[start:start + len(data)] = data
+    _SEQUENCE.pack_into(buf, offset, sequence + 2)
+
+
+def _read(buf: memoryview, offset: int, size: int, header: Optional[struct.Struct] = None) -> bytes:
+    """Copy the data after the sequence counter at offset, retrying until it was not written meanwhile.
+
+    If header is given, its size fields (the last three, multiplied) limit the copy after it.
+    """
+    start = offset + _SEQUENCE.size
+    while True:
+        before = _SEQUENCE.unpack_from(buf, offset)[0]
+        if before % 2:
+            time.sleep(0)
+            continue
+        length = size
+        if header is not None:
+            _, *dimensions = header.unpack_from(buf, start)
+            length = min(header.size + math.prod(max(d, 1) for d in dimensions), size)
+        data = bytes(buf[start:start + length])
+        if _SEQUENCE.unpack_from(buf, offset)[0] == before:
+            return data
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13, attaching registers the block with the resource tracker of this process,
+        # which would remove it when this process exits, while the publisher still uses it.
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    if name not in _published:
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _or_nan(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def _or_none(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def _enum_value(enum, name: Optional[str]) -> int:
+    # Modes are lower case in the SDK, enum names are upper case.
+    if not name or name.upper() not in enum.keys():
+        return -1
+    return enum.Value(name.upper())
+
+
+def _enum_name(enum, value: int) -> Optional[str]:
+    return enum.Name(value) if value in enum.values() else None
+
+
+def main() -> None:
+    """Publish the telemetry of a mobile base until interrupted."""
+    from .mobile_base_sdk import MobileBaseSDK
+
+    parser = argparse.ArgumentParser(description="Publish the telemetry of a mobile base into shared memory.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=50051)
+    parser.add_argument("--name", default=DEFAULT_SHARED_TELEMETRY_NAME, help="Name of the shared memory block.")
+    parser.add_argument("--publish-rate", type=float, default=50.0, help="Publication rate in Hz.")
+    parser.add_argument("--map-rate", type=float, default=2.0, help="Lidar map refresh rate in Hz.")
+    args = parser.parse_args()
+
+    mobile_base = MobileBaseSDK(host=args.host, mobile_base_port=args.port)
+    publisher = TelemetryPublisher(
+        mobile_base, name=args.name, publish_rate_hz=args.publish_rate, map_rate_hz=args.map_rate
+    )
+    publisher.start()
+    print(f"Publishing the telemetry of {args.host}:{args.port} in shared memory block {args.name}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        publisher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+"""Simulator module for mobile base SDK.
+
+Serves the MobileBaseUtilityService, MobileBaseMobilityService and MobileBaseLidarService on a local
+port, backed by a holonomic kinematic model of the mobile base, so that MobileBaseSDK can be used
+without a robot:
+
+    with MobileBaseSimulator() as simulator:
+        mobile_base = MobileBaseSDK(host="localhost", mobile_base_port=simulator.port)
+
+The model reproduces the 200ms duration of velocity commands, the convergence of gotos, and the lidar
+safety (slowdown and stop near obstacles). The lidar map is rendered from a configurable list of
+circular obstacles. Network latency, jitter and packet loss can be injected on every RPC.
+
+It can also be run as a standalone server: python -m mobile_base_sdk.simulator --port 50051
+"""
+import argparse
+import io
+import math
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import grpc
+import numpy as np
+from google.protobuf.wrappers_pb2 import BoolValue, FloatValue
+from PIL import Image
+from reachy2_sdk_api import mobile_base_lidar_pb2 as lidar_pb2
+from reachy2_sdk_api import mobile_base_lidar_pb2_grpc as lidar_pb2_grpc
+from reachy2_sdk_api import mobile_base_mobility_pb2 as mob_pb2
+from reachy2_sdk_api import mobile_base_mobility_pb2_grpc as mob_pb2_grpc
+from reachy2_sdk_api import mobile_base_utility_pb2 as util_pb2
+from reachy2_sdk_api import mobile_base_utility_pb2_grpc as util_pb2_grpc
+
+from .velocity_stream import COMMAND_DURATION
+
+# Circular obstacle (x, y, radius) in meters, in the odometry frame.
+Obstacle = Tuple[float, float, float]
+
+
+class HolonomicBaseModel:
+    """Kinematic model of the mobile base, integrated in a background thread."""
+
+    def __init__(
+        self,
+        obstacles: Sequence[Obstacle] = (),
+        battery_voltage: float = 25.0,
+        max_xy_vel: float = 1.0,
+        max_rot_vel: float = math.radians(180.0),
+        goto_xy_vel: float = 0.5,
+        goto_rot_vel: float = 2.0,
+        goto_gain: float = 2.0,
+    ) -> None:
+        """Set up the model, at the origin and in brake mode."""
+        self.lock = threading.Lock()
+        self.obstacles: List[Obstacle] = list(obstacles)
+        self.battery_voltage = battery_voltage
+
+        self.x = self.y = self.theta = 0.0
+        self.drive_mode = "BRAKE"
+        self.control_mode = "OPEN_LOOP"
+        self._command = (0.0, 0.0, 0.0)
+        self._command_time = -math.inf
+        self._goal: Optional[Tuple[float, float, float]] = None
+
+        self.safety_enabled = True
+        self.safety_distance = 0.7
+        self.critical_distance = 0.55
+        # Forced obstacle detection status, computed from the obstacles if None.
+        self.forced_obstacle_detection_status: Optional[str] = None
+
+        self._max_xy_vel = max_xy_vel
+        self._max_rot_vel = max_rot_vel
+        self._goto_xy_vel = goto_xy_vel
+        self._goto_rot_vel = goto_rot_vel
+        self._goto_gain = goto_gain
+
+    def set_drive_mode(self, mode: str) -> None:
+        """Change the drive mode, which cancels the current command and goal."""
+        with self.lock:
+            self.drive_mode = mode
+            self._command_time = -math.inf
+            self._goal = None
+
+    def send_direction(self, x_vel: float, y_vel: float, rot_vel: float) -> None:
+        """Apply a velocity command in the robot frame (m/s and rad/s) for 200ms, if in cmd_vel mode."""
+        with self.lock:
+            if self.drive_mode != "CMD_VEL":
+                return
+            self._command = (
+                _clip(x_vel, self._max_xy_vel),
+                _clip(y_vel, self._max_xy_vel),
+                _clip(rot_vel, self._max_rot_vel),
+            )
+            self._command_time = time.monotonic()
+
+    def send_goto(self, x: float, y: float, theta: float) -> None:
+        """Start moving towards a goal in the odometry frame (meters and radians)."""
+        with self.lock:
+            self.drive_mode = "GOTO"
+            self._goal = (x, y, theta)
+
+    def distance_to_goal(self) -> Tuple[float, float, float, float]:
+        """Return (delta_x, delta_y, delta_theta, distance) from the current position to the goal."""
+        with self.lock:
+            if self._goal is None:
+                return 0.0, 0.0, 0.0, 0.0
+            delta_x, delta_y = self._goal[0] - self.x, self._goal[1] - self.y
+            delta_theta = _wrap_angle(self._goal[2] - self.theta)
+            return delta_x, delta_y, delta_theta, math.hypot(delta_x, delta_y)
+
+    def reset_odometry(self) -> None:
+        """Set the current position as the origin of the odometry frame."""
+        with self.lock:
+            self.obstacles = [_to_robot_frame(obstacle, self.x, self.y, self.theta) for obstacle in self.obstacles]
+            self.x = self.y = self.theta = 0.0
+            self._goal = None
+
+    def obstacle_detection_status(self) -> str:
+        """Return the lidar obstacle detection status."""
+        with self.lock:
+            return self._obstacle_detection_status()
+
+    def _obstacle_detection_status(self) -> str:
+        if self.forced_obstacle_detection_status is not None:
+            return self.forced_obstacle_detection_status
+        clearance = self._clearance()
+        if clearance < self.critical_distance:
+            return "OBJECT_DETECTED_STOP"
+        if clearance < self.safety_distance:
+            return "OBJECT_DETECTED_SLOWDOWN"
+        return "NO_OBJECT_DETECTED"
+
+    def _clearance(self) -> float:
+        return min(
+            (math.hypot(ox - self.x, oy - self.y) - radius for ox, oy, radius in self.obstacles),
+            default=math.inf,
+        )
+
+    def step(self, dt: float) -> None:
+        """Integrate the motion of the base over dt seconds."""
+        with self.lock:
+            x_vel, y_vel, rot_vel = self._velocity()
+            if self.safety_enabled:
+                x_vel, y_vel = self._apply_safety(x_vel, y_vel)
+
+            cos, sin = math.cos(self.theta), math.sin(self.theta)
+            self.x += (cos * x_vel - sin * y_vel) * dt
+            self.y += (sin * x_vel + cos * y_vel) * dt
+            self.theta = _wrap_angle(self.theta + rot_vel * dt)
+
+    def _velocity(self) -> Tuple[float, float, float]:
+        """Velocity in the robot frame requested by the current drive mode."""
+        if self.drive_mode == "CMD_VEL" and time.monotonic() - self._command_time < COMMAND_DURATION:
+            return self._command
+        if self.drive_mode == "GOTO" and self._goal is not None:
+            # Proportional controller in the odometry frame, saturated at the goto velocities.
+            delta_x, delta_y = self._goal[0] - self.x, self._goal[1] - self.y
+            distance = math.hypot(delta_x, delta_y)
+            speed = min(self._goto_gain * distance, self._goto_xy_vel)
+            world_x_vel = speed * delta_x / distance if distance > 1e-6 else 0.0
+            world_y_vel = speed * delta_y / distance if distance > 1e-6 else 0.0
+            cos, sin = math.cos(self.theta), math.sin(self.theta)
+            rot_vel = _clip(self._goto_gain * _wrap_angle(self._goal[2] - self.theta), self._goto_rot_vel)
+            return cos * world_x_vel + sin * world_y_vel, -sin * world_x_vel + cos * world_y_vel, rot_vel
+        return 0.0, 0.0, 0.0
+
+    def _apply_safety(self, x_vel: float, y_vel: float) -> Tuple[float, float]:
+        status = self._obstacle_detection_status()
+        if status not in ("OBJECT_DETECTED_SLOWDOWN", "OBJECT_DETECTED_STOP") or (x_vel == 0.0 and y_vel == 0.0):
+            return x_vel, y_vel
+        # Only motions towards the nearest obstacle are slowed down or stopped.
+        ox, oy, _ = min(self.obstacles, key=lambda obstacle: math.hypot(obstacle[0] - self.x, obstacle[1] - self.y))
+        cos, sin = math.cos(self.theta), math.sin(self.theta)
+        towards_x = cos * (ox - self.x) + sin * (oy - self.y)
+        towards_y = -sin * (ox - self.x) + cos * (oy - self.y)
+        if x_vel * towards_x + y_vel * towards_y <= 0.0:
+            return x_vel, y_vel
+        factor = 0.0 if status == "OBJECT_DETECTED_STOP" else 0.3
+        return x_vel * factor, y_vel * factor
+
+    def render_map(self, size: int, resolution: float) -> np.ndarray:
+        """Render the obstacles around the robot as a (size, size) grayscale image.
+
+        The robot is at the center, facing the top of the image. Obstacles are white on black.
+        """
+        with self.lock:
+            obstacles = [_to_robot_frame(obstacle, self.x, self.y, self.theta) for obstacle in self.obstacles]
+        center = (size - 1) / 2
+        rows, cols = np.mgrid[:size, :size]
+        x = (center - rows) * resolution
+        y = (center - cols) * resolution
+        image = np.zeros((size, size), dtype=np.uint8)
+        for ox, oy, radius in obstacles:
+            # Only the outline of the obstacle is seen by the lidar.
+            image[np.abs(np.hypot(x - ox, y - oy) - radius) <= resolution] = 255
+        return image
+
+
+class MobileBaseSimulator:
+    """Local gRPC server simulating the mobile base services."""
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 0,
+        obstacles: Sequence[Obstacle] = (),
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        packet_loss: float = 0.0,
+        battery_voltage: float = 25.0,
+        rate_hz: float = 100.0,
+        map_size: int = 200,
+        map_resolution: float = 0.05,
+        max_workers: int = 16,
+    ) -> None:
+        """Set up the simulator. port=0 picks a free port, available once started.
+
+        latency and jitter are in seconds: each RPC is delayed by latency plus a uniform random delay
+        up to jitter. packet_loss is the probability for an RPC to fail with UNAVAILABLE.
+        """
+        self.model = HolonomicBaseModel(obstacles=obstacles, battery_voltage=battery_voltage)
+        self.network = NetworkConditions(latency=latency, jitter=jitter, packet_loss=packet_loss)
+        self.map_size = map_size
+        self.map_resolution = map_resolution
+
+        self._host = host
+        self._requested_port = port
+        self._port: Optional[int] = None
+        self._period = 1.0 / rate_hz
+        self._max_workers = max_workers
+        self._server: Optional[grpc.Server] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MobileBaseSimulator":
+        """Start the simulator."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Stop the simulator."""
+        self.stop()
+
+    @property
+    def port(self) -> Optional[int]:
+        """Port the simulator listens on, None if not started."""
+        return self._port
+
+    def start(self) -> int:
+        """Start the server and the simulation. Return the port the server listens on."""
+        self._server = grpc.server(ThreadPoolExecutor(max_workers=self._max_workers), interceptors=[self.network])
+        util_pb2_grpc.add_MobileBaseUtilityServiceServicer_to_server(_UtilityServicer(self.model), self._server)
+        mob_pb2_grpc.add_MobileBaseMobilityServiceServicer_to_server(_MobilityServicer(self.model), self._server)
+        lidar_pb2_grpc.add_MobileBaseLidarServiceServicer_to_server(_LidarServicer(self), self._server)
+        self._port = self._server.add_insecure_port(f"{self._host}:{self._requested_port}")
+        self._server.start()
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._simulation_loop, name="mobile-base-simulator", daemon=True)
+        self._thread.start()
+        return self._port
+
+    def stop(self) -> None:
+        """Stop the server and the simulation."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._server is not None:
+            self._server.stop(grace=None)
+            self._server = None
+
+    def wait(self) -> None:
+        """Block until the server is stopped."""
+        if self._server is not None:
+            self._server.wait_for_termination()
+
+    def _simulation_loop(self) -> None:
+        last = time.monotonic()
+        while not self._stop_event.wait(self._period):
+            now = time.monotonic()
+            self.model.step(now - last)
+            last = now
+
+    def _compressed_map(self) -> bytes:
+        buf = io.BytesIO()
+        Image.fromarray(self.model.render_map(self.map_size, self.map_resolution)).save(buf, format="PNG")
+        return zlib.compress(buf.getvalue())
+
+
+class NetworkConditions(grpc.ServerInterceptor):
+    """Server interceptor delaying or dropping RPCs to simulate the network."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, packet_loss: float = 0.0) -> None:
+        """Set the network conditions. They can be changed while the server runs."""
+        self.latency = latency
+        self.jitter = jitter
+        self.packet_loss = packet_loss
+
+    def intercept_service(self, continuation, handler_call_details):
+        """Wrap unary-unary handlers with the simulated network conditions."""
+        handler = continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None:
+            return handler
+        behavior = handler.unary_unary
+
+        def impaired_behavior(request, context):
+            if self.packet_loss > 0.0 and random.random() < self.packet_loss:
+                context.abort(grpc.StatusCode.UNAVAILABLE, "Simulated packet loss.")
+            # Half of the delay on the way to the robot, half on the way back.
+            delay = self.latency + random.uniform(0.0, self.jitter)
+            time.sleep(delay / 2)
+            response = behavior(request, context)
+            time.sleep(delay / 2)
+            return response
+
+        return grpc.unary_unary_rpc_method_handler(
+            impaired_behavior,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+
+
+class _UtilityServicer(util_pb2_grpc.MobileBaseUtilityServiceServicer):
+    def __init__(self, model: HolonomicBaseModel) -> None:
+        self._model = model
+
+    def GetZuuuMode(self, request, context):
+        return util_pb2.ZuuuModeCommand(mode=util_pb2.ZuuuModePossiblities.Value(self._model.drive_mode))
+
+    def SetZuuuMode(self, request, context):
+        self._model.set_drive_mode(util_pb2.ZuuuModePossiblities.Name(request.mode))
+        return _ack()
+
+    def GetControlMode(self, request, context):
+        return util_pb2.ControlModeCommand(mode=util_pb2.ControlModePossiblities.Value(self._model.control_mode))
+
+    def SetControlMode(self, request, context):
+        self._model.control_mode = util_pb2.ControlModePossiblities.Name(request.mode)
+        return _ack()
+
+    def GetBatteryLevel(self, request, context):
+        return util_pb2.BatteryLevel(level=FloatValue(value=self._model.battery_voltage))
+
+    def GetOdometry(self, request, context):
+        with self._model.lock:
+            x, y, theta = self._model.x, self._model.y, self._model.theta
+        return util_pb2.OdometryVector(x=FloatValue(value=x), y=FloatValue(value=y), theta=FloatValue(value=theta))
+
+    def ResetOdometry(self, request, context):
+        self._model.reset_odometry()
+        return _ack()
+
+
+class _MobilityServicer(mob_pb2_grpc.MobileBaseMobilityServiceServicer):
+    def __init__(self, model: HolonomicBaseModel) -> None:
+        self._model = model
+
+    def SendDirection(self, request, context):
+        direction = request.direction
+        self._model.send_direction(direction.x.value, direction.y.value, direction.theta.value)
+        return _ack()
+
+    def SendGoTo(self, request, context):
+        self._model.send_goto(request.x_goal.value, request.y_goal.value, request.theta_goal.value)
+        return _ack()
+
+    def DistanceToGoal(self, request, context):
+        delta_x, delta_y, delta_theta, distance = self._model.distance_to_goal()
+        return mob_pb2.DistanceToGoalVector(
+            delta_x=FloatValue(value=delta_x),
+            delta_y=FloatValue(value=delta_y),
+            delta_theta=FloatValue(value=delta_theta),
+            distance=FloatValue(value=distance),
+        )
+
+
+class _LidarServicer(lidar_pb2_grpc.MobileBaseLidarServiceServicer):
+    def __init__(self, simulator: MobileBaseSimulator) -> None:
+        self._simulator = simulator
+        self._model = simulator.model
+
+    def GetZuuuSafety(self, request, context):
+        status = self._model.obstacle_detection_status()
+        return lidar_pb2.LidarSafety(
+            safety_on=BoolValue(value=self._model.safety_enabled),
+            safety_distance=FloatValue(value=self._model.safety_distance),
+            critical_distance=FloatValue(value=self._model.critical_distance),
+            obstacle_detection_status=lidar_pb2.LidarObstacleDetectionStatus(
+                status=lidar_pb2.LidarObstacleDetectionEnum.Value(status)
+            ),
+        )
+
+    def SetZuuuSafety(self, request, context):
+        with self._model.lock:
+            self._model.safety_enabled = request.safety_on.value
+            self._model.safety_distance = request.safety_distance.value
+            self._model.critical_distance = request.critical_distance.value
+        return _ack()
+
+    def GetLidarObstacleDetectionStatus(self, request, context):
+        status = self._model.obstacle_detection_status()
+        return lidar_pb2.LidarObstacleDetectionStatus(status=lidar_pb2.LidarObstacleDetectionEnum.Value(status))
+
+    def GetLidarMap(self, request, context):
+        return lidar_pb2.LidarMap(data=self._simulator._compressed_map())
+
+
+def _ack():
+    return mob_pb2.MobilityServiceAck(success=BoolValue(value=True))
+
+
+def _clip(value: float, limit: float) -> float:
+    return max(-limit, min(limit, value))
+
+
+def _wrap_angle(angle: float) -> float:
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+def _to_robot_frame(obstacle: Obstacle, x: float, y: float, theta: float) -> Obstacle:
+    ox, oy, radius = obstacle
+    cos, sin = math.cos(theta), math.sin(theta)
+    return cos * (ox - x) + sin * (oy - y), -sin * (ox - x) + cos * (oy - y), radius
+
+
+def main() -> None:
+    """Run the simulator until interrupted."""
+    parser = argparse.ArgumentParser(description="Simulated mobile base gRPC server.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=50051)
+    parser.add_argument("--latency", type=float, default=0.0, help="RPC latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Max random extra latency in seconds.")
+    parser.add_argument("--packet-loss", type=float, default=0.0, help="Probability for an RPC to fail.")
+    parser.add_argument(
+        "--obstacle",
+        type=float,
+        nargs=3,
+        action="append",
+        default=[],
+        metavar=("X", "Y", "RADIUS"),
+        help="Circular obstacle in meters, can be repeated.",
+    )
+    args = parser.parse_args()
+
+    simulator = MobileBaseSimulator(
+        host=args.host,
+        port=args.port,
+        obstacles=[tuple(obstacle) for obstacle in args.obstacle],
+        latency=args.latency,
+        jitter=args.jitter,
+        packet_loss=args.packet_loss,
+    )
+    port = simulator.start()
+    print(f"Mobile base simulator listening on {args.host}:{port}")
+    try:
+        simulator.wait()
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
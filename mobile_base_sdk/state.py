@@ -0,0 +1,34 @@
+"""State module for mobile base SDK.
+
+MobileBaseState is an immutable snapshot of the status of the mobile base, fetched by
+MobileBaseSDK.state with concurrent RPCs.
+"""
+import time
+from typing import Mapping, NamedTuple
+
+
+class MobileBaseState(NamedTuple):
+    """Status of the mobile base at a given time (in seconds since the epoch).
+
+    odometry is a read-only mapping of x, y in meters and theta in degree, safety distances are in meters.
+    """
+
+    timestamp: float
+    drive_mode: str
+    control_mode: str
+    battery_voltage: float
+    odometry: Mapping[str, float]
+    safety_enabled: bool
+    safety_slowdown_distance: float
+    safety_critical_distance: float
+    obstacle_detection_status: str
+
+    @property
+    def age(self) -> float:
+        """Time in seconds since the snapshot was taken."""
+        return time.time() - self.timestamp
+
+    @property
+    def is_on(self) -> bool:
+        """Return True if the mobile base was not compliant."""
+        return self.drive_mode != "free_wheel"
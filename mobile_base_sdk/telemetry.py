@@ -0,0 +1,127 @@
+"""Telemetry module for mobile base SDK.
+
+Keeps the latest values of the mobile base's signals in a cache refreshed in the background:
+    - odometry
+    - battery voltage
+    - lidar obstacle detection status
+
+Reading a cached signal does not make any RPC, so the cost of a read no longer depends on
+the number of readers.
+"""
+import threading
+import time
+from logging import getLogger
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+
+class TelemetrySample(NamedTuple):
+    """Value of a signal and the time (in seconds since the epoch) at which it was received."""
+
+    value: Any
+    timestamp: float
+
+    @property
+    def age(self) -> float:
+        """Time in seconds since the sample was received."""
+        return time.time() - self.timestamp
+
+
+class TelemetryCache:
+    """Background poller refreshing a set of signals at their own rate.
+
+    Each signal is defined by a fetch function (doing the RPC) and a polling rate in Hz.
+    A cached value older than its max staleness is considered outdated: reading it triggers
+    a direct fetch instead.
+    """
+
+    def __init__(
+        self,
+        fetchers: Dict[str, Callable[[], Any]],
+        rates: Dict[str, float],
+        max_staleness: Optional[float] = None,
+    ) -> None:
+        """Set up the cache. Polling starts with the start method."""
+        if not rates:
+            raise ValueError("At least one telemetry signal should be polled!")
+        for name, rate in rates.items():
+            if name not in fetchers:
+                raise ValueError(f"Unknown telemetry signal {name}, should be in {list(fetchers)}!")
+            if rate <= 0:
+                raise ValueError(f"The polling rate of {name} should be strictly positive!")
+
+        self._logger = getLogger()
+        self._fetchers = fetchers
+        self._periods = {name: 1.0 / rate for name, rate in rates.items()}
+        # By default, a value is outdated once three polling periods have been missed.
+        self._max_staleness = {
+            name: max_staleness if max_staleness is not None else 3 * period for name, period in self._periods.items()
+        }
+
+        self._samples: Dict[str, TelemetrySample] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start polling the signals in a background thread."""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="mobile-base-telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop polling the signals. Cached values are kept."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        """Return True if the signals are being polled."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def signals(self):
+        """Names of the polled signals."""
+        return list(self._periods)
+
+    def get(self, name: str) -> Optional[TelemetrySample]:
+        """Return the last sample received for the signal, or None if none was received yet."""
+        with self._lock:
+            return self._samples.get(name)
+
+    def read(self, name: str) -> Any:
+        """Return the value of the signal.
+
+        The cached value is used if it is not older than the max staleness of the signal,
+        otherwise the value is fetched directly.
+        """
+        if name in self._periods:
+            sample = self.get(name)
+            if sample is not None and sample.age <= self._max_staleness[name]:
+                return sample.value
+        return self._fetch(name)
+
+    def _fetch(self, name: str) -> Any:
+        value = self._fetchers[name]()
+        if name in self._periods:
+            with self._lock:
+                self._samples[name] = TelemetrySample(value, time.time())
+        return value
+
+    def _poll_loop(self) -> None:
+        next_poll = {name: time.monotonic() for name in self._periods}
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            for name, due in next_poll.items():
+                if due > now:
+                    continue
+                try:
+                    self._fetch(name)
+                except Exception as e:
+                    self._logger.warning(f"Could not refresh telemetry signal {name}: {e}")
+                # Keep the polling grid fixed but never try to catch up on missed polls.
+                next_poll[name] = max(due + self._periods[name], now)
+            self._stop_event.wait(max(0.0, min(next_poll.values()) - time.monotonic()))
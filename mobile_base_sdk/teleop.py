@@ -0,0 +1,262 @@
+"""Teleoperation module for mobile base SDK.
+
+Drives the mobile base from a controller (joystick, gamepad...) with low latency:
+    - controller inputs are sampled on their own thread, or pushed by the caller's loop
+    - inputs are mapped to velocities with a configurable mapping, and only the latest one is kept
+    - commands are sent at a fixed rate by a velocity stream, so a slow RPC never delays input handling
+    - the base stops if no input is received in time, or if the (optional) deadman button is released
+    - loop jitter and input-to-command latency are measured
+"""
+import threading
+import time
+from collections import deque
+from logging import getLogger
+from typing import Callable, Deque, NamedTuple, Optional, Sequence, Tuple
+
+from .velocity_stream import VelocityStream
+
+
+class AxisMapping(NamedTuple):
+    """Controller axis driving one velocity.
+
+    The axis value (in [-1, 1]) is multiplied by scale, after zeroing values within the deadzone and
+    rescaling the rest so that the velocity starts from zero at the edge of the deadzone.
+    """
+
+    axis: int
+    scale: float
+    deadzone: float = 0.1
+
+    def apply(self, axes: Sequence[float]) -> float:
+        """Return the velocity for the given axes values."""
+        value = axes[self.axis] if self.axis < len(axes) else 0.0
+        if abs(value) <= self.deadzone:
+            return 0.0
+        sign = 1.0 if value > 0 else -1.0
+        return sign * min((abs(value) - self.deadzone) / (1.0 - self.deadzone), 1.0) * self.scale
+
+
+class TeleopMapping(NamedTuple):
+    """Mapping of the controller to the velocities of the base.
+
+    x_vel and y_vel are in m/s, rot_vel in deg/s. If deadman_button is not None, the base only moves
+    while that button is held.
+    """
+
+    x_vel: AxisMapping
+    y_vel: AxisMapping
+    rot_vel: AxisMapping
+    deadman_button: Optional[int] = None
+
+    def velocity(self, axes: Sequence[float], buttons: Sequence[bool]) -> Tuple[float, float, float]:
+        """Return the (x_vel, y_vel, rot_vel) velocity for the given controller state."""
+        if self.deadman_button is not None and not (self.deadman_button < len(buttons) and buttons[self.deadman_button]):
+            return (0.0, 0.0, 0.0)
+        return (self.x_vel.apply(axes), self.y_vel.apply(axes), self.rot_vel.apply(axes))
+
+
+# Xbox-like or DualShock gamepad: left stick to translate, right stick to turn (pushing a stick up or left
+# gives negative axis values). There is no deadman button, the bumpers and triggers being left to the
+# application (e.g. to adjust the speeds): the base still stops if inputs stop coming.
+DEFAULT_GAMEPAD_MAPPING = TeleopMapping(
+    x_vel=AxisMapping(axis=1, scale=-0.5),
+    y_vel=AxisMapping(axis=0, scale=-0.5),
+    rot_vel=AxisMapping(axis=3, scale=-90.0),
+)
+
+
+class TeleopStats(NamedTuple):
+    """Statistics of a teleop engine.
+
+    Input jitter is the delay between the scheduled and actual sampling times of the controller,
+    output jitter the same for the commands. Latency is the time between sampling an input and the
+    end of the RPC sending the resulting command. Coalesced inputs were replaced by a newer one before
+    being sent.
+    """
+
+    inputs: int
+    input_errors: int
+    input_jitter_mean: float
+    input_jitter_max: float
+    commands: int
+    command_errors: int
+    coalesced_inputs: int
+    timeouts: int
+    output_jitter_mean: float
+    output_jitter_max: float
+    latency_mean: float
+    latency_p95: float
+    latency_max: float
+
+
+class TeleopEngine:
+    """Low-latency teleoperation of a MobileBaseSDK.
+
+    Inputs are either polled from read_input, called at input_rate_hz from a dedicated thread and
+    returning the (axes, buttons) state of the controller, or pushed by the caller with push_input.
+    Commands are sent at output_rate_hz. If no input is received for input_timeout seconds, a null
+    velocity is sent until inputs come back. While running, the engine's stream is the velocity stream
+    of the SDK: starting another one or closing the SDK stops the teleoperation.
+    """
+
+    def __init__(
+        self,
+        mobile_base,
+        mapping: TeleopMapping = DEFAULT_GAMEPAD_MAPPING,
+        read_input: Optional[Callable[[], Tuple[Sequence[float], Sequence[bool]]]] = None,
+        input_rate_hz: float = 100.0,
+        output_rate_hz: float = 20.0,
+        input_timeout: float = 0.5,
+        latency_window: int = 1000,
+    ) -> None:
+        """Set up the engine. Teleoperation starts with the start method."""
+        if input_rate_hz <= 0:
+            raise ValueError("input_rate_hz should be strictly positive!")
+        self._logger = getLogger()
+        self._mobile_base = mobile_base
+        self.mapping = mapping
+        self._read_input = read_input
+        self._input_period = 1.0 / input_rate_hz
+
+        self._stream = VelocityStream(send=self._send, rate_hz=output_rate_hz, setpoint_timeout=input_timeout)
+        self._lock = threading.Lock()
+        # Sampling time of the latest input, not sent yet.
+        self._pending_input_time: Optional[float] = None
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reset_stats()
+
+    @property
+    def is_running(self) -> bool:
+        """Return True if commands are being sent."""
+        return self._stream.is_running
+
+    @property
+    def velocity(self) -> Tuple[float, float, float]:
+        """Latest velocity setpoint as (x_vel, y_vel, rot_vel)."""
+        return self._stream.setpoint
+
+    def start(self) -> None:
+        """Switch the base to velocity control and start sending commands (and polling inputs, if any)."""
+        if self.is_running:
+            return
+        self._mobile_base.stop_velocity_stream()
+        if self._mobile_base._drive_mode != "cmd_vel":
+            self._mobile_base._set_drive_mode("cmd_vel")
+        # The stream replaces the one of the SDK, so that closing the SDK stops it.
+        self._mobile_base._velocity_stream = self._stream
+        self._stream.start()
+        if self._read_input is not None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._input_loop, name="mobile-base-teleop-input", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop polling inputs and sending commands, and send a null velocity."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        # The stream may already have been stopped by closing the SDK.
+        if self._stream.is_running:
+            self._stream.stop()
+        if self._mobile_base._velocity_stream is self._stream:
+            self._mobile_base._velocity_stream = None
+
+    def __enter__(self) -> "TeleopEngine":
+        """Start the teleoperation."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Stop the teleoperation."""
+        self.stop()
+
+    def push_input(self, axes: Sequence[float], buttons: Sequence[bool], timestamp: Optional[float] = None) -> None:
+        """Update the velocity setpoint from a controller state sampled at timestamp (time.monotonic, now by default).
+
+        Only the latest state is sent: states pushed faster than the output rate are coalesced.
+        """
+        x_vel, y_vel, rot_vel = self.mapping.velocity(axes, buttons)
+        x_vel = _clip(x_vel, self._mobile_base._max_xy_vel)
+        y_vel = _clip(y_vel, self._mobile_base._max_xy_vel)
+        rot_vel = _clip(rot_vel, self._mobile_base._max_rot_vel)
+        with self._lock:
+            self._pending_input_time = timestamp if timestamp is not None else time.monotonic()
+        self._stream.update(x_vel, y_vel, rot_vel)
+
+    def stats(self) -> TeleopStats:
+        """Return the statistics of the engine since it was created or the last reset."""
+        stream = self._stream.stats()
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return TeleopStats(
+                inputs=self._inputs,
+                input_errors=self._input_errors,
+                input_jitter_mean=self._input_jitter_sum / self._inputs if self._inputs else 0.0,
+                input_jitter_max=self._input_jitter_max,
+                commands=stream.sent,
+                command_errors=stream.errors,
+                coalesced_inputs=stream.dropped_updates,
+                timeouts=stream.timeouts,
+                output_jitter_mean=stream.jitter_mean,
+                output_jitter_max=stream.jitter_max,
+                latency_mean=sum(latencies) / len(latencies) if latencies else 0.0,
+                latency_p95=latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+                latency_max=latencies[-1] if latencies else 0.0,
+            )
+
+    def reset_stats(self) -> None:
+        """Reset the statistics of the engine."""
+        with self._lock:
+            self._inputs = 0
+            self._input_errors = 0
+            self._input_jitter_sum = 0.0
+            self._input_jitter_max = 0.0
+            self._latencies.clear()
+        self._stream.reset_stats()
+
+    def _send(self, x_vel: float, y_vel: float, rot_vel: float) -> None:
+        with self._lock:
+            input_time, self._pending_input_time = self._pending_input_time, None
+        self._mobile_base._send_direction(x_vel, y_vel, rot_vel)
+        if input_time is not None:
+            latency = time.monotonic() - input_time
+            with self._lock:
+                self._latencies.append(latency)
+
+    def _input_loop(self) -> None:
+        next_tick = time.monotonic()
+        error = False
+        # The loop also ends if the stream was stopped by closing the SDK.
+        while not self._stop_event.is_set() and self._stream.is_running:
+            now = time.monotonic()
+            jitter = now - next_tick
+            try:
+                axes, buttons = self._read_input()
+                self.push_input(axes, buttons, timestamp=now)
+                error = False
+            except Exception as e:
+                # Only the first failure of a series is logged, the stream stops the base if it lasts.
+                if not error:
+                    self._logger.warning(f"Could not read the controller: {e}")
+                error = True
+
+            with self._lock:
+                self._inputs += 1
+                self._input_errors += error
+                self._input_jitter_sum += jitter
+                self._input_jitter_max = max(self._input_jitter_max, jitter)
+
+            # Stay on a fixed time grid, but skip the ticks missed by a slow read.
+            next_tick += self._input_period
+            now = time.monotonic()
+            if next_tick < now:
+                next_tick = now
+            self._stop_event.wait(next_tick - now)
+
+
+def _clip(value: float, limit: float) -> float:
+    return min(max(value, -limit), limit)
@@ -0,0 +1,221 @@
+"""Tracing module for mobile base SDK.
+
+Records how the time of the SDK's high-level operations (goto, get_map...) is split between their phases:
+    - each phase is a span, nested in the span of the operation running it
+    - spans are kept in a bounded buffer and exported in the Chrome trace-event JSON format (for
+      chrome://tracing or Perfetto) or as OpenTelemetry (OTLP/JSON) spans
+    - when tracing is disabled, the SDK uses NULL_TRACER, whose spans do nothing
+"""
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+
+class SpanRecord(NamedTuple):
+    """Finished span. Times are in nanoseconds since the epoch, parent_id is 0 for a root span."""
+
+    name: str
+    trace_id: int
+    span_id: int
+    parent_id: int
+    start_ns: int
+    end_ns: int
+    thread_id: int
+    attributes: Dict[str, Any]
+    error: Optional[str]
+
+
+class Span:
+    """Span being recorded, used as a context manager."""
+
+    __slots__ = ("_tracer", "name", "attributes", "trace_id", "span_id", "parent_id", "_start_ns", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Dict[str, Any]) -> None:
+        """Create the span. It starts when entered."""
+        self._tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        if parent is None:
+            parent = _current_span.get()
+        if isinstance(parent, Span):
+            self.trace_id, self.parent_id = parent.trace_id, parent.span_id
+        else:
+            self.trace_id, self.parent_id = int.from_bytes(os.urandom(16), "big"), 0
+        self.span_id = next(tracer._ids)
+        self._start_ns = 0
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set an attribute of the span."""
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        """Start the span and make it the parent of the spans started in this context."""
+        self._token = _current_span.set(self)
+        self._start_ns = _now_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        """End the span and record it."""
+        end_ns = _now_ns()
+        _current_span.reset(self._token)
+        error = None if exc_type is None else f"{exc_type.__name__}: {exc}"
+        self._tracer._record(
+            SpanRecord(
+                name=self.name,
+                trace_id=self.trace_id,
+                span_id=self.span_id,
+                parent_id=self.parent_id,
+                start_ns=self._start_ns,
+                end_ns=end_ns,
+                thread_id=threading.get_ident(),
+                attributes=self.attributes,
+                error=error,
+            )
+        )
+
+
+class _NullSpan:
+    """Span doing nothing, returned when tracing is disabled."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("mobile_base_span", default=None)
+
+
+class NullTracer:
+    """Tracer recording nothing, used when tracing is disabled."""
+
+    enabled = False
+
+    def span(self, name: str, parent=None, **attributes) -> _NullSpan:
+        """Return a span doing nothing."""
+        return _NULL_SPAN
+
+
+NULL_TRACER = NullTracer()
+
+
+class Tracer:
+    """Recorder of the spans of the SDK. The last capacity spans are kept."""
+
+    enabled = True
+
+    def __init__(self, capacity: int = 100000, service_name: str = "mobile_base_sdk") -> None:
+        """Create an empty tracer."""
+        if capacity <= 0:
+            raise ValueError("capacity should be strictly positive!")
+        self._spans: Deque[SpanRecord] = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self.service_name = service_name
+
+    def span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        """Return a span to use as a context manager, child of parent or of the current span."""
+        return Span(self, name, parent, attributes)
+
+    def spans(self) -> List[SpanRecord]:
+        """Return the finished spans, in the order they ended."""
+        return list(self._spans)
+
+    def clear(self) -> None:
+        """Remove the recorded spans."""
+        self._spans.clear()
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Return the spans in the Chrome trace-event format, as complete ("X") events."""
+        pid = os.getpid()
+        events = []
+        for span in self.spans():
+            args = {key: _json_value(value) for key, value in span.attributes.items()}
+            if span.error is not None:
+                args["error"] = span.error
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": self.service_name,
+                    "ph": "X",
+                    "ts": span.start_ns / 1e3,
+                    "dur": (span.end_ns - span.start_ns) / 1e3,
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path: str) -> None:
+        """Save the spans to a Chrome trace-event JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Return the spans as an OpenTelemetry (OTLP/JSON) ExportTraceServiceRequest."""
+        spans = []
+        for span in self.spans():
+            record = {
+                "traceId": f"{span.trace_id:032x}",
+                "spanId": f"{span.span_id:016x}",
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                "status": {"code": 1} if span.error is None else {"code": 2, "message": span.error},
+            }
+            if span.parent_id:
+                record["parentSpanId"] = f"{span.parent_id:016x}"
+            spans.append(record)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                    "scopeSpans": [{"scope": {"name": "mobile_base_sdk.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+
+    def save_otlp(self, path: str) -> None:
+        """Save the spans to an OTLP/JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.to_otlp(), f)
+
+    def _record(self, span: SpanRecord) -> None:
+        self._spans.append(span)
+
+
+# Offset between the epoch and perf_counter, so that spans are precise and comparable across processes.
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+def _now_ns() -> int:
+    return time.perf_counter_ns() + _EPOCH_OFFSET_NS
+
+
+def _json_value(value: Any) -> Any:
+    return value if isinstance(value, (bool, int, float, str)) or value is None else str(value)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
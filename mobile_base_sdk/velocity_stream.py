@@ -0,0 +1,176 @@
+"""Velocity stream module for mobile base SDK.
+
+Sends the latest velocity setpoint to the mobile base at a fixed rate from a dedicated thread.
+Velocity commands only last 200ms at the ROS level of the mobile base's code: the stream refreshes
+them before they expire, so the caller's loop can run slower than the commands expire.
+
+The setpoint timeout acts as a deadman: the setpoint must be updated at least every setpoint_timeout
+seconds (0.5s by default), even if it does not change, otherwise a null velocity is sent until the
+next update. This stops the base if the caller's loop hangs. With setpoint_timeout=None, the setpoint
+only has to be updated when it changes.
+"""
+import threading
+import time
+from logging import getLogger
+from typing import Callable, NamedTuple, Optional, Tuple
+
+# Duration of a velocity command, predefined at the ROS level of the mobile base's code.
+COMMAND_DURATION = 0.2
+
+
+class VelocityStreamStats(NamedTuple):
+    """Statistics of a velocity stream.
+
+    Jitter is the delay in seconds between the scheduled and the actual sending time of a command.
+    Dropped updates are setpoints replaced by a newer one before having been sent.
+    """
+
+    sent: int
+    errors: int
+    updates: int
+    dropped_updates: int
+    timeouts: int
+    jitter_mean: float
+    jitter_max: float
+
+
+class VelocityStream:
+    """Fixed-rate sender of the latest velocity setpoint."""
+
+    def __init__(
+        self,
+        send: Callable[[float, float, float], None],
+        rate_hz: float = 20.0,
+        setpoint_timeout: Optional[float] = 0.5,
+    ) -> None:
+        """Set up the stream.
+
+        send is called with (x_vel, y_vel, rot_vel) at rate_hz, which should be high enough to
+        refresh the command before its 200ms duration expires. The setpoint must be updated at
+        least every setpoint_timeout seconds, even if it does not change, otherwise a null velocity
+        is sent instead (None to disable this deadman).
+        """
+        if rate_hz <= 1.0 / COMMAND_DURATION:
+            raise ValueError(f"rate_hz should be more than {1.0 / COMMAND_DURATION}Hz to refresh commands in time!")
+
+        self._logger = getLogger()
+        self._send = send
+        self._period = 1.0 / rate_hz
+        self._setpoint_timeout = setpoint_timeout
+
+        self._setpoint: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+        self._setpoint_time = time.monotonic()
+        self._setpoint_sent = True
+        self._lock = threading.Lock()
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reset_stats()
+
+    @property
+    def rate_hz(self) -> float:
+        """Sending rate of the stream."""
+        return 1.0 / self._period
+
+    @property
+    def is_running(self) -> bool:
+        """Return True if the stream is sending commands."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def setpoint(self) -> Tuple[float, float, float]:
+        """Return the latest velocity setpoint as (x_vel, y_vel, rot_vel)."""
+        return self._setpoint
+
+    def start(self) -> None:
+        """Start sending the setpoint."""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        with self._lock:
+            self._setpoint_time = time.monotonic()
+        self._thread = threading.Thread(target=self._send_loop, name="mobile-base-velocity-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the stream and send a null velocity."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._setpoint = (0.0, 0.0, 0.0)
+        self._send(0.0, 0.0, 0.0)
+
+    def update(self, x_vel: float, y_vel: float, rot_vel: float) -> None:
+        """Replace the setpoint. It is sent on the next tick of the stream."""
+        with self._lock:
+            if not self._setpoint_sent:
+                self._dropped_updates += 1
+            self._setpoint = (x_vel, y_vel, rot_vel)
+            self._setpoint_time = time.monotonic()
+            self._setpoint_sent = False
+            self._updates += 1
+
+    def stats(self) -> VelocityStreamStats:
+        """Return the statistics of the stream since it was created or the last reset."""
+        with self._lock:
+            return VelocityStreamStats(
+                sent=self._sent,
+                errors=self._errors,
+                updates=self._updates,
+                dropped_updates=self._dropped_updates,
+                timeouts=self._timeouts,
+                jitter_mean=self._jitter_sum / self._sent if self._sent else 0.0,
+                jitter_max=self._jitter_max,
+            )
+
+    def reset_stats(self) -> None:
+        """Reset the statistics of the stream."""
+        with self._lock:
+            self._sent = 0
+            self._errors = 0
+            self._updates = 0
+            self._dropped_updates = 0
+            self._timeouts = 0
+            self._jitter_sum = 0.0
+            self._jitter_max = 0.0
+
+    def _send_loop(self) -> None:
+        next_tick = time.monotonic()
+        timed_out = False
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            jitter = now - next_tick
+
+            with self._lock:
+                setpoint = self._setpoint
+                expired = self._setpoint_timeout is not None and now - self._setpoint_time > self._setpoint_timeout
+                self._setpoint_sent = True
+            if expired:
+                if not timed_out:
+                    self._logger.warning("Velocity setpoint not updated in time, sending a null velocity.")
+                    with self._lock:
+                        self._timeouts += 1
+                setpoint = (0.0, 0.0, 0.0)
+            timed_out = expired
+
+            try:
+                self._send(*setpoint)
+                error = False
+            except Exception as e:
+                self._logger.warning(f"Could not send velocity command: {e}")
+                error = True
+
+            with self._lock:
+                self._sent += 1
+                self._errors += error
+                self._jitter_sum += jitter
+                self._jitter_max = max(self._jitter_max, jitter)
+
+            # Stay on a fixed time grid, but skip the ticks missed by a slow send.
+            next_tick += self._period
+            now = time.monotonic()
+            if next_tick < now:
+                next_tick = now
+            self._stop_event.wait(next_tick - now)
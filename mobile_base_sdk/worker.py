@@ -0,0 +1,69 @@
+"""Worker module for mobile base SDK.
+
+Runs a long-lived asyncio event loop in a background thread, so that the SDK's coroutines
+(goto, ...) can be scheduled from synchronous code without creating a new thread and
+event loop for each call.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+
+class EventLoopThread:
+    """Asyncio event loop running forever in a daemon thread."""
+
+    def __init__(self, name: str = "mobile-base-worker") -> None:
+        """Create the event loop. The thread is started on the first submission."""
+        self._name = name
+        self._loop = asyncio.new_event_loop()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop run by the thread."""
+        return self._loop
+
+    @property
+    def is_running(self) -> bool:
+        """Return True if the thread is running the event loop."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start running the event loop, if not already running."""
+        with self._lock:
+            if self.is_running:
+                return
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine on the event loop and return a concurrent.futures.Future of its result."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def call_soon(self, callback, *args: Any) -> None:
+        """Schedule a callback on the event loop from any thread."""
+        self.start()
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self) -> None:
+        """Cancel the pending coroutines, let them handle it, then stop the event loop and wait for the thread."""
+        with self._lock:
+            if not self.is_running:
+                return
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            self._thread.join()
+            self._thread = None
+
+    async def _shutdown(self) -> None:
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop.stop()
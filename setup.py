@@ -25,6 +25,7 @@ setup(
     ],
     extras_require={
         "doc": ["sphinx"],
+        "test": ["pytest"],
     },
     author="Pollen Robotics",
     author_email="contact@pollen-robotics.com",
@@ -0,0 +1,29 @@
+"""Fixtures of the tests, run against the in-process simulator of the mobile base."""
+import socket
+
+import pytest
+
+from mobile_base_sdk import MobileBaseSDK
+from mobile_base_sdk.simulator import MobileBaseSimulator
+
+
+@pytest.fixture
+def simulator():
+    """Run a simulated mobile base on a free port."""
+    with MobileBaseSimulator() as simulator:
+        yield simulator
+
+
+@pytest.fixture
+def mobile_base(simulator):
+    """Connect an SDK to the simulator, closed at the end of the test."""
+    with MobileBaseSDK(host="localhost", mobile_base_port=simulator.port) as mobile_base:
+        yield mobile_base
+
+
+@pytest.fixture
+def port() -> int:
+    """Return a free port, to restart a simulator on the same port."""
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,36 @@
+"""Tests of the capture and replay of the gRPC traffic."""
+import time
+
+from mobile_base_sdk import MobileBaseSDK
+from mobile_base_sdk.capture import ReplayChannel, read_capture
+from mobile_base_sdk.simulator import MobileBaseSimulator
+
+
+def _session(mobile_base):
+    readings = []
+    mobile_base.set_speed(0.3, 0.0, 20.0)
+    for _ in range(3):
+        time.sleep(0.05)
+        readings.append(mobile_base.odometry)
+    readings.append(mobile_base.battery_voltage)
+    readings.append(mobile_base.lidar.get_map_array().tobytes())
+    readings.append(mobile_base.state().odometry)
+    return readings
+
+
+def test_replay_returns_recorded_session(tmp_path):
+    """A session replayed from its capture gets the recorded responses, in order."""
+    path = str(tmp_path / "session.mbcap")
+    with MobileBaseSimulator(obstacles=[(1.0, 0.0, 0.2)]) as simulator:
+        with MobileBaseSDK(host="localhost", mobile_base_port=simulator.port, capture=path) as mobile_base:
+            recorded = _session(mobile_base)
+        captured = mobile_base.capture.captured
+
+    calls = list(read_capture(path))
+    assert len(calls) == captured
+    assert {call.method.rsplit("/", 1)[1] for call in calls} >= {"SendDirection", "GetOdometry", "GetLidarMap"}
+
+    channel = ReplayChannel(path, speed=None)
+    with MobileBaseSDK(host="replay", channel=channel) as mobile_base:
+        assert _session(mobile_base) == recorded
+    assert channel.mismatches == 0
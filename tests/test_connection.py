@@ -0,0 +1,127 @@
+"""Tests of the reconnection of MobileBaseSDK to a restarted base."""
+import time
+
+import grpc
+
+from mobile_base_sdk import MobileBaseSDK
+from mobile_base_sdk.simulator import MobileBaseSimulator
+
+
+def test_reconnect_restores_modes_and_safety(port):
+    """After the base restarts, the SDK restores its drive mode and safety settings."""
+    simulator = MobileBaseSimulator(port=port)
+    simulator.start()
+    try:
+        with MobileBaseSDK(host="localhost", mobile_base_port=port) as mobile_base:
+            mobile_base.turn_off()
+            mobile_base.lidar.configure_safety(slowdown_distance=0.9, critical_distance=0.4, enabled=False)
+
+            simulator.stop()
+            time.sleep(0.5)
+            # A new simulator starts with the default modes and safety settings.
+            simulator = MobileBaseSimulator(port=port)
+            simulator.start()
+
+            deadline = time.monotonic() + 10.0
+            while mobile_base._connection.reconnections == 0 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert mobile_base.is_connected
+            assert mobile_base._connection.reconnections == 1
+            assert simulator.model.drive_mode == "FREE_WHEEL"
+            assert abs(simulator.model.safety_distance - 0.9) < 1e-6
+            assert abs(simulator.model.critical_distance - 0.4) < 1e-6
+            assert not simulator.model.safety_enabled
+    finally:
+        simulator.stop()
+
+
+def test_lazy_connection_waits_for_base(port):
+    """A lazy SDK syncs with a base started after it."""
+    with MobileBaseSDK(host="localhost", mobile_base_port=port, lazy=True) as mobile_base:
+        assert not mobile_base.wait_for_connection(timeout=0.2)
+        with MobileBaseSimulator(port=port):
+            assert mobile_base.wait_for_connection(timeout=10.0)
+            assert mobile_base.modes.peek("drive_mode") == "brake"
+            assert mobile_base.lidar.safety_critical_distance == 0.55
+
+
+class _ScriptedChannel(grpc.Channel):
+    """Channel to the simulator whose connectivity states are set by the test."""
+
+    def __init__(self, channel: grpc.Channel) -> None:
+        self._channel = channel
+        self._callbacks = []
+        self.state = grpc.ChannelConnectivity.READY
+
+    def set_state(self, state: grpc.ChannelConnectivity) -> None:
+        self.state = state
+        for callback in list(self._callbacks):
+            callback(state)
+
+    def subscribe(self, callback, try_to_connect=False):
+        self._callbacks.append(callback)
+        callback(self.state)
+        # Like a real channel, an idle channel asked to connect gets ready again.
+        if try_to_connect and self.state == grpc.ChannelConnectivity.IDLE:
+            self.set_state(grpc.ChannelConnectivity.READY)
+
+    def unsubscribe(self, callback):
+        self._callbacks.remove(callback)
+
+    def unary_unary(self, *args, **kwargs):
+        return self._channel.unary_unary(*args, **kwargs)
+
+    def unary_stream(self, *args, **kwargs):
+        return self._channel.unary_stream(*args, **kwargs)
+
+    def stream_unary(self, *args, **kwargs):
+        return self._channel.stream_unary(*args, **kwargs)
+
+    def stream_stream(self, *args, **kwargs):
+        return self._channel.stream_stream(*args, **kwargs)
+
+    def close(self):
+        self._channel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _set_calls(mobile_base):
+    return {method: stats["count"] for method, stats in mobile_base.metrics.snapshot().items() if "/Set" in method}
+
+
+def _wait_for_sync(mobile_base, drive_mode):
+    deadline = time.monotonic() + 5.0
+    while not (mobile_base.is_connected and mobile_base._drive_mode == drive_mode) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert mobile_base.is_connected
+    assert mobile_base._drive_mode == drive_mode
+
+
+def test_idle_channel_fetches_state_without_restoring(simulator):
+    """A channel back from idle refreshes the modes of the base without sending any Set RPC."""
+    with _ScriptedChannel(grpc.insecure_channel(f"localhost:{simulator.port}")) as channel:
+        with MobileBaseSDK(host="localhost", channel=channel, metrics=True) as mobile_base:
+            mobile_base.turn_off()
+            set_calls = _set_calls(mobile_base)
+            # Another client brakes the base while this one is quiet.
+            simulator.model.drive_mode = "BRAKE"
+
+            channel.set_state(grpc.ChannelConnectivity.IDLE)
+            _wait_for_sync(mobile_base, "brake")
+            assert _set_calls(mobile_base) == set_calls
+            assert simulator.model.drive_mode == "BRAKE"
+            assert mobile_base._connection.reconnections == 0
+
+            # After a real loss of connection, the modes known by the SDK are restored.
+            mobile_base.turn_off()
+            simulator.model.drive_mode = "BRAKE"
+            channel.set_state(grpc.ChannelConnectivity.TRANSIENT_FAILURE)
+            channel.set_state(grpc.ChannelConnectivity.READY)
+            _wait_for_sync(mobile_base, "free_wheel")
+            assert simulator.model.drive_mode == "FREE_WHEEL"
+            assert mobile_base._connection.reconnections == 1
@@ -0,0 +1,71 @@
+"""Tests of the fleet of mobile bases against simulators."""
+import asyncio
+import time
+
+import grpc
+import pytest
+
+from mobile_base_sdk.fleet import Fleet
+from mobile_base_sdk.simulator import MobileBaseSimulator
+
+
+@pytest.fixture
+def bases(port):
+    """Run two responsive simulators and a slow one, plus the address of a base that is down."""
+    with MobileBaseSimulator() as first, MobileBaseSimulator() as second, MobileBaseSimulator() as slow:
+        yield {
+            "first": ("localhost", first.port),
+            "second": ("localhost", second.port),
+            "slow": ("localhost", slow.port),
+            "down": ("localhost", port),
+        }, {"first": first, "second": second, "slow": slow}
+
+
+def test_errors_are_isolated_per_base(bases):
+    """A slow or unreachable base reports its error without delaying or failing the others."""
+    addresses, simulators = bases
+
+    async def run():
+        async with Fleet(addresses, timeout=0.3) as fleet:
+            simulators["slow"].network.latency = 1.0
+            tic = time.monotonic()
+            result = await fleet.odometry()
+            duration = time.monotonic() - tic
+
+            assert not result.ok
+            assert set(result.results) == {"first", "second"}
+            assert result.results["first"] == {"x": 0.0, "y": 0.0, "theta": 0.0}
+            assert set(result.errors) == {"slow", "down"}
+            assert isinstance(result.errors["slow"], asyncio.TimeoutError)
+            assert isinstance(result.errors["down"], grpc.aio.AioRpcError)
+            assert duration < 0.9
+
+            simulators["slow"].network.latency = 0.0
+            result = await fleet.set_speed({"first": (0.2, 0.0, 0.0), "slow": (0.0, 0.0, 30.0)})
+            assert result.ok
+            assert set(result.results) == {"first", "slow"}
+            assert simulators["first"].model.drive_mode == "CMD_VEL"
+            assert simulators["second"].model.drive_mode == "BRAKE"
+
+            result = await fleet.stop_all(["first", "second", "slow"])
+            assert result.ok
+            assert simulators["first"].model.drive_mode == "BRAKE"
+
+            result = await fleet.battery_voltage(["second"])
+            assert list(result.results) == ["second"] and result.ok
+
+    asyncio.run(run())
+
+
+def test_unknown_base_is_refused(bases):
+    """Operations on a base that is not in the fleet raise a ValueError."""
+    addresses, _ = bases
+
+    async def run():
+        async with Fleet({"first": addresses["first"]}) as fleet:
+            with pytest.raises(ValueError):
+                await fleet.odometry(["first", "other"])
+
+    asyncio.run(run())
+    with pytest.raises(ValueError):
+        Fleet({})
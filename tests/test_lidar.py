@@ -0,0 +1,78 @@
+"""Tests of the lidar safety settings against the simulator."""
+import pytest
+
+from mobile_base_sdk import MobileBaseSDK
+
+SET_SAFETY = "MobileBaseLidarService/SetZuuuSafety"
+
+
+@pytest.fixture
+def mobile_base(simulator):
+    """Connect an SDK recording its RPCs to the simulator."""
+    with MobileBaseSDK(host="localhost", mobile_base_port=simulator.port, metrics=True) as mobile_base:
+        mobile_base.metrics.reset()
+        yield mobile_base
+
+
+def _set_safety_calls(mobile_base):
+    return mobile_base.metrics.snapshot().get(SET_SAFETY, {"count": 0})["count"]
+
+
+def test_configure_safety_sends_one_request(mobile_base, simulator):
+    """configure_safety sets the given values in one request and keeps the others."""
+    mobile_base.lidar.configure_safety(slowdown_distance=0.8, enabled=False)
+    assert _set_safety_calls(mobile_base) == 1
+    assert simulator.model.safety_distance == pytest.approx(0.8)
+    assert simulator.model.critical_distance == pytest.approx(0.55)
+    assert not simulator.model.safety_enabled
+
+
+def test_transaction_sends_one_request(mobile_base, simulator):
+    """The changes made in a transaction are sent together when leaving it."""
+    lidar = mobile_base.lidar
+    with lidar.safety_transaction():
+        lidar.safety_slowdown_distance = 0.9
+        lidar.safety_critical_distance = 0.4
+        lidar.safety_enabled = False
+        # Pending values are read back, but not sent yet.
+        assert lidar.safety_slowdown_distance == pytest.approx(0.9)
+        assert _set_safety_calls(mobile_base) == 0
+        assert simulator.model.safety_enabled
+    assert _set_safety_calls(mobile_base) == 1
+    assert simulator.model.safety_distance == pytest.approx(0.9)
+    assert simulator.model.critical_distance == pytest.approx(0.4)
+    assert not simulator.model.safety_enabled
+    assert lidar.safety_critical_distance == pytest.approx(0.4)
+
+
+def test_failed_transaction_sends_nothing(mobile_base, simulator):
+    """An exception raised in a transaction discards its changes."""
+    lidar = mobile_base.lidar
+    with pytest.raises(KeyError):
+        with lidar.safety_transaction():
+            lidar.safety_slowdown_distance = 0.9
+            lidar.safety_enabled = False
+            raise KeyError("failure")
+    assert _set_safety_calls(mobile_base) == 0
+    assert simulator.model.safety_enabled
+    assert lidar.safety_enabled
+    assert lidar.safety_slowdown_distance != pytest.approx(0.9)
+
+    # The next transaction starts from scratch.
+    with lidar.safety_transaction():
+        lidar.safety_critical_distance = 0.3
+    assert _set_safety_calls(mobile_base) == 1
+    assert simulator.model.critical_distance == pytest.approx(0.3)
+    assert simulator.model.safety_enabled
+
+
+def test_empty_and_nested_transactions(mobile_base):
+    """An empty transaction sends nothing, and transactions cannot be nested."""
+    lidar = mobile_base.lidar
+    with lidar.safety_transaction():
+        pass
+    assert _set_safety_calls(mobile_base) == 0
+    with lidar.safety_transaction():
+        with pytest.raises(RuntimeError):
+            with lidar.safety_transaction():
+                pass
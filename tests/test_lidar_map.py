@@ -0,0 +1,99 @@
+"""Tests of the decoding and caching of the lidar map."""
+import io
+import struct
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from mobile_base_sdk.lidar_map import LidarMapCache, _decode_array
+
+# Odd width, so that BMP rows are padded to a multiple of 4 bytes.
+WIDTH, HEIGHT = 5, 3
+
+
+def _pixels(channels):
+    pixels = np.arange(HEIGHT * WIDTH * channels, dtype=np.uint8).reshape(HEIGHT, WIDTH, channels) * 7
+    return pixels[..., 0] if channels == 1 else pixels
+
+
+def _encode(image, format):
+    output = io.BytesIO()
+    image.save(output, format=format)
+    return output.getvalue()
+
+
+def _top_down(bmp):
+    """Rewrite a bottom-up BMP as a top-down one: negative height and rows stored first to last."""
+    (offset,) = struct.unpack_from("<I", bmp, 10)
+    (height,) = struct.unpack_from("<i", bmp, 22)
+    stride = (len(bmp) - offset) // height
+    rows = [bmp[offset + i * stride:offset + (i + 1) * stride] for i in range(height)]
+    top_down = bytearray(bmp[:offset] + b"".join(reversed(rows)))
+    struct.pack_into("<i", top_down, 22, -height)
+    return bytes(top_down)
+
+
+def _palette_image():
+    image = Image.fromarray(_pixels(1) % 4, mode="P")
+    image.putpalette([255, 0, 0, 0, 255, 0, 0, 0, 255, 255, 255, 255] + [0] * (256 - 4) * 3)
+    return image
+
+
+IMAGES = {
+    "gray_bmp": (lambda: _encode(Image.fromarray(_pixels(1), mode="L"), "BMP"), _pixels(1)),
+    "rgb_bmp": (lambda: _encode(Image.fromarray(_pixels(3), mode="RGB"), "BMP"), _pixels(3)),
+    "rgb_bmp_top_down": (lambda: _top_down(_encode(Image.fromarray(_pixels(3), mode="RGB"), "BMP")), _pixels(3)),
+    "gray_bmp_top_down": (lambda: _top_down(_encode(Image.fromarray(_pixels(1), mode="L"), "BMP")), _pixels(1)),
+    "palette_bmp": (lambda: _encode(_palette_image(), "BMP"), np.asarray(_palette_image().convert("RGB"))),
+    "pgm": (lambda: _encode(Image.fromarray(_pixels(1), mode="L"), "PPM"), _pixels(1)),
+    "ppm": (lambda: _encode(Image.fromarray(_pixels(3), mode="RGB"), "PPM"), _pixels(3)),
+}
+
+
+@pytest.mark.parametrize("name", sorted(IMAGES))
+def test_uncompressed_formats_decode_without_copy(name):
+    """BMP (bottom-up, top-down, padded rows, palette) and PNM maps decode to the original pixels."""
+    encode, expected = IMAGES[name]
+    raw = encode()
+    array = _decode_array(raw)
+    assert array is not None
+    np.testing.assert_array_equal(array, expected)
+    decoded_by_pil = Image.open(io.BytesIO(raw)).convert("L" if array.ndim == 2 else "RGB")
+    np.testing.assert_array_equal(array, np.asarray(decoded_by_pil))
+    if name != "palette_bmp":
+        # Zero-copy: the array is a view on the decompressed payload.
+        assert np.shares_memory(array, np.frombuffer(raw, np.uint8))
+
+
+def test_padded_bmp_rows():
+    """The padding at the end of each BMP row is skipped."""
+    raw = IMAGES["rgb_bmp"][0]()
+    (offset,) = struct.unpack_from("<I", raw, 10)
+    assert (len(raw) - offset) // HEIGHT == 16
+    assert _decode_array(raw).shape == (HEIGHT, WIDTH, 3)
+
+
+def test_other_formats_are_decoded_by_pil():
+    """A PNG map is decoded by PIL into a read-only array."""
+    cache = LidarMapCache()
+    array = cache.array(zlib.compress(_encode(Image.fromarray(_pixels(3), mode="RGB"), "PNG")))
+    np.testing.assert_array_equal(array, _pixels(3))
+    assert not array.flags.writeable
+
+
+def test_repeated_payload_returns_cached_map():
+    """An unchanged payload is neither decompressed nor decoded again."""
+    cache = LidarMapCache()
+    payload = zlib.compress(IMAGES["gray_bmp"][0]())
+    array = cache.array(payload)
+    assert cache.array(payload) is array
+    image = cache.image(payload)
+    assert cache.image(payload) is image
+    assert (cache.hits, cache.misses) == (3, 1)
+    assert not array.flags.writeable
+
+    other = zlib.compress(IMAGES["pgm"][0]())
+    assert cache.array(other) is not array
+    assert (cache.hits, cache.misses) == (3, 2)
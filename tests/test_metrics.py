@@ -0,0 +1,83 @@
+"""Tests of the RPC metrics recorded by the client interceptors."""
+import asyncio
+import json
+
+import grpc
+import pytest
+from google.protobuf.empty_pb2 import Empty
+
+from mobile_base_sdk import MobileBaseSDK
+from mobile_base_sdk.aio import AsyncMobileBaseSDK
+
+BATTERY = "MobileBaseUtilityService/GetBatteryLevel"
+
+
+def _check_metrics(metrics):
+    snapshot = metrics.snapshot()
+    battery = snapshot[BATTERY]
+    assert battery["count"] == 4
+    assert battery["errors"] == 1
+    assert battery["codes"] == {"OK": 3, "UNAVAILABLE": 1}
+    assert sum(count for _, count in battery["latency_buckets"]) == 4
+    assert battery["latency_buckets"][-1][0] == float("inf")
+    assert battery["latency_sum"] > 0.0
+    assert battery["request_bytes"] == 0
+    assert battery["response_bytes"] > 0
+
+    text = metrics.to_prometheus()
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert "# TYPE mobile_base_sdk_rpc_calls_total counter" in lines
+    assert "# TYPE mobile_base_sdk_rpc_latency_seconds histogram" in lines
+    assert f'mobile_base_sdk_rpc_calls_total{{method="{BATTERY}",code="OK"}} 3' in lines
+    assert f'mobile_base_sdk_rpc_calls_total{{method="{BATTERY}",code="UNAVAILABLE"}} 1' in lines
+    buckets = [line for line in lines if line.startswith(f'mobile_base_sdk_rpc_latency_seconds_bucket{{method="{BATTERY}"')]
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    # Histogram buckets are cumulative, the last one counting every call.
+    assert counts == sorted(counts)
+    assert buckets[-1] == f'mobile_base_sdk_rpc_latency_seconds_bucket{{method="{BATTERY}",le="+Inf"}} 4'
+    assert f'mobile_base_sdk_rpc_latency_seconds_count{{method="{BATTERY}"}} 4' in lines
+    for line in lines:
+        # Every sample line is "name{labels} value".
+        if not line.startswith("#"):
+            float(line.rsplit(" ", 1)[1])
+
+    exported = json.loads(metrics.to_json())
+    assert exported[BATTERY]["codes"] == {"OK": 3, "UNAVAILABLE": 1}
+    assert exported[BATTERY]["latency_buckets"][-1][0] == "+Inf"
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_interceptor_records_calls_and_errors(simulator):
+    """Successful and failed calls are counted per method and status code, and exported."""
+    with MobileBaseSDK(host="localhost", mobile_base_port=simulator.port, metrics=True) as mobile_base:
+        mobile_base.metrics.reset()
+        for _ in range(3):
+            mobile_base.battery_voltage
+        simulator.network.packet_loss = 1.0
+        with pytest.raises(grpc.RpcError):
+            mobile_base.battery_voltage
+        simulator.network.packet_loss = 0.0
+        # Futures are recorded too.
+        mobile_base._utility_stub.GetZuuuMode.future(Empty()).result()
+        assert mobile_base.metrics.snapshot()["MobileBaseUtilityService/GetZuuuMode"]["count"] == 1
+        _check_metrics(mobile_base.metrics)
+
+
+def test_async_interceptor_records_calls_and_errors(simulator):
+    """The grpc.aio interceptor records the same statistics."""
+
+    async def run():
+        async with AsyncMobileBaseSDK(host="localhost", mobile_base_port=simulator.port, metrics=True) as mobile_base:
+            mobile_base.metrics.reset()
+            for _ in range(3):
+                await mobile_base.battery_voltage()
+            simulator.network.packet_loss = 1.0
+            with pytest.raises(grpc.aio.AioRpcError):
+                await mobile_base.battery_voltage()
+            simulator.network.packet_loss = 0.0
+            _check_metrics(mobile_base.metrics)
+
+    asyncio.run(run())
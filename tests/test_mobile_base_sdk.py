@@ -0,0 +1,131 @@
+"""Tests of MobileBaseSDK against the simulator."""
+import threading
+import time
+
+import pytest
+from google.protobuf.wrappers_pb2 import FloatValue
+from reachy2_sdk_api import mobile_base_mobility_pb2 as mob_pb2
+
+from mobile_base_sdk import MobileBaseSDK
+from mobile_base_sdk.simulator import MobileBaseSimulator
+
+# SendGoTo was removed from recent versions of reachy2-sdk-api.
+requires_goto = pytest.mark.skipif(not hasattr(mob_pb2, "GoToVector"), reason="reachy2-sdk-api without SendGoTo")
+
+
+def test_state_matches_simulator(mobile_base, simulator):
+    """The state snapshot reflects the simulated base."""
+    simulator.model.battery_voltage = 24.8
+    state = mobile_base.state()
+    assert state.drive_mode == "brake"
+    assert state.battery_voltage == 24.8
+    assert state.odometry == {"x": 0.0, "y": 0.0, "theta": 0.0}
+    with pytest.raises(TypeError):
+        state.odometry["x"] = 1.0
+    assert state.obstacle_detection_status == "NO_OBJECT_DETECTED"
+
+
+def test_set_speed_moves_base(mobile_base):
+    """Velocity commands move the base along x."""
+    for _ in range(5):
+        mobile_base.set_speed(0.5, 0.0, 0.0)
+        time.sleep(0.05)
+    assert mobile_base.odometry["x"] > 0.05
+    assert mobile_base.modes.peek("drive_mode") == "cmd_vel"
+
+
+def test_turn_off_and_on(mobile_base, simulator):
+    """turn_off and turn_on switch the drive mode of the base."""
+    mobile_base.turn_off()
+    assert simulator.model.drive_mode == "FREE_WHEEL"
+    assert mobile_base.is_off()
+    mobile_base.turn_on()
+    assert simulator.model.drive_mode == "BRAKE"
+    assert mobile_base.is_on()
+
+
+def test_closed_loop_goto_arrives(mobile_base):
+    """The closed-loop goto reaches its goal within tolerance."""
+    result = mobile_base.goto_closed_loop(0.3, -0.2, 45.0)
+    assert result.status == "arrived"
+    odometry = mobile_base.odometry
+    assert abs(odometry["x"] - 0.3) <= 0.01
+    assert abs(odometry["y"] + 0.2) <= 0.01
+    assert abs(odometry["theta"] - 45.0) <= 1.0
+
+
+def test_closed_loop_goto_cancel_brakes(mobile_base, simulator):
+    """A cancelled goto stops the base."""
+    handle = mobile_base.goto_closed_loop(1.0, 0.0, 0.0, wait=False)
+    time.sleep(0.3)
+    assert handle.cancel()
+    result = handle.result(timeout=1.0)
+    assert result.status == "cancelled"
+    assert not result.arrived
+    deadline = time.monotonic() + 1.0
+    while simulator.model.drive_mode != "BRAKE" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert simulator.model.drive_mode == "BRAKE"
+
+
+def test_closed_loop_goto_preempted(mobile_base):
+    """A new goto preempts the running one, which does not stop the base."""
+    first = mobile_base.goto_closed_loop(1.0, 0.0, 0.0, wait=False)
+    time.sleep(0.2)
+    second = mobile_base.goto_closed_loop(0.2, 0.0, 0.0)
+    assert first.result(timeout=1.0).status == "preempted"
+    assert second.status == "arrived"
+
+
+@requires_goto
+def test_goto_cancel_brakes(mobile_base, simulator):
+    """A cancelled goto stops the base."""
+    handle = mobile_base.goto(0.8, 0.0, 0.0, wait=False)
+    time.sleep(0.3)
+    assert handle.cancel()
+    assert handle.result(timeout=1.0).status == "cancelled"
+    deadline = time.monotonic() + 1.0
+    while simulator.model.drive_mode != "BRAKE" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert simulator.model.drive_mode == "BRAKE"
+
+
+@requires_goto
+def test_goto_preempted(mobile_base):
+    """A new goto preempts the running one."""
+    first = mobile_base.goto(0.8, 0.0, 0.0, wait=False)
+    time.sleep(0.2)
+    second = mobile_base.goto(0.2, 0.0, 0.0)
+    assert first.result(timeout=1.0).status == "preempted"
+    assert second.arrived
+
+
+def test_blocked_goto_handle_reports_distances_like_a_sent_one():
+    """The handle of a goto blocked by the governor converts distances as the handle of a sent goto."""
+    with MobileBaseSimulator(obstacles=[(0.6, 0.0, 0.2)]) as simulator:
+        with MobileBaseSDK(host="localhost", mobile_base_port=simulator.port) as mobile_base:
+            mobile_base.enable_governor()
+            handle = mobile_base.goto(1.0, 0.0, 0.0, wait=False)
+            assert handle.result(timeout=1.0).status == "obstacle"
+            assert simulator.model.drive_mode == "BRAKE"
+
+    response = mob_pb2.DistanceToGoalVector(
+        delta_x=FloatValue(value=0.5), delta_y=FloatValue(value=-0.25), delta_theta=FloatValue(value=0.5),
+        distance=FloatValue(value=0.559),
+    )
+    handle._report_raw_progress(response)
+    assert handle.last_distance == {"delta_x": 0.5, "delta_y": -0.25, "delta_theta": 28.648, "distance": 0.559}
+
+
+def test_close_stops_background_threads(simulator):
+    """Closing the SDK stops every thread it started, including a running motion."""
+    before = set(threading.enumerate())
+    mobile_base = MobileBaseSDK(host="localhost", mobile_base_port=simulator.port)
+    mobile_base.start_telemetry()
+    mobile_base.start_velocity_stream()
+    handle = mobile_base.goto_closed_loop(1.0, 0.0, 0.0, wait=False)
+    time.sleep(0.2)
+    mobile_base.close()
+    assert handle.status == "cancelled"
+    started = {thread.name for thread in set(threading.enumerate()) - before}
+    assert not {name for name in started if name.startswith("mobile-base")}
@@ -0,0 +1,136 @@
+"""Tests of the drive and control mode cache."""
+import threading
+import time
+
+import pytest
+
+from mobile_base_sdk import modes
+from mobile_base_sdk.modes import ModeCache
+
+
+class _FakeClock:
+    """Stand-in for the time module, advanced by the tests."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class _Base:
+    """Fake base whose modes are fetched by the cache, counting the fetches."""
+
+    def __init__(self) -> None:
+        self.drive_mode = "brake"
+        self.fetches = 0
+
+    def get_drive_mode(self) -> str:
+        self.fetches += 1
+        return self.drive_mode
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the clock of the modes module."""
+    clock = _FakeClock()
+    monkeypatch.setattr(modes, "time", clock)
+    return clock
+
+
+def test_get_fetches_after_ttl(clock):
+    """A cached mode is used until it is older than the ttl, or than max_age."""
+    base = _Base()
+    cache = ModeCache(fetchers={"drive_mode": base.get_drive_mode}, ttl=2.0)
+    assert cache.peek("drive_mode") is None
+    assert cache.age("drive_mode") == float("inf")
+    assert cache.get("drive_mode") == "brake"
+    base.drive_mode = "cmd_vel"
+    clock.advance(1.5)
+    assert cache.get("drive_mode") == "brake"
+    assert cache.age("drive_mode") == pytest.approx(1.5)
+    assert cache.get("drive_mode", max_age=1.0) == "cmd_vel"
+    clock.advance(2.5)
+    assert cache.get("drive_mode") == "cmd_vel"
+    assert base.fetches == 3
+
+
+def test_set_and_invalidate(clock):
+    """A set mode is used without fetching, an invalidated or unknown one is fetched."""
+    base = _Base()
+    cache = ModeCache(fetchers={"drive_mode": base.get_drive_mode})
+    cache.set("drive_mode", "free_wheel")
+    assert cache.get("drive_mode") == "free_wheel"
+    assert base.fetches == 0
+    cache.invalidate()
+    assert cache.get("drive_mode") == "brake"
+    cache.set("drive_mode", None)
+    assert cache.peek("drive_mode") is None
+    assert cache.get("drive_mode") == "brake"
+    assert base.fetches == 2
+
+
+def test_refresh_does_not_overwrite_newer_set(clock):
+    """A mode set while a fetch was in flight is kept over the fetched one."""
+
+    def slow_fetch():
+        clock.advance(0.1)
+        cache.set("drive_mode", "goto")
+        clock.advance(0.1)
+        return "brake"
+
+    cache = ModeCache(fetchers={"drive_mode": slow_fetch})
+    assert cache.refresh("drive_mode") == "goto"
+    assert cache.peek("drive_mode") == "goto"
+
+
+def test_callbacks_on_change(clock):
+    """Callbacks are called on each change, not when the mode is unchanged, and may fail."""
+    base = _Base()
+    cache = ModeCache(fetchers={"drive_mode": base.get_drive_mode})
+    changes = []
+
+    def failing(name, previous, mode):
+        raise RuntimeError("Simulated failure.")
+
+    cache.add_callback(failing)
+    cache.add_callback(lambda name, previous, mode: changes.append((name, previous, mode)))
+    cache.refresh("drive_mode")
+    cache.refresh("drive_mode")
+    cache.set("drive_mode", "cmd_vel")
+    cache.set("drive_mode", None)
+    cache.refresh("drive_mode")
+    assert changes == [("drive_mode", None, "brake"), ("drive_mode", "brake", "cmd_vel"), ("drive_mode", None, "brake")]
+
+    cache.remove_callback(failing)
+    cache.set("drive_mode", "goto")
+    assert changes[-1] == ("drive_mode", "brake", "goto")
+
+
+def test_background_refresh_notices_other_clients():
+    """The background refresh notices a mode changed by another client."""
+    base = _Base()
+    cache = ModeCache(fetchers={"drive_mode": base.get_drive_mode})
+    changed = threading.Event()
+    cache.add_callback(lambda name, previous, mode: mode == "free_wheel" and changed.set())
+    cache.start(rate_hz=50.0)
+    try:
+        assert cache.is_running
+        time.sleep(0.05)
+        base.drive_mode = "free_wheel"
+        assert changed.wait(1.0)
+        assert cache.peek("drive_mode") == "free_wheel"
+    finally:
+        cache.stop()
+    assert not cache.is_running
+
+
+def test_invalid_settings():
+    """The ttl should be positive and the refresh rate strictly positive."""
+    with pytest.raises(ValueError):
+        ModeCache(fetchers={}, ttl=-1.0)
+    with pytest.raises(ValueError):
+        ModeCache(fetchers={}).start(rate_hz=0.0)
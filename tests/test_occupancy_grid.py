@@ -0,0 +1,124 @@
+"""Tests of the occupancy grid built from the lidar map."""
+import numpy as np
+import pytest
+
+from mobile_base_sdk.occupancy_grid import OccupancyGrid
+
+RESOLUTION = 0.1
+
+
+def _brute_force_distance(occupied, max_distance):
+    rows, cols = np.nonzero(occupied)
+    grid_rows, grid_cols = np.mgrid[:occupied.shape[0], :occupied.shape[1]]
+    distance = np.full(occupied.shape, np.inf)
+    for row, col in zip(rows, cols):
+        distance = np.minimum(distance, np.hypot(grid_rows - row, grid_cols - col) * RESOLUTION)
+    return np.minimum(distance, max_distance)
+
+
+def _brute_force_polar_ranges(grid):
+    ranges = np.full(360, np.inf)
+    for row, col in zip(*np.nonzero(grid.occupied)):
+        x, y = (10 - row) * RESOLUTION, (10 - col) * RESOLUTION
+        heading_bin = int(np.floor(np.rad2deg(np.arctan2(y, x)) + 180.0)) % 360
+        ranges[heading_bin] = min(ranges[heading_bin], np.hypot(x, y))
+    return ranges
+
+
+def _obstacle_ahead():
+    # 21x21 grid with the robot in the middle and a single obstacle 0.5m ahead.
+    occupied = np.zeros((21, 21), dtype=bool)
+    occupied[5, 10] = True
+    return occupied
+
+
+def test_distances_of_single_obstacle():
+    """Distances are euclidean from the obstacle, and truncated at max_distance."""
+    grid = OccupancyGrid(_obstacle_ahead(), RESOLUTION, max_distance=1.0)
+    distance = grid.distance([(0.0, 0.0), (0.5, 0.0), (0.5, 0.3), (0.8, 0.4), (-0.9, -0.9), (5.0, 5.0)])
+    np.testing.assert_allclose(distance, [0.5, 0.0, 0.3, 0.5, 1.0, 1.0])
+
+
+def test_distance_map_matches_brute_force():
+    """The distance transform of a random grid is exact up to the truncation."""
+    occupied = np.random.default_rng(0).random((21, 21)) > 0.97
+    grid = OccupancyGrid(occupied, RESOLUTION, max_distance=0.6)
+    np.testing.assert_allclose(grid.distance_map, _brute_force_distance(occupied, 0.6))
+
+
+def test_raycast_hits_wall():
+    """Rays stop at the first obstacle and return max_range when they hit nothing."""
+    occupied = np.zeros((21, 21), dtype=bool)
+    # Wall 0.5m ahead of the robot, across the whole grid.
+    occupied[5, :] = True
+    grid = OccupancyGrid(occupied, RESOLUTION)
+    ranges = grid.raycast([0.0, 45.0, -45.0, 90.0, 180.0], max_range=0.9)
+    np.testing.assert_allclose(ranges, [0.5, 0.5 * np.sqrt(2), 0.5 * np.sqrt(2), 0.9, 0.9], atol=RESOLUTION)
+    # A ray from another origin is cast from there.
+    np.testing.assert_allclose(grid.raycast([0.0], origins=[(0.2, 0.3)]), [0.3], atol=RESOLUTION)
+
+
+def test_segments_free():
+    """Segments are free only if they stay farther than the clearance from obstacles."""
+    grid = OccupancyGrid(_obstacle_ahead(), RESOLUTION)
+    assert not grid.goto_free(0.8, 0.0)
+    assert grid.goto_free(0.0, 0.8)
+    assert grid.goto_free(0.4, 0.0, clearance=0.05)
+    assert not grid.goto_free(0.4, 0.0, clearance=0.15)
+    np.testing.assert_array_equal(grid.segments_free([(0.0, 0.0), (0.0, 0.0)], [(0.8, 0.0), (-0.8, 0.0)]), [False, True])
+
+
+@pytest.mark.parametrize("change", ["add", "remove", "move"])
+def test_update_matches_new_grid(change):
+    """An incremental update gives the same distances and polar ranges as a grid built from scratch."""
+    rng = np.random.default_rng(1)
+    occupied = rng.random((21, 21)) > 0.95
+    grid = OccupancyGrid(occupied, RESOLUTION, max_distance=0.5)
+
+    new = occupied.copy()
+    if change in ("add", "move"):
+        new[15:17, 2:4] = True
+    if change in ("remove", "move"):
+        new[np.nonzero(occupied)[0][0], np.nonzero(occupied)[1][0]] = False
+    assert grid.update(occupied=new)
+
+    fresh = OccupancyGrid(new, RESOLUTION, max_distance=0.5)
+    np.testing.assert_allclose(grid.distance_map, fresh.distance_map)
+    np.testing.assert_array_equal(grid.polar_ranges, fresh.polar_ranges)
+    np.testing.assert_allclose(grid.polar_ranges, _brute_force_polar_ranges(grid))
+    assert not grid.update(occupied=new)
+
+
+def test_update_frees_nearest_obstacle_of_bin():
+    """Removing the nearest obstacle of a bin exposes the next one behind it."""
+    occupied = _obstacle_ahead()
+    occupied[2, 10] = True
+    grid = OccupancyGrid(occupied, RESOLUTION)
+    assert grid.polar_range([0.0])[0] == pytest.approx(0.5)
+    occupied = occupied.copy()
+    occupied[5, 10] = False
+    grid.update(occupied=occupied)
+    assert grid.polar_range([0.0])[0] == pytest.approx(0.8)
+    occupied = occupied.copy()
+    occupied[2, 10] = False
+    grid.update(occupied=occupied)
+    assert np.isinf(grid.polar_ranges).all()
+
+
+def test_free_sectors():
+    """The only sector blocked by a single obstacle is the one holding it."""
+    grid = OccupancyGrid(_obstacle_ahead(), RESOLUTION)
+    # The obstacle is in the [0, 1) degree bin, the free sector wraps around from 1 to 0 degree.
+    assert grid.free_sectors(1.0) == [(1.0, 0.0)]
+    assert grid.free_sectors(0.4) == [(-180.0, 180.0)]
+    assert OccupancyGrid(np.zeros((5, 5), dtype=bool), RESOLUTION).free_sectors(0.1) == [(-180.0, 180.0)]
+
+
+def test_from_map_thresholds_pixels():
+    """Bright pixels are obstacles, or dark ones with obstacles_are_dark."""
+    pixels = np.zeros((5, 5), dtype=np.uint8)
+    pixels[0, 2] = 255
+    np.testing.assert_array_equal(OccupancyGrid.from_map(pixels, RESOLUTION).occupied, pixels > 127)
+    np.testing.assert_array_equal(
+        OccupancyGrid.from_map(255 - pixels, RESOLUTION, obstacles_are_dark=True).occupied, pixels > 127
+    )
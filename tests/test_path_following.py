@@ -0,0 +1,42 @@
+"""Tests of the path planning."""
+import numpy as np
+import pytest
+
+from mobile_base_sdk import MobileBaseSDK
+from mobile_base_sdk.path_following import plan_path
+from mobile_base_sdk.simulator import MobileBaseSimulator
+
+
+def test_mixed_waypoints_keep_previous_orientation():
+    """An (x, y) waypoint keeps the orientation of the previous waypoint."""
+    trajectory = plan_path((0.0, 0.0, 0.0), [(0.5, 0.0, 90.0), (0.5, 0.5)], max_xy_vel=0.5, max_xy_acc=0.5, max_rot_vel=90.0)
+    assert trajectory.x[-1] == pytest.approx(0.5)
+    assert trajectory.y[-1] == pytest.approx(0.5)
+    assert trajectory.theta[-1] == pytest.approx(90.0)
+
+
+def test_xy_array_keeps_start_orientation():
+    """An (N, 2) array of waypoints keeps the orientation of the start."""
+    trajectory = plan_path((0.0, 0.0, 30.0), np.array([[0.5, 0.0], [0.5, 0.5]]), 0.5, 0.5, 90.0)
+    assert np.allclose(trajectory.theta, 30.0)
+
+
+@pytest.mark.parametrize("waypoints", [[(0.5, 0.0, 0.0, 1.0)], [(0.5,)], [(0.5, 0.0), (1.0,)]])
+def test_invalid_waypoints(waypoints):
+    """Waypoints that are neither (x, y, theta) nor (x, y) are rejected."""
+    with pytest.raises(ValueError, match="Waypoints should be"):
+        plan_path((0.0, 0.0, 0.0), waypoints, 0.5, 0.5, 90.0)
+
+
+def test_path_blocked_by_obstacle():
+    """A path blocked by an obstacle is reported as soon as the base stops, without waiting for the timeout."""
+    with MobileBaseSimulator(obstacles=[(1.2, 0.0, 0.1)]) as simulator:
+        with MobileBaseSDK(host="localhost", mobile_base_port=simulator.port) as mobile_base:
+            tracer = mobile_base.start_tracing()
+            result = mobile_base.follow_path([(1.0, 0.0), (2.0, 0.0)], max_xy_vel=0.5, settle_timeout=5.0)
+    assert result.status == "obstacle"
+    assert not result.arrived
+    assert result.duration < 5.0
+    span = next(span for span in tracer.spans() if span.name == "follow_path")
+    assert span.attributes["status"] == "obstacle"
+    assert any(span.name == "goto.obstacle_check" for span in tracer.spans())
@@ -0,0 +1,39 @@
+"""Tests of the pose estimator."""
+import time
+
+import numpy as np
+import pytest
+
+from mobile_base_sdk import PoseEstimator
+
+
+@pytest.mark.parametrize("sampled", [3, 4, 6])
+def test_samples_at_and_after_capacity(mobile_base, sampled):
+    """The last capacity samples are held, including when exactly capacity samples were taken."""
+    estimator = PoseEstimator(mobile_base, capacity=4)
+    for _ in range(sampled):
+        estimator.update()
+        time.sleep(0.001)
+    samples = estimator.samples()
+    assert len(estimator) == len(samples) == min(sampled, 4)
+    assert np.all(np.diff(samples[:, 0]) > 0)
+    assert estimator.pose == {"x": 0.0, "y": 0.0, "theta": 0.0}
+
+
+def test_interpolates_between_samples(mobile_base):
+    """Poses between two samples follow the motion joining them."""
+    estimator = PoseEstimator(mobile_base, capacity=2)
+    estimator.add_sample(100.0, 0.0, 0.0, 0.0)
+    estimator.add_sample(101.0, 1.0, 0.0, 0.0)
+    estimator.add_sample(102.0, 2.0, 0.0, 90.0)
+    assert estimator.pose_at(101.0) == pytest.approx({"x": 1.0, "y": 0.0, "theta": 0.0})
+    poses = estimator.pose_at(np.array([100.5, 101.5]))
+    assert poses[0] == pytest.approx([1.0, 0.0, 0.0])
+    assert poses[1, 2] == pytest.approx(45.0)
+
+
+def test_closed_loop_goto_with_wrapped_estimator(mobile_base):
+    """The closed-loop goto keeps working once the estimator buffer has wrapped around."""
+    with PoseEstimator(mobile_base, rate_hz=50.0, capacity=8) as estimator:
+        result = mobile_base.goto_closed_loop(0.2, 0.1, 20.0, pose_estimator=estimator)
+    assert result.status == "arrived"
@@ -0,0 +1,34 @@
+"""Tests of the odometry recorder."""
+import numpy as np
+import pytest
+
+from mobile_base_sdk.recorder import OdometryRecorder
+
+
+@pytest.mark.parametrize("recorded", [4, 5, 7])
+def test_samples_at_and_after_capacity(mobile_base, recorded):
+    """The last capacity samples are held, including when exactly capacity samples were recorded."""
+    recorder = OdometryRecorder(mobile_base, capacity=5)
+    for _ in range(recorded):
+        recorder.record()
+
+    samples = recorder.samples()
+    assert len(recorder) == len(samples) == min(recorded, 5)
+    assert recorder.total_samples == recorded
+    assert np.all(np.diff(samples["timestamp"]) > 0)
+    assert len(recorder.latest(2)) == 2
+    assert recorder.latest()[0] == samples[-1]
+    assert len(recorder.window(start=samples["timestamp"][1])) == len(samples) - 1
+    assert samples["drive_mode"][-1] == "brake"
+
+
+def test_log_file(mobile_base, tmp_path):
+    """Samples are also written to the log file, read back with load."""
+    path = str(tmp_path / "odometry.npy")
+    recorder = OdometryRecorder(mobile_base, capacity=2, log_path=path, log_capacity=10)
+    for _ in range(3):
+        recorder.record()
+    recorder.stop()
+    log = OdometryRecorder.load(path)
+    assert len(log) == 3
+    assert np.array_equal(log[1:], recorder.samples())
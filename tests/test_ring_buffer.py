@@ -0,0 +1,45 @@
+"""Tests of the ring buffer."""
+import numpy as np
+import pytest
+
+from mobile_base_sdk.ring_buffer import RingBuffer
+
+
+@pytest.mark.parametrize("appended", [0, 1, 3, 4, 5, 8, 11])
+def test_rows_oldest_first(appended):
+    """The last capacity rows are returned oldest first, before, at and after capacity."""
+    buffer = RingBuffer(4, shape=(2,))
+    for i in range(appended):
+        buffer.append((i, -i))
+    expected = np.array([(i, -i) for i in range(max(appended - 4, 0), appended)], dtype=float).reshape(-1, 2)
+    assert len(buffer) == min(appended, 4)
+    assert buffer.total == appended
+    assert np.array_equal(buffer.to_array(), expected)
+    if appended:
+        assert np.array_equal(buffer.last(), expected[-1])
+    else:
+        assert buffer.last() is None
+
+
+def test_structured_rows():
+    """Rows can be records of a structured dtype."""
+    buffer = RingBuffer(2, dtype=np.dtype([("t", "f8"), ("mode", "U8")]))
+    buffer.append((1.0, "brake"))
+    buffer.append((2.0, "cmd_vel"))
+    assert list(buffer.to_array()["mode"]) == ["brake", "cmd_vel"]
+
+
+def test_to_array_is_a_copy():
+    """Rows returned are not overwritten by later appends."""
+    buffer = RingBuffer(2)
+    buffer.append(1.0)
+    buffer.append(2.0)
+    rows = buffer.to_array()
+    buffer.append(3.0)
+    assert list(rows) == [1.0, 2.0]
+
+
+def test_invalid_capacity():
+    """The capacity should be strictly positive."""
+    with pytest.raises(ValueError):
+        RingBuffer(0)
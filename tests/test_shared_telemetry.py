@@ -0,0 +1,77 @@
+"""Tests of the shared-memory telemetry."""
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+from reachy2_sdk_api.mobile_base_lidar_pb2 import LidarObstacleDetectionEnum
+from reachy2_sdk_api.mobile_base_utility_pb2 import ControlModePossiblities, ZuuuModePossiblities
+
+from mobile_base_sdk.shared_telemetry import SharedTelemetry, TelemetryPublisher
+
+
+@pytest.fixture
+def shared(mobile_base):
+    """Publish the telemetry of the SDK and attach a reader to it."""
+    name = f"mobile_base_test_{os.getpid()}"
+    with TelemetryPublisher(mobile_base, name=name, map_rate_hz=20.0) as publisher:
+        with SharedTelemetry(name) as telemetry:
+            yield publisher, telemetry
+
+
+def _wait_for(read, expected, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while read() != expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return read()
+
+
+@pytest.mark.parametrize("status", LidarObstacleDetectionEnum.keys())
+def test_obstacle_detection_status_round_trip(simulator, shared, status):
+    """Every obstacle detection status is read back as published."""
+    _, telemetry = shared
+    simulator.model.forced_obstacle_detection_status = status
+    assert _wait_for(lambda: telemetry.lidar.obstacle_detection_status, status) == status
+
+
+@pytest.mark.parametrize("mode", ZuuuModePossiblities.keys()[1:])
+def test_drive_mode_round_trip(simulator, shared, mode):
+    """Every drive mode is read back as published."""
+    _, telemetry = shared
+    simulator.model.set_drive_mode(mode)
+    assert _wait_for(lambda: telemetry.drive_mode, mode.lower()) == mode.lower()
+
+
+@pytest.mark.parametrize("mode", ControlModePossiblities.keys()[1:])
+def test_control_mode_round_trip(simulator, shared, mode):
+    """Every control mode is read back as published."""
+    _, telemetry = shared
+    simulator.model.control_mode = mode
+    assert _wait_for(lambda: telemetry.control_mode, mode.lower()) == mode.lower()
+
+
+def test_values_match_sdk(mobile_base, shared):
+    """Odometry, battery, safety values and map match the ones of the SDK."""
+    _, telemetry = shared
+    mobile_base.set_speed(0.3, 0.0, 0.0)
+    time.sleep(0.3)
+    assert telemetry.odometry["x"] > 0.0
+    assert telemetry.battery_voltage == mobile_base.battery_voltage
+    assert telemetry.lidar.safety_enabled is True
+    assert telemetry.lidar.safety_critical_distance == pytest.approx(0.55)
+    assert np.array_equal(telemetry.lidar.get_map_array(), mobile_base.lidar.get_map_array())
+    assert telemetry.age < 0.5
+
+
+def test_reader_in_another_process(shared):
+    """A reader process attaches to the block by name."""
+    publisher, _ = shared
+    code = (
+        "from mobile_base_sdk.shared_telemetry import SharedTelemetry\n"
+        f"with SharedTelemetry({publisher.name!r}) as telemetry:\n"
+        "    print(telemetry.drive_mode, telemetry.lidar.obstacle_detection_status)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    assert output.split() == ["brake", "NO_OBJECT_DETECTED"]
@@ -0,0 +1,110 @@
+"""Tests of the telemetry cache."""
+import time
+
+import pytest
+
+from mobile_base_sdk import telemetry
+from mobile_base_sdk.telemetry import TelemetryCache
+
+
+class _FakeClock:
+    """Stand-in for the time module, advanced by the tests."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class _Counter:
+    """Fetch function returning the number of times it was called."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self) -> int:
+        self.calls += 1
+        return self.calls
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the clock of the telemetry module."""
+    clock = _FakeClock()
+    monkeypatch.setattr(telemetry, "time", clock)
+    return clock
+
+
+def test_read_uses_cache_until_stale(clock):
+    """A value is read from the cache up to three polling periods old, then fetched again."""
+    fetch = _Counter()
+    cache = TelemetryCache(fetchers={"odometry": fetch}, rates={"odometry": 10.0})
+    assert cache.get("odometry") is None
+    assert cache.read("odometry") == 1
+    clock.advance(0.25)
+    assert cache.read("odometry") == 1
+    assert cache.get("odometry").age == pytest.approx(0.25)
+    clock.advance(0.1)
+    assert cache.read("odometry") == 2
+    assert fetch.calls == 2
+
+
+def test_max_staleness_overrides_default(clock):
+    """An explicit max staleness replaces the three polling periods."""
+    fetch = _Counter()
+    cache = TelemetryCache(fetchers={"battery_voltage": fetch}, rates={"battery_voltage": 10.0}, max_staleness=1.0)
+    cache.read("battery_voltage")
+    clock.advance(0.9)
+    assert cache.read("battery_voltage") == 1
+    clock.advance(0.2)
+    assert cache.read("battery_voltage") == 2
+
+
+def test_unpolled_signal_is_always_fetched(clock):
+    """A signal without polling rate is fetched on each read and never cached."""
+    battery = _Counter()
+    cache = TelemetryCache(fetchers={"odometry": _Counter(), "battery_voltage": battery}, rates={"odometry": 10.0})
+    assert cache.signals == ["odometry"]
+    assert [cache.read("battery_voltage") for _ in range(3)] == [1, 2, 3]
+    assert cache.get("battery_voltage") is None
+
+
+def test_background_polling_at_each_rate():
+    """Each signal is polled at its own rate, and a failing fetch does not stop the polling."""
+    fast, slow = _Counter(), _Counter()
+
+    def failing():
+        raise RuntimeError("Simulated failure.")
+
+    cache = TelemetryCache(
+        fetchers={"fast": fast, "slow": slow, "failing": failing}, rates={"fast": 100.0, "slow": 5.0, "failing": 50.0}
+    )
+    cache.start()
+    time.sleep(0.5)
+    assert cache.is_running
+    cache.stop()
+    assert not cache.is_running
+    assert 20 <= fast.calls <= 60
+    assert 2 <= slow.calls <= 4
+    assert cache.get("fast").value == fast.calls
+    assert cache.get("failing") is None
+    # Values are kept once stopped.
+    calls = fast.calls
+    assert cache.read("fast") == calls
+
+
+@pytest.mark.parametrize(
+    "rates",
+    [{}, {"unknown": 1.0}, {"odometry": 0.0}],
+)
+def test_invalid_rates(rates):
+    """Polling rates should name known signals and be strictly positive."""
+    with pytest.raises(ValueError):
+        TelemetryCache(fetchers={"odometry": _Counter()}, rates=rates)
@@ -0,0 +1,113 @@
+"""Tests of the teleoperation engine."""
+import threading
+import time
+
+import pytest
+
+from mobile_base_sdk import MobileBaseSDK
+from mobile_base_sdk.teleop import AxisMapping, TeleopEngine, TeleopMapping
+
+MAPPING = TeleopMapping(
+    x_vel=AxisMapping(axis=1, scale=-0.5),
+    y_vel=AxisMapping(axis=0, scale=-0.5, deadzone=0.0),
+    rot_vel=AxisMapping(axis=3, scale=-90.0, deadzone=0.2),
+)
+
+
+class _Base:
+    """Fake SDK recording the velocity commands sent by the engine."""
+
+    def __init__(self) -> None:
+        self._drive_mode = "brake"
+        self._max_xy_vel = 0.6
+        self._max_rot_vel = 180.0
+        self._velocity_stream = None
+        self.commands = []
+        self._lock = threading.Lock()
+
+    def stop_velocity_stream(self) -> None:
+        self._velocity_stream = None
+
+    def _set_drive_mode(self, mode: str) -> None:
+        self._drive_mode = mode
+
+    def _send_direction(self, x_vel: float, y_vel: float, rot_vel: float) -> None:
+        with self._lock:
+            self.commands.append((x_vel, y_vel, rot_vel))
+
+    def last(self):
+        with self._lock:
+            return self.commands[-1] if self.commands else None
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(0.0, 0.0), (0.1, 0.0), (-0.1, 0.0), (0.55, 0.25), (-1.0, -0.5), (1.5, 0.5)],
+)
+def test_axis_deadzone_and_scale(value, expected):
+    """Values within the deadzone give no velocity, the others are rescaled from its edge and saturated."""
+    assert AxisMapping(axis=0, scale=0.5).apply([value]) == pytest.approx(expected)
+
+
+def test_mapping_velocity():
+    """Each velocity reads its own axis, a missing axis gives no velocity and the deadman button is required."""
+    assert MAPPING.velocity([0.5, -1.0, 0.0, 0.6], []) == pytest.approx((0.5, -0.25, -45.0))
+    assert MAPPING.velocity([0.0, -1.0], []) == pytest.approx((0.5, 0.0, 0.0))
+    with_deadman = MAPPING._replace(deadman_button=2)
+    assert with_deadman.velocity([0.0, -1.0], [True, True]) == (0.0, 0.0, 0.0)
+    assert with_deadman.velocity([0.0, -1.0], [False, False, True]) == pytest.approx((0.5, 0.0, 0.0))
+
+
+def test_input_timeout_stops_base():
+    """Without input for input_timeout seconds, a null velocity is sent until inputs come back."""
+    base = _Base()
+    with TeleopEngine(base, mapping=MAPPING, output_rate_hz=50.0, input_timeout=0.1) as engine:
+        assert base._drive_mode == "cmd_vel"
+        # Velocities are clipped to the limits of the base.
+        engine.push_input([0.0, -1.0, 0.0, 1.0], [])
+        assert _wait_for(lambda: base.last() == (0.5, 0.0, -90.0))
+        assert _wait_for(lambda: base.last() == (0.0, 0.0, 0.0))
+        assert engine.stats().timeouts >= 1
+        engine.push_input([0.0, 1.0, 0.0, 0.0], [])
+        assert _wait_for(lambda: base.last() == (-0.5, 0.0, 0.0))
+    assert base.last() == (0.0, 0.0, 0.0)
+    assert base._velocity_stream is None
+
+
+def test_failing_controller_stops_base():
+    """A controller that cannot be read anymore stops the base once the input timeout expires."""
+    base = _Base()
+    failing = threading.Event()
+
+    def read_input():
+        if failing.is_set():
+            raise OSError("Controller disconnected.")
+        return [0.0, -1.0, 0.0, 0.0], []
+
+    with TeleopEngine(base, mapping=MAPPING, read_input=read_input, output_rate_hz=50.0, input_timeout=0.1) as engine:
+        assert _wait_for(lambda: base.last() == (0.5, 0.0, 0.0))
+        failing.set()
+        assert _wait_for(lambda: base.last() == (0.0, 0.0, 0.0))
+        assert engine.stats().input_errors >= 1
+    assert engine.stats().inputs >= engine.stats().input_errors
+
+
+def test_closing_sdk_stops_teleop(simulator):
+    """Closing the SDK stops the stream and the input thread of a running engine."""
+    mobile_base = MobileBaseSDK(host="localhost", mobile_base_port=simulator.port)
+    engine = TeleopEngine(mobile_base, mapping=MAPPING, read_input=lambda: ([0.0, -0.5, 0.0, 0.0], []))
+    engine.start()
+    assert mobile_base._velocity_stream is engine._stream
+    assert _wait_for(lambda: simulator.model.drive_mode == "CMD_VEL" and simulator.model.x > 0.0)
+    mobile_base.close()
+    assert not engine.is_running
+    assert _wait_for(lambda: not engine._thread.is_alive())
+    # Stopping the engine afterwards sends nothing on the closed channel.
+    engine.stop()
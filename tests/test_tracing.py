@@ -0,0 +1,119 @@
+"""Tests of the tracing of the SDK's operations and of its exports."""
+import json
+import threading
+
+import pytest
+
+from mobile_base_sdk.tracing import NULL_TRACER, Tracer
+
+
+def _traced_operation(tracer):
+    with tracer.span("operation", x=0.5) as root:
+        with tracer.span("phase", step=1):
+            pass
+        with pytest.raises(ValueError):
+            with tracer.span("failing", ok=False):
+                raise ValueError("bad value")
+        root.set_attribute("status", "done")
+
+
+def test_spans_are_nested():
+    """Spans started in a span are its children, in the same trace, and record their errors."""
+    tracer = Tracer()
+    _traced_operation(tracer)
+    phase, failing, root = tracer.spans()
+    assert (root.name, phase.name, failing.name) == ("operation", "phase", "failing")
+    assert root.parent_id == 0
+    assert phase.parent_id == failing.parent_id == root.span_id
+    assert phase.trace_id == failing.trace_id == root.trace_id
+    assert root.attributes == {"x": 0.5, "status": "done"}
+    assert failing.error == "ValueError: bad value"
+    assert root.error is None
+    assert root.start_ns <= phase.start_ns <= phase.end_ns <= failing.start_ns <= failing.end_ns <= root.end_ns
+
+    # A span started in another thread is attached to the given parent.
+    def worker():
+        with tracer.span("worker", parent=parent):
+            pass
+
+    with tracer.span("goto") as parent:
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    worker_span = tracer.spans()[-2]
+    assert worker_span.name == "worker"
+    assert worker_span.parent_id == parent.span_id and worker_span.trace_id == parent.trace_id
+
+
+def test_capacity_and_null_tracer():
+    """Only the last capacity spans are kept, and the null tracer records nothing."""
+    tracer = Tracer(capacity=2)
+    for name in "abc":
+        with tracer.span(name):
+            pass
+    assert [span.name for span in tracer.spans()] == ["b", "c"]
+    tracer.clear()
+    assert tracer.spans() == []
+    with NULL_TRACER.span("ignored", x=1) as span:
+        span.set_attribute("y", 2)
+    with pytest.raises(ValueError):
+        Tracer(capacity=0)
+
+
+def test_chrome_trace_export(tmp_path):
+    """Spans are exported as complete events in microseconds, with their attributes and errors."""
+    tracer = Tracer()
+    _traced_operation(tracer)
+    path = tmp_path / "trace.json"
+    tracer.save_chrome_trace(str(path))
+    trace = json.loads(path.read_text())
+    assert trace["displayTimeUnit"] == "ms"
+    events = {event["name"]: event for event in trace["traceEvents"]}
+    assert set(events) == {"operation", "phase", "failing"}
+    for event, span in zip(trace["traceEvents"], tracer.spans()):
+        assert event["ph"] == "X"
+        assert event["ts"] == span.start_ns / 1e3
+        assert event["dur"] == (span.end_ns - span.start_ns) / 1e3
+        assert event["tid"] == span.thread_id
+    assert events["operation"]["args"] == {"x": 0.5, "status": "done"}
+    assert events["failing"]["args"] == {"ok": False, "error": "ValueError: bad value"}
+
+
+def test_otlp_export(tmp_path):
+    """Spans are exported as an OTLP/JSON request, with hex ids, parent links, typed attributes and status."""
+    tracer = Tracer(service_name="robot_1")
+    _traced_operation(tracer)
+    path = tmp_path / "trace.otlp.json"
+    tracer.save_otlp(str(path))
+    request = json.loads(path.read_text())
+    resource_spans = request["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "robot_1"}}]
+    spans = {span["name"]: span for span in resource_spans["scopeSpans"][0]["spans"]}
+    root, phase, failing = spans["operation"], spans["phase"], spans["failing"]
+
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert "parentSpanId" not in root
+    assert phase["parentSpanId"] == root["spanId"] and phase["traceId"] == root["traceId"]
+    assert int(root["startTimeUnixNano"]) <= int(phase["startTimeUnixNano"]) <= int(root["endTimeUnixNano"])
+    assert root["attributes"] == [
+        {"key": "x", "value": {"doubleValue": 0.5}},
+        {"key": "status", "value": {"stringValue": "done"}},
+    ]
+    assert phase["attributes"] == [{"key": "step", "value": {"intValue": "1"}}]
+    assert failing["attributes"] == [{"key": "ok", "value": {"boolValue": False}}]
+    assert root["status"] == {"code": 1}
+    assert failing["status"] == {"code": 2, "message": "ValueError: bad value"}
+
+
+def test_sdk_operations_are_traced(mobile_base):
+    """The SDK records the spans of its operations once tracing is started."""
+    tracer = mobile_base.start_tracing()
+    mobile_base.set_speed(0.1, 0.0, 0.0)
+    mobile_base.stop_tracing()
+    mobile_base.set_speed(0.0, 0.0, 0.0)
+    spans = tracer.spans()
+    names = [span.name for span in spans]
+    assert names[-1] == "set_speed"
+    assert "SendDirection" in names
+    root = spans[-1]
+    assert all(span.trace_id == root.trace_id for span in spans)
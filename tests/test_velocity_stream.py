@@ -0,0 +1,110 @@
+"""Tests of the fixed-rate velocity stream."""
+import threading
+import time
+
+import pytest
+
+from mobile_base_sdk.velocity_stream import VelocityStream
+
+
+class _Recorder:
+    """Send function recording the commands, optionally failing."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.commands = []
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def __call__(self, x_vel, y_vel, rot_vel):
+        with self._lock:
+            self.commands.append((x_vel, y_vel, rot_vel))
+        if self.fail:
+            raise RuntimeError("Simulated failure.")
+
+    def last(self):
+        with self._lock:
+            return self.commands[-1] if self.commands else None
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_rate_too_low_to_refresh_commands():
+    """The rate should refresh commands before their 200ms duration expires."""
+    with pytest.raises(ValueError):
+        VelocityStream(send=_Recorder(), rate_hz=4.0)
+
+
+def test_stale_setpoint_sends_null_velocity():
+    """A setpoint not updated within setpoint_timeout is replaced by a null velocity until the next update."""
+    recorder = _Recorder()
+    stream = VelocityStream(send=recorder, rate_hz=50.0, setpoint_timeout=0.1)
+    stream.start()
+    try:
+        stream.update(0.3, 0.0, 10.0)
+        assert _wait_for(lambda: recorder.last() == (0.3, 0.0, 10.0))
+        # The deadman expires while the setpoint is still (0.3, 0.0, 10.0).
+        assert _wait_for(lambda: recorder.last() == (0.0, 0.0, 0.0))
+        assert stream.setpoint == (0.3, 0.0, 10.0)
+        assert stream.stats().timeouts == 1
+
+        stream.update(0.1, 0.0, 0.0)
+        assert _wait_for(lambda: recorder.last() == (0.1, 0.0, 0.0))
+        assert _wait_for(lambda: recorder.last() == (0.0, 0.0, 0.0))
+        assert stream.stats().timeouts == 2
+    finally:
+        stream.stop()
+
+
+def test_setpoint_kept_without_timeout():
+    """With setpoint_timeout=None, the setpoint is sent until it changes."""
+    recorder = _Recorder()
+    stream = VelocityStream(send=recorder, rate_hz=50.0, setpoint_timeout=None)
+    stream.start()
+    stream.update(0.2, 0.1, 0.0)
+    time.sleep(0.3)
+    assert recorder.last() == (0.2, 0.1, 0.0)
+    assert stream.stats().timeouts == 0
+    stream.stop()
+    # Stopping sends a null velocity.
+    assert recorder.last() == (0.0, 0.0, 0.0)
+
+
+def test_stats_count_messages():
+    """Sent commands, errors, updates and coalesced updates are counted."""
+    recorder = _Recorder()
+    stream = VelocityStream(send=recorder, rate_hz=50.0, setpoint_timeout=None)
+    stream.start()
+    assert _wait_for(lambda: stream.stats().sent >= 5)
+    for i in range(10):
+        stream.update(0.01 * i, 0.0, 0.0)
+    assert _wait_for(lambda: recorder.last() == (0.09, 0.0, 0.0))
+    stream.stop()
+
+    stats = stream.stats()
+    # The null velocity sent by stop is not a command of the stream.
+    assert stats.sent == len(recorder.commands) - 1
+    assert stats.updates == 10
+    assert stats.dropped_updates >= 8
+    assert stats.errors == 0
+    assert 0.0 <= stats.jitter_mean <= stats.jitter_max
+
+    stream.reset_stats()
+    assert stream.stats().sent == 0
+
+
+def test_send_errors_are_counted():
+    """A failing send is counted and does not stop the stream."""
+    recorder = _Recorder(fail=True)
+    stream = VelocityStream(send=recorder, rate_hz=50.0)
+    stream.start()
+    assert _wait_for(lambda: stream.stats().errors >= 3)
+    assert stream.is_running
+    stats = stream.stats()
+    assert stats.errors == stats.sent
+    recorder.fail = False
+    stream.stop()